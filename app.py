@@ -1,5 +1,12 @@
+import os
+
+# Green threads must replace the blocking stdlib before anything else is imported
+if os.getenv('SOCKETIO_ASYNC_MODE', 'eventlet') == 'eventlet':
+    import eventlet
+    eventlet.monkey_patch()
+
 from flask import redirect, url_for
-from main import create_app
+from main import create_app, socketio
 
 app = create_app()
 
@@ -8,4 +15,6 @@ def home():
     return redirect(url_for('auth.login_page'))
 
 if __name__ == '__main__':
-    app.run(debug = True, port = 5001)
\ No newline at end of file
+    # Production: gunicorn -k eventlet -w 1 app:app per process, with SOCKETIO_MESSAGE_QUEUE set
+    # when several processes (behind a sticky load balancer) serve the same clients
+    socketio.run(app, debug = True, port = 5001)
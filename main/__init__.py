@@ -3,31 +3,95 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
 from os import path
 from flask_jwt_extended import JWTManager
+from flask_socketio import SocketIO
+from .cache import FeedCache
+from .replicas import RoutingSession
 import os
 
 # Initialize extensions first
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 bcrypt = Bcrypt()
 jwt = JWTManager()
+cache = FeedCache()
+socketio = SocketIO()
 DB_NAME = "blog_store"
 
 def create_app():
     app = Flask(__name__, template_folder='../templates')
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')
+    # Connection pool per worker process, see dbpool for the defaults
+    from .dbpool import engine_options, init_pool_metrics, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE
+    app.config['DB_POOL_SIZE'] = int(os.getenv('DB_POOL_SIZE', DB_POOL_SIZE))
+    app.config['DB_MAX_OVERFLOW'] = int(os.getenv('DB_MAX_OVERFLOW', DB_MAX_OVERFLOW))
+    app.config['DB_POOL_TIMEOUT'] = int(os.getenv('DB_POOL_TIMEOUT', DB_POOL_TIMEOUT))
+    app.config['DB_POOL_RECYCLE'] = int(os.getenv('DB_POOL_RECYCLE', DB_POOL_RECYCLE))
+    app.config['DB_POOL_PRE_PING'] = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app)
+    # Read replicas, comma separated URLs; GET requests read from them, see replicas.RoutingSession
+    from .replicas import init_replicas, replica_binds, REPLICA_HEALTH_INTERVAL, READ_YOUR_WRITES_WINDOW
+    app.config['SQLALCHEMY_BINDS'] = replica_binds(os.getenv('DATABASE_REPLICA_URLS'))
+    app.config['REPLICA_HEALTH_INTERVAL'] = int(os.getenv('REPLICA_HEALTH_INTERVAL', REPLICA_HEALTH_INTERVAL))
+    app.config['READ_YOUR_WRITES_WINDOW'] = int(os.getenv('READ_YOUR_WRITES_WINDOW', READ_YOUR_WRITES_WINDOW))
+    # Where the markers of recent writers live, a shared backend (redis) when several processes serve requests
+    app.config['READ_YOUR_WRITES_BACKEND'] = os.getenv('READ_YOUR_WRITES_BACKEND', 'memory')
     db.init_app(app)
+    init_pool_metrics(app, db)
+    init_replicas(app, db)
     jwt.init_app(app)
+    # Take the caller's role from the signed token claim instead of reading Users on each request;
+    # a role change then only applies once the user's current access token expires
+    app.config['AUTHZ_TRUST_ROLE_CLAIM'] = os.getenv('AUTHZ_TRUST_ROLE_CLAIM', 'false').lower() == 'true'
+    app.config['FEED_CACHE_BACKEND'] = os.getenv('FEED_CACHE_BACKEND', 'memory')
+    app.config['FEED_CACHE_TTL'] = int(os.getenv('FEED_CACHE_TTL', 30))
+    cache.init_app(app)
+    app.config['MEDIA_BACKEND'] = os.getenv('MEDIA_BACKEND', 'cloudinary')
+    app.config['MEDIA_ROOT'] = os.getenv('MEDIA_ROOT')
+    app.config['UPLOAD_SPOOL_DIR'] = os.getenv('UPLOAD_SPOOL_DIR')
+    app.config['UPLOAD_WORKERS'] = int(os.getenv('UPLOAD_WORKERS', 4))
+    # AuthorStats rows older than this are ignored and the dashboard aggregates live
+    app.config['DASHBOARD_STATS_MAX_AGE'] = int(os.getenv('DASHBOARD_STATS_MAX_AGE', 900))
 
     # Import blueprints after db is defined
     from .auth import auth
     from .post import post
     from .comment import comment
+    from .metrics import metrics
     
     app.register_blueprint(auth, url_prefix = '/auth')
     app.register_blueprint(post, url_prefix = '/post')
     app.register_blueprint(comment, url_prefix = '/comment')
+    app.register_blueprint(metrics, url_prefix = '/metrics')
+
+    from .storage import init_storage
+    from .uploads import init_uploads
+    init_storage(app)
+    init_uploads(app)
+
+    app.config['SOCKETIO_ASYNC_MODE'] = os.getenv('SOCKETIO_ASYNC_MODE', 'eventlet')
+    # Needed as soon as more than one worker process serves sockets, e.g. redis://localhost:6379/0
+    app.config['SOCKETIO_MESSAGE_QUEUE'] = os.getenv('SOCKETIO_MESSAGE_QUEUE')
+    # Counter broadcasts and like notifications are batched per room over this window
+    app.config['BROADCAST_INTERVAL_MS'] = int(os.getenv('BROADCAST_INTERVAL_MS', 200))
+    from .realtime import init_socketio
+    init_socketio(app)
+
+    # Write-behind likes: accepted into a per-process buffer and written in batches, see like_buffer
+    # Reads served by the process that accepted a like include it (counters, is_liked, ETag); other
+    # worker processes and the socket counter broadcasts only see it after the next flush (LIKE_FLUSH_INTERVAL_MS)
+    from .like_buffer import init_like_buffer, LIKE_FLUSH_INTERVAL_MS
+    app.config['LIKE_WRITE_BEHIND'] = os.getenv('LIKE_WRITE_BEHIND', 'false').lower() == 'true'
+    app.config['LIKE_FLUSH_INTERVAL_MS'] = int(os.getenv('LIKE_FLUSH_INTERVAL_MS', LIKE_FLUSH_INTERVAL_MS))
+    # memory | journal | fsync, what a crash of the worker may lose
+    app.config['LIKE_BUFFER_DURABILITY'] = os.getenv('LIKE_BUFFER_DURABILITY', 'journal')
+    app.config['LIKE_JOURNAL_DIR'] = os.getenv('LIKE_JOURNAL_DIR')
+    init_like_buffer(app)
+
+    from .commands import register_commands
+    register_commands(app)
 
     with app.app_context():
-        db.create_all()
+        # Primary only, replicas get their schema through replication
+        db.create_all(bind_key=None)
 
     return app
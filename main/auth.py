@@ -3,6 +3,8 @@ from sqlalchemy.exc import IntegrityError
 from datetime import timedelta
 from .models import Users
 from . import db, bcrypt
+from .authz import role_claims
+from .schemas import LoginResponse, Tokens, UserInfoOut, UserInfoResponse, UserOut, json_response
 from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
 import re
 
@@ -116,28 +118,28 @@ def login():
                 user = Users.query.filter_by(username=user_data['username']).first()
                 
                 if user and bcrypt.check_password_hash(user.password, user_data['password']):
-                        access_token = create_access_token(identity = user.user_id, expires_delta=timedelta(hours=24))
+                        access_token = create_access_token(identity = user.user_id, expires_delta=timedelta(hours=24),
+                                                           additional_claims=role_claims(user))
                         refresh_token = create_refresh_token(identity = user.user_id, expires_delta=timedelta(days=7))
 
                         redirect_url = '/post/view_post/'
 
-                        return jsonify({
-                                        "message":"Successfully logged in",
-                                        "user": {
-                                            "user_id": user.user_id,
-                                            "username": user.username,
-                                            "email": user.email,
-                                            "first_name": user.first_name,
-                                            "last_name": user.last_name,
-                                            "role": user.role
-                                        },
-                                        "tokens": {
-                                                "access_token": access_token,
-                                                "refresh_token": refresh_token,
-                                                "url_for_posts": redirect_url
-                                                },
-                                        "status":"success"
-                                    }), 200
+                        return json_response(LoginResponse(
+                                        message="Successfully logged in",
+                                        user=UserOut(
+                                            user_id=user.user_id,
+                                            username=user.username,
+                                            email=user.email,
+                                            first_name=user.first_name,
+                                            last_name=user.last_name,
+                                            role=user.role
+                                        ),
+                                        tokens=Tokens(
+                                                access_token=access_token,
+                                                refresh_token=refresh_token,
+                                                url_for_posts=redirect_url
+                                                )
+                                    ))
                 
                 
                 return jsonify(
@@ -229,19 +231,18 @@ def get_user_info():
     if not user:
         return jsonify({"message": "User not found", "status": "error"}), 404
     
-    return jsonify({
-        "user": {
-            "user_id": user.user_id,
-            "username": user.username,
-            "email": user.email,
-            "first_name": user.first_name,
-            "last_name": user.last_name,
-            "role": user.role,
-            "is_admin": user.is_admin(),
-            "is_user": user.is_user()
-        },
-        "status": "success"
-    }), 200
+    return json_response(UserInfoResponse(
+        user=UserInfoOut(
+            user_id=user.user_id,
+            username=user.username,
+            email=user.email,
+            first_name=user.first_name,
+            last_name=user.last_name,
+            role=user.role,
+            is_admin=user.is_admin(),
+            is_user=user.is_user()
+        )
+    ))
 
 
 @auth.route('/logout/',methods=['GET'])
@@ -0,0 +1,66 @@
+from flask import current_app, g
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from . import db
+from .models import Users
+
+ROLE_CLAIM = 'role'
+
+
+class Principal:
+    """
+    The authenticated caller as far as authorization cares: their id and role
+    Ownership checks against it are plain comparisons, no database access
+    """
+
+    __slots__ = ('user_id', 'role')
+
+    def __init__(self, user_id, role):
+        self.user_id = user_id
+        self.role = role
+
+    def is_admin(self):
+        return self.role == 'admin'
+
+    def is_user(self):
+        return self.role == 'user'
+
+    def can_manage(self, owner_id):
+        """
+        - Admin: can manage anything
+        - User: can only manage what they own
+        """
+        if self.is_admin():
+            return True
+        return self.is_user() and owner_id is not None and owner_id == self.user_id
+
+
+def role_claims(user):
+    """
+    Extra claims to sign into a user's tokens (see AUTHZ_TRUST_ROLE_CLAIM)
+    """
+    return {ROLE_CLAIM: user.role}
+
+
+def load_principal(user_id, claims=None):
+    """
+    Build the Principal for user_id, from the signed role claim when it is trusted, otherwise from Users
+    Returns None when the user no longer exists
+    """
+    role = (claims or {}).get(ROLE_CLAIM)
+    if role and current_app.config.get('AUTHZ_TRUST_ROLE_CLAIM'):
+        return Principal(user_id, role)
+
+    row = db.session.query(Users.role).filter(Users.user_id == user_id).first()
+    return Principal(user_id, row.role) if row else None
+
+
+def current_principal():
+    """
+    The caller of the current request, resolved once and kept on flask.g (call inside @jwt_required)
+    """
+    identity = get_jwt_identity()
+    principal = g.get('principal')
+    # g belongs to the app context, which an outer context (CLI, tests) can share between requests
+    if principal is None or principal.user_id != identity:
+        principal = g.principal = load_principal(identity, get_jwt())
+    return principal
@@ -0,0 +1,179 @@
+import hashlib
+import threading
+import time
+from cachelib import BaseCache, FileSystemCache, NullCache, RedisCache, SimpleCache
+from cachetools import TLRUCache
+from .replicas import primary_reads, reads_from_replica, reads_own_writes
+
+
+class MemoryCache(BaseCache):
+    """
+    In-process TTL + LRU cache exposing the cachelib interface
+    A timeout of 0 keeps the entry until it is evicted by size
+    """
+
+    def __init__(self, maxsize=1024, default_timeout=300):
+        super().__init__(default_timeout=default_timeout)
+        self._lock = threading.Lock()
+        # Expiry times come from _entry, so the cache must read the same clock
+        self._store = TLRUCache(maxsize=maxsize, ttu=lambda key, entry, now: entry[0], timer=time.monotonic)
+
+    def _entry(self, value, timeout):
+        timeout = self._normalize_timeout(timeout)
+        return (time.monotonic() + timeout if timeout > 0 else float('inf'), value)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._store.get(key)
+        return entry[1] if entry else None
+
+    def set(self, key, value, timeout=None):
+        with self._lock:
+            self._store[key] = self._entry(value, timeout)
+        return True
+
+    def add(self, key, value, timeout=None):
+        with self._lock:
+            if key in self._store:
+                return False
+            self._store[key] = self._entry(value, timeout)
+        return True
+
+    def delete(self, key):
+        with self._lock:
+            return self._store.pop(key, None) is not None
+
+    def has(self, key):
+        with self._lock:
+            return key in self._store
+
+    def clear(self):
+        with self._lock:
+            self._store.clear()
+        return True
+
+    def inc(self, key, delta=1):
+        with self._lock:
+            entry = self._store.get(key)
+            value = (entry[1] if entry else 0) + delta
+            self._store[key] = (entry[0] if entry else float('inf'), value)
+        return value
+
+
+def make_backend(app, kind=None):
+    """
+    Build the cache backend named by `kind`, FEED_CACHE_BACKEND by default
+    - memory (default): per-process TTL + LRU
+    - simple / filesystem / redis / null: the matching cachelib backend, FEED_CACHE_OPTIONS are passed through
+    """
+    kind = kind or app.config.get('FEED_CACHE_BACKEND', 'memory')
+    timeout = app.config.get('FEED_CACHE_TTL', 30)
+    options = dict(app.config.get('FEED_CACHE_OPTIONS') or {})
+
+    if kind == 'memory':
+        return MemoryCache(maxsize=app.config.get('FEED_CACHE_MAXSIZE', 1024), default_timeout=timeout)
+    if kind == 'simple':
+        return SimpleCache(default_timeout=timeout, **options)
+    if kind == 'filesystem':
+        return FileSystemCache(options.pop('cache_dir', app.config.get('FEED_CACHE_DIR', '/tmp/blog_cache')),
+                               default_timeout=timeout, **options)
+    if kind == 'redis':
+        options.setdefault('key_prefix', 'blog:')
+        return RedisCache(default_timeout=timeout, **options)
+    if kind == 'null':
+        return NullCache()
+    raise ValueError(f"Unknown cache backend: {kind}")
+
+
+class FeedCache:
+    """
+    Read-through cache for viewer-independent feed pages and per-post aggregates
+    Feed pages are keyed by a generation value, so replacing it invalidates every page at once
+    What goes into the cache is loaded from the primary, a lagging replica must not be served to everyone.
+    A user who wrote within READ_YOUR_WRITES_WINDOW seconds neither reads nor fills the cache.
+    """
+
+    GENERATION_KEY = 'feed:generation'
+
+    def __init__(self, app=None):
+        self.backend = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.backend = make_backend(app)
+        app.extensions['feed_cache'] = self
+
+    def _generation(self):
+        generation = self.backend.get(self.GENERATION_KEY)
+        if generation is None:
+            # Start from a fresh value so pages cached under an evicted generation are never reused
+            self.backend.add(self.GENERATION_KEY, time.time_ns(), timeout=0)
+            generation = self.backend.get(self.GENERATION_KEY)
+        return generation
+
+    @staticmethod
+    def _page_key(generation, key_parts):
+        digest = hashlib.sha1(repr(key_parts).encode('utf-8')).hexdigest()
+        return f'feed:{generation}:{digest}'
+
+    @staticmethod
+    def _aggregate_key(post_id):
+        return f'post:{post_id}:aggregates'
+
+    def _bypassed(self):
+        # A null backend would only move its loads to the primary
+        return self.backend is None or isinstance(self.backend, NullCache) or reads_own_writes()
+
+    @staticmethod
+    def _fill(load):
+        from . import db
+        with primary_reads(db.session):
+            return load()
+
+    def get_feed_page(self, key_parts, loader):
+        if self._bypassed():
+            return loader()
+        key = self._page_key(self._generation(), key_parts)
+        cached = self.backend.get(key)
+        if cached is not None:
+            return cached
+        value = self._fill(loader)
+        self.backend.set(key, value)
+        return value
+
+    def get_post_aggregates(self, post_ids, loader):
+        """
+        Return {post_id: aggregates}, calling loader(missing_ids) only for ids not cached
+        """
+        if self._bypassed():
+            return loader(post_ids)
+        keys = [self._aggregate_key(pid) for pid in post_ids]
+        found = {pid: value for pid, value in zip(post_ids, self.backend.get_many(*keys)) if value is not None}
+        missing = [pid for pid in post_ids if pid not in found]
+        if missing:
+            loaded = self._fill(lambda: loader(missing))
+            self.set_post_aggregates(loaded)
+            found.update(loaded)
+        return found
+
+    def set_post_aggregates(self, aggregates):
+        """
+        Cache counters the caller has read anyway, ignored unless they came from the primary
+        """
+        from . import db
+        if aggregates and not self._bypassed() and not reads_from_replica(db.session):
+            self.backend.set_many({self._aggregate_key(pid): value for pid, value in aggregates.items()})
+
+    def invalidate_feed(self):
+        # A fresh unique generation rather than inc(), which restarts at 1 after an eviction
+        if self.backend is not None:
+            self.backend.set(self.GENERATION_KEY, time.time_ns(), timeout=0)
+
+    def invalidate_post(self, post_id):
+        if self.backend is not None:
+            self.backend.delete(self._aggregate_key(post_id))
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
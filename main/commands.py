@@ -0,0 +1,115 @@
+import time
+import click
+from flask.cli import with_appcontext
+from .models import Posts, Comments, AuthorStats
+from .outbox import process_media_outbox
+from .schemas import utc_isoformat
+from .streaming import STREAM_CHUNK_SIZE, ndjson_lines
+from . import db, cache
+
+
+@click.command('reconcile-counters')
+@with_appcontext
+def reconcile_counters():
+    """Repair drift in the denormalized like/comment counters on Posts."""
+    repaired = Posts.reconcile_counters()
+    cache.clear()
+    click.echo(f"Reconciled counters on {repaired} post(s)")
+
+
+@click.command('media-worker')
+@click.option('--batch-size', default=50, show_default=True, help='Outbox rows handled per batch.')
+@click.option('--interval', default=5.0, show_default=True, help='Seconds to sleep when no removal is due.')
+@click.option('--once', is_flag=True, help='Drain the outbox once and exit.')
+@with_appcontext
+def media_worker(batch_size, interval, once):
+    """Process queued media removals from the media outbox."""
+    while True:
+        settled = process_media_outbox(batch_size=batch_size)
+        if settled:
+            # More may be due right away; failed removals are backed off and not picked up again here
+            click.echo(f"Processed {settled} media outbox item(s)")
+            continue
+        if once:
+            break
+        time.sleep(interval)
+
+
+@click.command('resume-uploads')
+@with_appcontext
+def resume_uploads():
+    """Re-queue spooled images whose upload never completed, e.g. after a restart."""
+    from .uploads import get_uploads
+    requeued = get_uploads().resubmit_pending()
+    click.echo(f"Re-queued {requeued} pending upload(s)")
+
+
+@click.command('refresh-author-stats')
+@click.option('--min-posts', default=100, show_default=True, help='Only authors with at least this many posts are materialized.')
+@click.option('--interval', default=300.0, show_default=True, help='Seconds between refreshes.')
+@click.option('--once', is_flag=True, help='Refresh once and exit.')
+@with_appcontext
+def refresh_author_stats(min_posts, interval, once):
+    """Rebuild the AuthorStats summary used by the dashboard for prolific authors."""
+    while True:
+        refreshed = AuthorStats.refresh(min_posts=min_posts)
+        click.echo(f"Refreshed dashboard stats for {refreshed} author(s)")
+        if once:
+            break
+        time.sleep(interval)
+
+
+def export_records(chunk_size, include_comments=True):
+    """
+    Every post, then every comment, as flat records (the feed's streaming pipeline without a viewer)
+    """
+    from .post import iter_post_chunks, serialize_post_base
+    from .comment import comment_rows_query
+
+    for rows in iter_post_chunks(chunk_size=chunk_size):
+        for row in rows:
+            yield {
+                'type': 'post',
+                **serialize_post_base(row, row.author_username),
+                'like_count': row.like_count or 0,
+                'comment_count': row.comment_count or 0
+            }
+
+    if include_comments:
+        rows = db.session.execute(
+            comment_rows_query().add_columns(Comments.post_id).order_by(Comments.created_at, Comments.comment_id),
+            execution_options={'yield_per': chunk_size}
+        )
+        for row in rows:
+            yield {
+                'type': 'comment',
+                'cid': row.comment_id,
+                'post_id': row.post_id,
+                'parent_cid': row.parent_comment_id,
+                'user_id': row.user_id,
+                'username': row.username,
+                'content': row.content,
+                'created_at': utc_isoformat(row.created_at)
+            }
+
+
+@click.command('export')
+@click.option('--output', '-o', type=click.File('wb'), default='-', show_default=True, help='File to write, - for stdout.')
+@click.option('--comments/--no-comments', default=True, show_default=True, help='Include comments after the posts.')
+@click.option('--chunk-size', default=STREAM_CHUNK_SIZE, show_default=True, help='Rows fetched per round trip.')
+@with_appcontext
+def export(output, comments, chunk_size):
+    """Write all posts and comments as NDJSON, one record per line, for backups."""
+    count = 0
+    for line in ndjson_lines(export_records(chunk_size, comments)):
+        output.write(line)
+        count += 1
+    click.echo(f"Exported {count} record(s)", err=True)
+
+
+def register_commands(app):
+    app.cli.add_command(reconcile_counters)
+    app.cli.add_command(media_worker)
+    app.cli.add_command(resume_uploads)
+    app.cli.add_command(refresh_author_stats)
+    app.cli.add_command(export)
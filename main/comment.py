@@ -1,35 +1,50 @@
 from flask import Blueprint, request, jsonify
-from datetime import datetime
-from .models import Comments, Users
-from . import db, socketio
+from .models import Comments, Posts, Users, utc_now
+from . import db, socketio, cache
+from .pagination import MAX_PER_PAGE, encode_cursor, decode_cursor, encode_replies_token, decode_replies_token, keyset_filter
 from flask_jwt_extended import jwt_required,get_jwt_identity
+from .authz import current_principal
+from .broadcast import get_broadcasts
+from .schemas import CommentOut, CommentPage, CursorMeta, as_utc, json_response, utc_isoformat
+from .uuids import parse_uuid
+from .streaming import ndjson_response, stream_chunk_size, wants_ndjson
 
 
 comment = Blueprint('comment', __name__)
 
-def can_manage_comment(user_id, comment_id=None, comment=None):
+# Deepest reply level sent in one response, deeper replies are fetched with their replies_token
+# (this also keeps the nesting well inside the JSON encoder's recursion limit)
+MAX_COMMENT_DEPTH = 100
+
+def can_manage_comment(principal, comment=None, owner_id=None):
     """
-    Check if user can manage a comment based on their role
+    Check if the caller (see main.authz.current_principal) can manage a comment
     - Admin: can manage any comment
     - User: can only manage their own comments
     """
-    user = Users.query.filter_by(user_id=user_id).first()
-    if not user:
+    if principal is None:
         return False
-    
-    # Admin can manage any comment
-    if user.is_admin():
-        return True
-    
-    # User can only manage their own comments
-    if user.is_user():
-        if comment:
-            return comment.user_id == user_id
-        elif comment_id:
-            comment_obj = Comments.query.filter_by(comment_id=comment_id).first()
-            return comment_obj and comment_obj.user_id == user_id
-    
-    return False
+    return principal.can_manage(comment.user_id if comment is not None else owner_id)
+
+def delete_comment_tree(comment_id):
+    """
+    Delete a comment and all of its replies at any depth, returns the deleted ids
+    Uses DELETE ... RETURNING where the dialect supports it, otherwise reads the ids first
+    """
+    subtree = Comments.subtree_cte(Comments.comment_id == comment_id)
+    stmt = (
+        db.delete(Comments)
+        .where(Comments.comment_id.in_(db.select(subtree.c.comment_id)))
+        .execution_options(synchronize_session=False)
+    )
+
+    if db.engine.dialect.delete_returning:
+        deleted_ids = db.session.execute(stmt.returning(Comments.comment_id)).scalars().all()
+    else:
+        deleted_ids = db.session.execute(db.select(subtree.c.comment_id)).scalars().all()
+        db.session.execute(stmt)
+    return deleted_ids
+
 
 @comment.route('/post/<uuid:pid>/add/', methods = ['GET', 'POST'], endpoint='add_comment')
 @jwt_required()
@@ -46,7 +61,8 @@ def add_comment(pid):
 
             # Validate parent comment if provided
             if parent_comment_id:
-                parent = Comments.query.filter_by(comment_id=str(parent_comment_id), post_id=str(pid)).first()
+                parent_comment_id = parse_uuid(parent_comment_id)
+                parent = parent_comment_id and Comments.query.filter_by(comment_id=parent_comment_id, post_id=str(pid)).first()
                 if not parent:
                     return jsonify({"message": "Parent comment not found","status":"error"}), 404
 
@@ -54,12 +70,14 @@ def add_comment(pid):
                     post_id = str(pid),
                     user_id = current_user_id,
                     content = content,
-                    parent_comment_id = str(parent_comment_id) if parent_comment_id else None,
-                    created_at = datetime.now() 
+                    parent_comment_id = str(parent_comment_id) if parent_comment_id else None
             )
 
             db.session.add(add_comment)
+            comment_count = Posts.increment_counter(str(pid), 'comment_count', 1)
             db.session.commit()
+            cache.invalidate_post(str(pid))
+            get_broadcasts().update_counters(str(pid), comment_count=comment_count)
             
             # Emit socket event so other clients update without refresh
             try:
@@ -68,7 +86,7 @@ def add_comment(pid):
                     'comment_id': add_comment.comment_id,
                     'author_id': current_user_id,
                     'content': content,
-                    'created_at': add_comment.created_at.isoformat() if add_comment.created_at else None
+                    'created_at': utc_isoformat(add_comment.created_at)
                 }, room=f'post_{str(pid)}')
             except Exception:
                 pass
@@ -89,8 +107,6 @@ def edit_comment(pid,cid):
             if not content:
                  return jsonify({"message":"Content is missing","status":"error"}), 401
             
-            current_user_id = get_jwt_identity()
-
             # Find the comment first
             comment = Comments.query.filter_by(comment_id=str(cid), post_id=str(pid)).first()
             
@@ -98,11 +114,11 @@ def edit_comment(pid,cid):
                 return jsonify({"message": "Comment not found", "status": "error"}), 404
             
             # Check if user can edit this comment
-            if not can_manage_comment(current_user_id, comment=comment):
+            if not can_manage_comment(current_principal(), comment=comment):
                 return jsonify({"message": "Unauthorized to edit this comment", "status": "error"}), 403
         
             comment.content = content
-            comment.updated_at = datetime.now()
+            comment.updated_at = utc_now()
             db.session.commit()
             return jsonify({"message": "Comment is edited successfully", "status": "success"}), 200
             
@@ -110,34 +126,149 @@ def edit_comment(pid,cid):
         return jsonify({"message":"Edit Comment","status":"pending"}), 202
 
 
+def comment_rows_query():
+    """
+    Comment columns together with the author's username, a single joined SELECT
+    """
+    return (
+        db.select(
+            Comments.comment_id, Comments.parent_comment_id, Comments.user_id,
+            Comments.content, Comments.created_at, Users.username
+        )
+        .outerjoin(Users, Users.user_id == Comments.user_id)
+    )
+
+
+def serialize_comment_row(row, principal):
+    """
+    Flat fields of one comment row as seen by `principal`
+    """
+    can_manage = can_manage_comment(principal, owner_id=row.user_id)
+    return CommentOut(
+        cid=row.comment_id,
+        content=row.content,
+        username=row.username,
+        user_id=row.user_id,
+        is_owner=principal is not None and row.user_id == principal.user_id,
+        can_edit=can_manage,
+        can_delete=can_manage,
+        created_at=as_utc(row.created_at)
+    )
+
+
+def stream_comments(rows, principal):
+    """
+    Flat comment records for NDJSON, each carrying parent_cid so clients can rebuild the tree
+    """
+    for row in rows:
+        record = serialize_comment_row(row, principal)
+        record.parent_cid = row.parent_comment_id
+        yield record
+
+
+def build_comment_tree(rows, root_parent_id, principal, max_depth=MAX_COMMENT_DEPTH):
+    """
+    Assemble the nested reply tree from flat rows (in display order) with an explicit stack
+    Comments at max_depth that have replies get a replies_token instead of their replies
+    """
+    children = {}
+    for row in rows:
+        children.setdefault(row.parent_comment_id, []).append(row)
+
+    tree = []
+    stack = [(row, 0, tree) for row in reversed(children.get(root_parent_id, []))]
+    while stack:
+        row, depth, siblings = stack.pop()
+        node = serialize_comment_row(row, principal)
+        siblings.append(node)
+
+        replies = children.get(row.comment_id)
+        if not replies:
+            continue
+        if depth >= max_depth:
+            node.replies_token = encode_replies_token(row.comment_id)
+        else:
+            stack.extend((reply, depth + 1, node.replies) for reply in reversed(replies))
+    return tree
+
+
 @comment.route('/post/<uuid:post_id>/comments/', methods=['GET'])
 @jwt_required()
 def get_comments(post_id):
-    current_user_id = get_jwt_identity()
-    comments = Comments.query.filter_by(post_id=str(post_id)).order_by(Comments.created_at.asc()).all()
-
-    # Build parent -> children mapping
-    children_map = {}
-    for c in comments:
-        key = c.parent_comment_id or None
-        children_map.setdefault(key, []).append(c)
-
-    def serialize_comment(c):
-        return {
-            'cid': c.comment_id,
-            'content': c.content,
-            'username': c.author.username,
-            'user_id': c.user_id,
-            'is_owner': c.user_id == current_user_id,
-            'can_edit': can_manage_comment(current_user_id, comment=c),
-            'can_delete': can_manage_comment(current_user_id, comment=c),
-            'created_at': c.created_at.isoformat() if c.created_at else None,
-            'replies': [serialize_comment(child) for child in children_map.get(c.comment_id, [])]
-        }
-
-    # Root-level comments have parent_comment_id == None
-    tree = [serialize_comment(c) for c in children_map.get(None, [])]
-    return jsonify(tree)
+    per_page = request.args.get('per_page', 20, type=int)
+    max_depth = request.args.get('max_depth', MAX_COMMENT_DEPTH, type=int)
+    replies_token = request.args.get('replies', '', type=str).strip()
+    cursor_mode = 'cursor' in request.args or bool(replies_token)
+
+    if max_depth < 0:
+        return jsonify({"message": "max_depth must not be negative", "status": "error"}), 400
+    max_depth = min(max_depth, MAX_COMMENT_DEPTH)
+    if cursor_mode and not 1 <= per_page <= MAX_PER_PAGE:
+        return jsonify({"message": f"per_page must be between 1 and {MAX_PER_PAGE}", "status": "error"}), 400
+
+    # Role resolved once for the whole thread, the per-comment checks are plain comparisons
+    principal = current_principal()
+    thread = comment_rows_query().where(Comments.post_id == str(post_id))
+    order = (Comments.created_at.asc(), Comments.comment_id.asc())
+
+    if wants_ndjson():
+        # The whole thread as flat lines in display order, read through a server-side cursor
+        rows = db.session.execute(thread.order_by(*order), execution_options={'yield_per': stream_chunk_size()})
+        return ndjson_response(stream_comments(rows, principal))
+
+    if not cursor_mode:
+        if 'max_depth' in request.args:
+            # Only walk as deep as needed, plus one level to know which comments have more replies
+            subtree = Comments.subtree_cte(
+                (Comments.post_id == str(post_id)) & Comments.parent_comment_id.is_(None), max_depth=max_depth + 1
+            )
+            thread = thread.where(Comments.comment_id.in_(db.select(subtree.c.comment_id)))
+        rows = db.session.execute(thread.order_by(*order)).all()
+        return json_response(build_comment_tree(rows, None, principal, max_depth))
+
+    # Keyset mode: a slice of root comments (or of one comment's replies), then just their subtrees
+    try:
+        if replies_token:
+            parent_id, cursor = decode_replies_token(replies_token)
+        else:
+            parent_id = None
+            cursor = request.args.get('cursor', '', type=str).strip()
+            cursor = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        return jsonify({"message": "Invalid cursor", "status": "error"}), 400
+
+    roots_query = thread.where(
+        Comments.parent_comment_id == parent_id if parent_id else Comments.parent_comment_id.is_(None)
+    )
+    if cursor:
+        roots_query = roots_query.where(
+            keyset_filter(Comments.created_at, Comments.comment_id, cursor, descending=False)
+        )
+
+    roots = db.session.execute(roots_query.order_by(*order).limit(per_page + 1)).all()
+    has_next = len(roots) > per_page
+    roots = roots[:per_page]
+
+    rows = roots
+    if roots:
+        # Seeds are the roots' direct replies (depth 1), the walk stops one level below max_depth
+        subtree = Comments.subtree_cte(
+            Comments.parent_comment_id.in_([r.comment_id for r in roots]), max_depth=max_depth
+        )
+        rows = roots + db.session.execute(
+            thread.where(Comments.comment_id.in_(db.select(subtree.c.comment_id))).order_by(*order)
+        ).all()
+
+    next_cursor = None
+    if has_next:
+        last = roots[-1]
+        if replies_token:
+            next_cursor = encode_replies_token(parent_id, last.created_at, last.comment_id)
+        else:
+            next_cursor = encode_cursor(last.created_at, last.comment_id)
+
+    meta = CursorMeta(per_page=per_page, has_next=has_next, next_cursor=next_cursor)
+    return json_response(CommentPage(comments=build_comment_tree(rows, parent_id, principal, max_depth), meta=meta))
 
 
 
@@ -146,8 +277,6 @@ def get_comments(post_id):
 def delete_comment(pid,cid):
 
     if request.method == 'POST':
-        current_user_id = get_jwt_identity()
-
         # Find the comment first
         comment = Comments.query.filter_by(comment_id=str(cid), post_id=str(pid)).first()
     
@@ -155,19 +284,15 @@ def delete_comment(pid,cid):
             return jsonify({"message": "Comment not found", "status": "error"}), 404
         
         # Check if user can delete this comment
-        if not can_manage_comment(current_user_id, comment=comment):
+        if not can_manage_comment(current_principal(), comment=comment):
             return jsonify({"message": "Unauthorized to delete this comment", "status": "error"}), 403
     
-        # Recursively delete replies
-        deleted_ids = []
-        def delete_with_replies(cmt):
-            deleted_ids.append(cmt.comment_id)
-            for child in list(cmt.replies):
-                delete_with_replies(child)
-            db.session.delete(cmt)
-
-        delete_with_replies(comment)
+        # Delete the comment and every reply beneath it in one set-based statement
+        deleted_ids = delete_comment_tree(comment.comment_id)
+        comment_count = Posts.increment_counter(str(pid), 'comment_count', -len(deleted_ids))
         db.session.commit()
+        cache.invalidate_post(str(pid))
+        get_broadcasts().update_counters(str(pid), comment_count=comment_count)
 
 
         try:
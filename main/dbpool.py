@@ -0,0 +1,180 @@
+import collections
+import threading
+import time
+from flask import current_app, jsonify
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+# Sized for one eventlet worker: greenlets only hold a connection for the length of a request
+# or socket event, so a few connections serve hundreds of concurrent greenlets
+DB_POOL_SIZE = 10
+DB_MAX_OVERFLOW = 10
+DB_POOL_TIMEOUT = 10
+DB_POOL_RECYCLE = 1800
+
+# Checkout waits kept for the percentiles
+WAIT_SAMPLES = 1024
+
+
+class MonitoredQueuePool(QueuePool):
+    """
+    QueuePool that times how long each checkout waited for a free connection
+    """
+
+    def _do_get(self):
+        stats = self.__dict__.get('wait_stats')
+        if stats is None:
+            # Pools are rebuilt on dispose/recreate, each one starts with fresh stats
+            stats = self.__dict__.setdefault('wait_stats', PoolWaitStats())
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        stats.record(time.perf_counter() - start)
+        return conn
+
+
+class PoolWaitStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.timeouts = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = collections.deque(maxlen=WAIT_SAMPLES)
+
+    def record(self, seconds, timed_out=False):
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+            self.samples.append(seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self):
+        with self._lock:
+            samples = sorted(self.samples)
+            count, total, longest, timeouts = self.count, self.total, self.max, self.timeouts
+
+        def percentile(p):
+            if not samples:
+                return 0.0
+            return samples[min(len(samples) - 1, int(len(samples) * p))] * 1000
+
+        return {
+            'checkouts': count,
+            'timeouts': timeouts,
+            'avg_ms': round(total / count * 1000, 3) if count else 0.0,
+            'p95_ms': round(percentile(0.95), 3),
+            'max_ms': round(longest * 1000, 3)
+        }
+
+
+def is_memory_sqlite(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def engine_options(app):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS built from the DB_POOL_* settings
+    In-memory SQLite keeps Flask-SQLAlchemy's single shared connection and gets no pool sizing
+    """
+    uri = app.config.get('SQLALCHEMY_DATABASE_URI')
+    if not uri or is_memory_sqlite(uri):
+        return {}
+
+    return {
+        'poolclass': MonitoredQueuePool,
+        'pool_size': app.config['DB_POOL_SIZE'],
+        'max_overflow': app.config['DB_MAX_OVERFLOW'],
+        'pool_timeout': app.config['DB_POOL_TIMEOUT'],
+        # Connections older than this are replaced before a server or proxy idle timeout drops them
+        'pool_recycle': app.config['DB_POOL_RECYCLE'],
+        # A cheap round trip on checkout replaces connections that died while idle
+        'pool_pre_ping': app.config['DB_POOL_PRE_PING'],
+    }
+
+
+class PoolMonitor:
+    """
+    Counts pool events of one engine and reports them with the pool's live state
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._lock = threading.Lock()
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.events = {'connects': 0, 'checkouts': 0, 'checkins': 0, 'invalidations': 0}
+
+        event.listen(engine, 'connect', self._on_connect)
+        event.listen(engine, 'checkout', self._on_checkout)
+        event.listen(engine, 'checkin', self._on_checkin)
+        event.listen(engine, 'invalidate', self._on_invalidate)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.events['connects'] += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.events['checkouts'] += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.events['checkins'] += 1
+            self.in_use = max(0, self.in_use - 1)
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.events['invalidations'] += 1
+
+    def snapshot(self):
+        pool = self.engine.pool
+        with self._lock:
+            data = {
+                **self.events,
+                'in_use': self.in_use,
+                'peak_in_use': self.peak_in_use,
+            }
+        data['pool'] = type(pool).__name__
+        if isinstance(pool, QueuePool):
+            data.update({
+                'size': pool.size(),
+                'max_overflow': pool._max_overflow,
+                'timeout': pool.timeout(),
+                'checked_in': pool.checkedin(),
+                'checked_out': pool.checkedout(),
+                # Negative while the pool has not opened pool_size connections yet
+                'overflow': max(0, pool.overflow()),
+            })
+        stats = getattr(pool, 'wait_stats', None)
+        if stats is not None:
+            data['wait'] = stats.snapshot()
+        return data
+
+
+def pool_exhausted(error):
+    # Every connection stayed busy for DB_POOL_TIMEOUT, shed the request instead of a 500
+    response = jsonify({"message": "The server is busy, try again shortly", "status": "error"})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+
+def init_pool_metrics(app, db):
+    with app.app_context():
+        monitors = {key or 'default': PoolMonitor(engine) for key, engine in db.engines.items()}
+    app.extensions['pool_metrics'] = monitors
+    app.register_error_handler(PoolTimeoutError, pool_exhausted)
+
+
+def pool_snapshot():
+    return {name: monitor.snapshot() for name, monitor in current_app.extensions['pool_metrics'].items()}
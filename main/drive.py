@@ -1,33 +1,57 @@
 import cloudinary
 import cloudinary.uploader
 import cloudinary.api
-from flask import current_app
 import os
 from dotenv import load_dotenv
 
-load_dotenv()
+_configured = False
 
-# Cloudinary configuration
-cloudinary.config(
-    cloud_name=os.getenv('CLOUDINARY_CLOUD_NAME'),
-    api_key=os.getenv('CLOUDINARY_API_KEY'),
-    api_secret=os.getenv('CLOUDINARY_API_SECRET'),
-    secure=True
-)
 
-def upload_image_to_drive(image_file, filename):
+def configure_cloudinary():
+    """
+    Configure Cloudinary on first use rather than at import time,
+    so deployments on another storage backend never need the credentials
+    """
+    global _configured
+    if _configured:
+        return
+    load_dotenv()
+    cloudinary.config(
+        cloud_name=os.getenv('CLOUDINARY_CLOUD_NAME'),
+        api_key=os.getenv('CLOUDINARY_API_KEY'),
+        api_secret=os.getenv('CLOUDINARY_API_SECRET'),
+        secure=True
+    )
+    _configured = True
+
+
+def variant_transformation(width, image_format=None):
+    """
+    Cloudinary transformation for a bounded-size derivative, optionally re-encoded (e.g. webp)
+    """
+    transformation = {"width": width, "height": width, "crop": "limit", "quality": "auto"}
+    if image_format:
+        transformation["fetch_format"] = image_format
+    return transformation
+
+
+def upload_image_to_drive(image_file, filename, eager=None):
     """
     Upload image to Cloudinary
     Returns the public_id which can be used to construct URLs
+    `eager` transformations are generated right after upload instead of on first view
     """
+    configure_cloudinary()
     try:
         # Upload image to Cloudinary
         result = cloudinary.uploader.upload(
             image_file,
             folder="blog_images",  # Optional: organize images in a folder
-            public_id=filename.split('.')[0],  # Use filename without extension as public_id
-            overwrite=True,  # Overwrite if file with same name exists
-            resource_type="auto"  # Automatically detect file type
+            public_id=filename.split('.')[0],  # Content hash from main.storage, so equal names mean equal bytes
+            overwrite=False,  # An existing asset with this name already holds the same content
+            resource_type="auto",  # Automatically detect file type
+            eager=eager or None,
+            eager_async=bool(eager)
         )
         
         return result['public_id']
@@ -42,6 +66,7 @@ def get_image_url(public_id):
     """
     if not public_id:
         return None
+    configure_cloudinary()
     
     # Basic URL
     base_url = cloudinary.utils.cloudinary_url(public_id)[0]
@@ -49,13 +74,39 @@ def get_image_url(public_id):
     return base_url
 
 
+def get_image_variant_url(public_id, width, image_format=None):
+    """
+    URL of a resized (and optionally re-encoded) derivative of an uploaded image
+    """
+    if not public_id:
+        return None
+    configure_cloudinary()
+    return cloudinary.utils.cloudinary_url(public_id, **variant_transformation(width, image_format))[0]
+
+
 def delete_image(public_id):
     """
     Delete image from Cloudinary
     """
+    configure_cloudinary()
     try:
         result = cloudinary.uploader.destroy(public_id)
         return result['result'] == 'ok'
     except Exception as e:
         print(f"Error deleting image: {str(e)}")
         return False
+
+
+def public_id_from_url(image_url):
+    """
+    Recover the Cloudinary public_id (folder included) from a delivery URL,
+    for posts stored before image_public_id was recorded
+    """
+    if not image_url or '/upload/' not in image_url:
+        return None
+    path = image_url.split('/upload/', 1)[1]
+    parts = path.split('/')
+    # Skip the optional version segment, e.g. v1712345678
+    if parts and parts[0].startswith('v') and parts[0][1:].isdigit():
+        parts = parts[1:]
+    return '/'.join(parts).rsplit('.', 1)[0] or None
@@ -0,0 +1,381 @@
+import atexit
+import collections
+import glob
+import os
+import threading
+import time
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from . import db, cache
+from .models import Likes, Posts
+
+# Default flush window of the write-behind buffer
+LIKE_FLUSH_INTERVAL_MS = 250
+# Rows per multi-row INSERT/DELETE, 3 parameters per row stays well under driver limits
+LIKE_FLUSH_CHUNK_SIZE = 500
+JOURNAL_SUFFIX = '.journal'
+REPLAY_SUFFIX = '.replay'
+
+# What survives a crash of the worker process:
+# - memory: nothing, likes accepted since the last flush are lost
+# - journal: every accepted like is appended to a local journal before the request returns
+#   and replayed on the next start; lost only if the machine itself goes down
+# - fsync: journal plus an fsync per like, survives power loss at the cost of one disk flush per like
+DURABILITY_MODES = ('memory', 'journal', 'fsync')
+
+
+class LikeBuffer:
+    """
+    Write-behind ingestion of likes for bursts on a single post
+    A like is accepted into memory as the wanted state of its (user, post) pair, so repeated likes,
+    unlikes and double clicks collapse into one entry. Every LIKE_FLUSH_INTERVAL_MS the pending pairs are
+    written in one transaction: multi-row INSERT ... ON CONFLICT DO NOTHING / DELETE ... RETURNING, then
+    one counter UPDATE per post from the rows that actually changed.
+    """
+
+    def __init__(self, app, socketio):
+        self.app = app
+        self.socketio = socketio
+        self.interval = app.config.get('LIKE_FLUSH_INTERVAL_MS', LIKE_FLUSH_INTERVAL_MS) / 1000.0
+        self.durability = app.config.get('LIKE_BUFFER_DURABILITY', 'journal')
+        if self.durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown LIKE_BUFFER_DURABILITY: {self.durability}")
+        self.journal_dir = app.config.get('LIKE_JOURNAL_DIR') or os.path.join(app.instance_path, 'like_journal')
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = {}                          # (user_id, post_id) -> wanted liked state
+        self._delta = collections.Counter()         # post_id -> like_count change of the pending pairs
+        self._inflight = {}                         # pairs of the flush in progress
+        self._inflight_delta = collections.Counter()
+        self._segments = []                         # journal files covered by the pending pairs
+        self._journal = None
+        self._running = False
+        self.metrics = {
+            'accepted': 0,
+            'collapsed': 0,
+            'flushes': 0,
+            'rows_written': 0,
+            'failed_flushes': 0,
+            'last_flush_ms': 0.0,
+        }
+
+        if self.durability != 'memory':
+            os.makedirs(self.journal_dir, exist_ok=True)
+            self._replay()
+            self._open_segment()
+        app.extensions['like_buffer'] = self
+        # Clean shutdowns write what is left, only a crash depends on the durability mode
+        atexit.register(self.close)
+
+    # Journal
+
+    def _open_segment(self):
+        name = f'likes-{os.getpid()}-{time.time_ns()}{JOURNAL_SUFFIX}'
+        path = os.path.join(self.journal_dir, name)
+        self._journal = open(path, 'a', encoding='utf-8')
+        self._segments.append(path)
+
+    def _append(self, user_id, post_id, liked):
+        """
+        Called under _lock. In fsync mode returns a duplicate of the segment's descriptor for _sync:
+        the disk flush runs after the lock is released, and a flush closing the segment meanwhile does not matter
+        """
+        self._journal.write(f'{user_id} {post_id} {int(liked)}\n')
+        self._journal.flush()
+        if self.durability == 'fsync':
+            return os.dup(self._journal.fileno())
+        return None
+
+    @staticmethod
+    def _sync(fd):
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _replay(self):
+        """
+        Take over the journals that exited or crashed processes left behind
+        Each file is claimed with an atomic rename so only one of several starting workers replays it
+        """
+        paths = glob.glob(os.path.join(self.journal_dir, f'*{JOURNAL_SUFFIX}')) \
+            + glob.glob(os.path.join(self.journal_dir, f'*{REPLAY_SUFFIX}'))
+        # Segment names start with the owner pid and a timestamp, replay in the order they were written
+        for path in sorted(paths, key=lambda p: os.path.basename(p).split('-')[2:]):
+            if journal_owner_alive(path):
+                continue
+            claimed = os.path.join(self.journal_dir, f'likes-{os.getpid()}-{time.time_ns()}{REPLAY_SUFFIX}')
+            try:
+                os.rename(path, claimed)
+            except FileNotFoundError:
+                continue
+            with open(claimed, encoding='utf-8') as journal:
+                for line in journal:
+                    parts = line.split()
+                    # A torn last line from the crash is skipped
+                    if len(parts) == 3 and parts[2] in ('0', '1'):
+                        self._pending[(parts[0], parts[1])] = parts[2] == '1'
+            self._segments.append(claimed)
+        if self._pending:
+            self._rebase_replayed()
+        if self._pending:
+            print(f"Replaying {len(self._pending)} buffered like(s) from {self.journal_dir}")
+            self._schedule()
+        else:
+            for path in self._segments:
+                os.remove(path)
+            self._segments = []
+
+    def _rebase_replayed(self):
+        """
+        The journals hold wanted states, some of which the earlier process may have written before it stopped:
+        drop the pairs the database already matches and rebuild the like_count delta of the rest
+        """
+        pairs = list(self._pending)
+        liked = set()
+        with self.app.app_context():
+            for i in range(0, len(pairs), LIKE_FLUSH_CHUNK_SIZE):
+                chunk = pairs[i:i + LIKE_FLUSH_CHUNK_SIZE]
+                rows = db.session.execute(
+                    db.select(Likes.user_id, Likes.post_id).where(
+                        Likes.user_id.in_({user_id for user_id, _ in chunk}),
+                        Likes.post_id.in_({post_id for _, post_id in chunk})
+                    )
+                )
+                liked.update((str(user_id), str(post_id)) for user_id, post_id in rows)
+        for pair in pairs:
+            wanted = self._pending[pair]
+            if wanted == (pair in liked):
+                del self._pending[pair]
+            else:
+                self._delta[pair[1]] += 1 if wanted else -1
+
+    # Ingestion
+
+    def state(self, user_id, post_id):
+        """
+        Liked state of a pair that is not written yet, None when the database is current
+        """
+        key = (str(user_id), str(post_id))
+        with self._lock:
+            return self._pending.get(key, self._inflight.get(key))
+
+    def pending(self, user_id, post_ids):
+        """
+        What reads of post_ids must add to the database until the next flush is written:
+        ({post_id: like_count change}, {post_id: liked state of user_id}), only posts with pending likes
+        """
+        user_id = str(user_id) if user_id is not None else None
+        deltas, states = {}, {}
+        with self._lock:
+            for post_id in map(str, post_ids):
+                delta = self._delta[post_id] + self._inflight_delta[post_id]
+                if delta:
+                    deltas[post_id] = delta
+                key = (user_id, post_id)
+                state = self._pending.get(key, self._inflight.get(key))
+                if state is not None:
+                    states[post_id] = state
+        return deltas, states
+
+    def submit(self, user_id, post_id, liked=None):
+        """
+        Accept a like (liked=True), unlike (False) or toggle (None) without writing it
+        Returns (changed, liked, like_count), like_count includes the pending changes; None when the post does not exist
+        """
+        user_id, post_id = str(user_id), str(post_id)
+        exists = Likes.query.filter_by(user_id=user_id, post_id=post_id).exists()
+        row = db.session.query(Posts.like_count, exists.label('liked')).filter(Posts.post_id == post_id).first()
+        # Nothing is written here, end the read transaction instead of holding its connection
+        db.session.rollback()
+        if row is None:
+            return False, None, None
+
+        key = (user_id, post_id)
+        sync_fd = None
+        with self._lock:
+            current = self._pending.get(key, self._inflight.get(key, bool(row.liked)))
+            wanted = (not current) if liked is None else liked
+            self.metrics['accepted'] += 1
+            changed = wanted != current
+            if changed:
+                if key in self._pending:
+                    self.metrics['collapsed'] += 1
+                self._pending[key] = wanted
+                self._delta[post_id] += 1 if wanted else -1
+                if self._journal is not None:
+                    sync_fd = self._append(user_id, post_id, wanted)
+            else:
+                self.metrics['collapsed'] += 1
+            like_count = (row.like_count or 0) + self._delta[post_id] + self._inflight_delta[post_id]
+        if sync_fd is not None:
+            self._sync(sync_fd)
+        if changed:
+            self._schedule()
+        return changed, wanted, max(0, like_count)
+
+    # Flushing
+
+    def _schedule(self):
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+        self.socketio.start_background_task(self._run)
+
+    def _run(self):
+        # Lives only while likes are pending, the next accepted like starts it again
+        while True:
+            self.socketio.sleep(self.interval)
+            with self._lock:
+                if not self._pending:
+                    self._running = False
+                    return
+            with self.app.app_context():
+                self.flush()
+
+    def flush(self):
+        """
+        Write every pending pair in one transaction, returns the number of Likes rows changed
+        Call inside an app context. On failure the pairs go back to the buffer for the next flush.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch, self._pending = self._pending, {}
+                self._inflight, self._inflight_delta = batch, self._delta
+                self._delta = collections.Counter()
+                segments, self._segments = self._segments, []
+                if self._journal is not None:
+                    # Likes accepted from now on go to a new segment, this one is deleted once written
+                    self._journal.close()
+                    self._open_segment()
+
+            started = time.perf_counter()
+            try:
+                changes, counts = self._write(batch)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Like buffer flush of {len(batch)} pair(s) failed: {str(e)}")
+                with self._lock:
+                    # Newer states accepted meanwhile win over the failed batch
+                    self._pending = {**batch, **self._pending}
+                    self._delta.update(self._inflight_delta)
+                    self._inflight, self._inflight_delta = {}, collections.Counter()
+                    self._segments = segments + self._segments
+                    self.metrics['failed_flushes'] += 1
+                self._schedule()
+                return 0
+
+            written = sum(abs(n) for n in changes.values())
+            with self._lock:
+                self._inflight, self._inflight_delta = {}, collections.Counter()
+                self.metrics['flushes'] += 1
+                self.metrics['rows_written'] += written
+                self.metrics['last_flush_ms'] = round((time.perf_counter() - started) * 1000, 3)
+            for path in segments:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+        self._publish(counts)
+        return written
+
+    def _write(self, batch):
+        """
+        Apply the wanted states, returns the Likes rows changed per post and the new like_count of those posts
+        """
+        # Likes of posts deleted since they were accepted are dropped
+        post_ids = {post_id for _, post_id in batch}
+        live = set(db.session.scalars(db.select(Posts.post_id).where(Posts.post_id.in_(post_ids))))
+        adds = [pair for pair, liked in batch.items() if liked and pair[1] in live]
+        removes = [pair for pair, liked in batch.items() if not liked]
+
+        changes = collections.Counter()
+        for i in range(0, len(adds), LIKE_FLUSH_CHUNK_SIZE):
+            chunk = adds[i:i + LIKE_FLUSH_CHUNK_SIZE]
+            try:
+                with db.session.begin_nested():
+                    created = Likes.add_many(chunk)
+            except IntegrityError:
+                # A post or user was deleted after the check above, write the chunk pair by pair
+                created = []
+                for user_id, post_id in chunk:
+                    try:
+                        with db.session.begin_nested():
+                            if Likes.add(user_id, post_id):
+                                created.append(post_id)
+                    except IntegrityError:
+                        pass
+            changes.update(created)
+        for i in range(0, len(removes), LIKE_FLUSH_CHUNK_SIZE):
+            changes.subtract(Likes.remove_many(removes[i:i + LIKE_FLUSH_CHUNK_SIZE]))
+
+        counts = {
+            post_id: Posts.increment_counter(post_id, 'like_count', delta)
+            for post_id, delta in changes.items() if delta
+        }
+        return changes, counts
+
+    def _publish(self, counts):
+        from .broadcast import get_broadcasts
+        broadcasts = get_broadcasts()
+        for post_id, like_count in counts.items():
+            cache.invalidate_post(post_id)
+            if like_count is not None:
+                broadcasts.update_counters(post_id, like_count=like_count)
+
+    def close(self):
+        with self.app.app_context():
+            self.flush()
+        if self._journal is not None:
+            self._journal.close()
+            # Keep it when the last flush failed, the next start replays it
+            if os.path.exists(self._journal.name) and os.path.getsize(self._journal.name) == 0:
+                os.remove(self._journal.name)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                **self.metrics,
+                'pending': len(self._pending),
+                'interval_ms': int(self.interval * 1000),
+                'durability': self.durability,
+            }
+
+
+def journal_owner_alive(path):
+    """
+    Whether the process that wrote a journal segment is still running (and still owns it)
+    """
+    try:
+        pid = int(os.path.basename(path).split('-')[1])
+    except (IndexError, ValueError):
+        return False
+    if pid == os.getpid():
+        # Left by an earlier process that had our pid, e.g. PID 1 of a restarted container
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def init_like_buffer(app):
+    """
+    Write-behind likes, only when LIKE_WRITE_BEHIND is on
+    """
+    if app.config.get('LIKE_WRITE_BEHIND'):
+        from . import socketio
+        LikeBuffer(app, socketio)
+
+
+def get_like_buffer():
+    return current_app.extensions.get('like_buffer')
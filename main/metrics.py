@@ -0,0 +1,40 @@
+from flask import Blueprint, jsonify
+from flask_jwt_extended import jwt_required
+from .authz import current_principal
+from .broadcast import get_broadcasts
+from .dbpool import pool_snapshot
+from .like_buffer import get_like_buffer
+from .replicas import replica_snapshot
+
+metrics = Blueprint('metrics', __name__)
+
+
+@metrics.route('/realtime/', methods=['GET'])
+@jwt_required()
+def realtime_metrics():
+    principal = current_principal()
+    if not principal or not principal.is_admin():
+        return jsonify({"message": "Only admins can view metrics", "status": "error"}), 403
+
+    return jsonify({"realtime": get_broadcasts().snapshot(), "status": "success"}), 200
+
+
+@metrics.route('/db/', methods=['GET'])
+@jwt_required()
+def db_metrics():
+    principal = current_principal()
+    if not principal or not principal.is_admin():
+        return jsonify({"message": "Only admins can view metrics", "status": "error"}), 403
+
+    return jsonify({"pools": pool_snapshot(), "replicas": replica_snapshot(), "status": "success"}), 200
+
+
+@metrics.route('/likes/', methods=['GET'])
+@jwt_required()
+def like_metrics():
+    principal = current_principal()
+    if not principal or not principal.is_admin():
+        return jsonify({"message": "Only admins can view metrics", "status": "error"}), 403
+
+    buffer = get_like_buffer()
+    return jsonify({"like_buffer": buffer.snapshot() if buffer else None, "status": "success"}), 200
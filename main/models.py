@@ -1,12 +1,24 @@
 from . import db
+from sqlalchemy import tuple_
 from sqlalchemy.sql import func
-import uuid
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import deferred
+from datetime import datetime, timezone
+from .uuids import UUIDType, uuid7
+
+
+def utc_now():
+    # Keyset columns get their value from Python: SQLite's CURRENT_TIMESTAMP has no fractional seconds,
+    # so stored values would not compare as strings against the microsecond values cursors bind
+    return datetime.now(timezone.utc)
 
 
 class Users(db.Model):
     __tablename__ = 'Users'
 
-    user_id = db.Column(db.String(36) , primary_key= True, default=lambda: str(uuid.uuid4()), nullable=False)
+    user_id = db.Column(UUIDType, primary_key= True, default=uuid7, nullable=False)
     username = db.Column(db.String(30), nullable=False, unique = True)
     email = db.Column(db.String(50), unique=True,nullable=False)
     password = db.Column(db.String(120), nullable=False)
@@ -29,50 +41,123 @@ class Users(db.Model):
 class Posts(db.Model):
     __tablename__ = 'Posts'
 
-    post_id = db.Column(db.String(36), primary_key= True, default=lambda: str(uuid.uuid4()), nullable=False)
-    author_id = db.Column(db.String(36), db.ForeignKey(Users.user_id), nullable=False)
+    post_id = db.Column(UUIDType, primary_key= True, default=uuid7, nullable=False)
+    author_id = db.Column(UUIDType, db.ForeignKey(Users.user_id), nullable=False)
     title = db.Column(db.String(80),nullable=False)
     content = db.Column(db.String(1500), nullable=False,unique = True)
     image = db.Column(db.String(255),nullable = True)  
     mimetype = db.Column(db.String(60), nullable = True)
     image_public_id = db.Column(db.String(255), nullable=True)  # Add this field
-    created_at = db.Column(db.DateTime(timezone=True), default=func.now(), nullable=False)
+    image_state = db.Column(db.String(20), nullable=True)  # pending / ready / failed while uploads run off-request
+    image_variants = db.Column(db.JSON, nullable=True)  # resized + webp derivative URLs, see main.storage.VARIANT_SIZES
+    image_job = db.Column(db.String(36), nullable=True)  # spool token of the latest upload, older uploads are superseded
+    like_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Weighted title/content tsvector, maintained by main.search.index_post (unused outside PostgreSQL)
+    search_vector = deferred(db.Column(db.Text().with_variant(TSVECTOR(), 'postgresql'), nullable=True))
+    created_at = db.Column(db.DateTime(timezone=True), default=utc_now, nullable=False)
     updated_at = db.Column(db.DateTime(timezone=True), default=func.now(),onupdate=func.now(),nullable = True)
     author = db.relationship('Users', back_populates='posts')
     comments = db.relationship('Comments', back_populates='post')
     likes = db.relationship('Likes', back_populates='post')
 
+    # Keyset pagination walks the feed in (created_at DESC, post_id) order, the author dashboard the same per author
+    __table_args__ = (
+        db.Index('ix_posts_created_at_post_id', created_at.desc(), post_id),
+        db.Index('ix_posts_author_id_created_at', author_id, created_at.desc(), post_id),
+        db.Index('ix_posts_search_vector', 'search_vector', postgresql_using='gin'),
+    )
+
     def get_like_count(self):
         """Get total number of likes for this post"""
-        return len(self.likes)
+        return self.like_count or 0
     
     def is_liked_by(self, user_id):
         """Check if a specific user has liked this post"""
         return any(like.user_id == user_id for like in self.likes)
 
+    @classmethod
+    def increment_counter(cls, post_id, column, amount=1):
+        """Atomically shift a denormalized counter (UPDATE ... SET col = col + amount), returns the new value"""
+        counter = getattr(cls, column)
+        # Pin updated_at, otherwise its onupdate would mark the post as edited on every like
+        stmt = db.update(cls).where(cls.post_id == post_id).values({counter: counter + amount, cls.updated_at: cls.updated_at})
+        if db.engine.dialect.update_returning:
+            return db.session.execute(stmt.returning(counter)).scalar()
+        db.session.execute(stmt)
+        return db.session.query(counter).filter(cls.post_id == post_id).scalar()
+
+    @classmethod
+    def reconcile_counters(cls):
+        """Recompute like_count/comment_count from the source tables, returns repaired post count"""
+        actual_likes = (
+            db.select(func.count(Likes.like_id))
+            .where(Likes.post_id == cls.post_id)
+            .scalar_subquery()
+        )
+        actual_comments = (
+            db.select(func.count(Comments.comment_id))
+            .where(Comments.post_id == cls.post_id)
+            .scalar_subquery()
+        )
+        result = db.session.execute(
+            db.update(cls)
+            .where((cls.like_count != actual_likes) | (cls.comment_count != actual_comments))
+            .values(like_count=actual_likes, comment_count=actual_comments, updated_at=cls.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return result.rowcount
+
 
 
 class Comments(db.Model):
     __tablename__ = 'Comments'
 
-    comment_id = db.Column(db.String(36), primary_key= True, default=lambda: str(uuid.uuid4()), nullable=False)
-    post_id = db.Column(db.String(36), db.ForeignKey(Posts.post_id), nullable=False)
-    user_id = db.Column(db.String(36), db.ForeignKey(Users.user_id), nullable=False)
+    comment_id = db.Column(UUIDType, primary_key= True, default=uuid7, nullable=False)
+    post_id = db.Column(UUIDType, db.ForeignKey(Posts.post_id), nullable=False)
+    user_id = db.Column(UUIDType, db.ForeignKey(Users.user_id), nullable=False)
     content = db.Column(db.String(500), nullable=False)
-    parent_comment_id = db.Column(db.String(36), db.ForeignKey('Comments.comment_id'), nullable=True)
-    created_at = db.Column(db.DateTime(timezone=True), default=func.now(), nullable=False)
+    parent_comment_id = db.Column(UUIDType, db.ForeignKey('Comments.comment_id'), nullable=True)
+    created_at = db.Column(db.DateTime(timezone=True), default=utc_now, nullable=False)
     updated_at = db.Column(db.DateTime(timezone=True), default=func.now())
     post = db.relationship('Posts', back_populates='comments')
     author = db.relationship('Users', back_populates='comments')
     parent_comment = db.relationship('Comments', remote_side=[comment_id], backref='replies')
 
+    # Threads are read per post and per parent in display order (created_at, comment_id)
+    __table_args__ = (
+        db.Index('ix_comments_post_id_created_at', post_id, created_at, comment_id),
+        db.Index('ix_comments_parent_id_created_at', parent_comment_id, created_at, comment_id),
+        db.Index('ix_comments_user_id', user_id),
+    )
+
+    @classmethod
+    def subtree_cte(cls, seed, max_depth=None):
+        """
+        Recursive CTE of comment ids: the comments matching `seed` plus all their replies at any depth
+        UNION (not UNION ALL) so a corrupted parent cycle still terminates
+        With max_depth the seed rows are depth 0 and the walk stops after depth max_depth
+        """
+        if max_depth is None:
+            subtree = db.select(cls.comment_id).where(seed).cte('subtree', recursive=True)
+            return subtree.union(
+                db.select(cls.comment_id).where(cls.parent_comment_id == subtree.c.comment_id)
+            )
+
+        subtree = db.select(cls.comment_id, db.literal(0).label('depth')).where(seed).cte('subtree', recursive=True)
+        return subtree.union(
+            db.select(cls.comment_id, subtree.c.depth + 1)
+            .where(cls.parent_comment_id == subtree.c.comment_id, subtree.c.depth < max_depth)
+        )
+
 
 class Likes(db.Model):
     __tablename__ = 'Likes'
 
-    like_id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()), nullable=False)
-    user_id = db.Column(db.String(36), db.ForeignKey(Users.user_id), nullable=False)
-    post_id = db.Column(db.String(36), db.ForeignKey(Posts.post_id), nullable=False)
+    like_id = db.Column(UUIDType, primary_key=True, default=uuid7, nullable=False)
+    user_id = db.Column(UUIDType, db.ForeignKey(Users.user_id), nullable=False)
+    post_id = db.Column(UUIDType, db.ForeignKey(Posts.post_id), nullable=False)
     created_at = db.Column(db.DateTime(timezone=True), default=func.now(), nullable=False)
     
     # Relationships
@@ -80,6 +165,116 @@ class Likes(db.Model):
     post = db.relationship('Posts', back_populates='likes')
     
     # Prevent duplicate likes from same user on same post
+    # The unique (user_id, post_id) index only serves lookups by user, per-post deletes and counts need their own
     __table_args__ = (
         db.UniqueConstraint('user_id', 'post_id', name='unique_user_post_like'),
+        db.Index('ix_likes_post_id', 'post_id'),
     )
+
+    @classmethod
+    def add(cls, user_id, post_id):
+        """INSERT ... ON CONFLICT (user_id, post_id) DO NOTHING, True when this call created the like"""
+        values = {'like_id': uuid7(), 'user_id': user_id, 'post_id': post_id}
+        dialect = db.engine.dialect.name
+        if dialect in ('postgresql', 'sqlite'):
+            insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+            stmt = insert(cls).values(values).on_conflict_do_nothing(index_elements=['user_id', 'post_id'])
+            return db.session.execute(stmt).rowcount == 1
+        # No upsert syntax, the unique constraint decides inside a savepoint
+        try:
+            with db.session.begin_nested():
+                db.session.execute(db.insert(cls).values(values))
+        except IntegrityError:
+            return False
+        return True
+
+    @classmethod
+    def remove(cls, user_id, post_id):
+        """DELETE ... RETURNING the like, True when this call removed it"""
+        stmt = db.delete(cls).where(cls.user_id == user_id, cls.post_id == post_id) \
+            .execution_options(synchronize_session=False)
+        if db.engine.dialect.delete_returning:
+            return db.session.execute(stmt.returning(cls.like_id)).first() is not None
+        return db.session.execute(stmt).rowcount > 0
+
+    @classmethod
+    def add_many(cls, pairs):
+        """Multi-row Likes.add for (user_id, post_id) pairs, returns the post_id of every like created"""
+        dialect = db.engine.dialect
+        if dialect.name not in ('postgresql', 'sqlite') or not dialect.insert_returning:
+            return [post_id for user_id, post_id in pairs if cls.add(user_id, post_id)]
+        insert = postgresql.insert if dialect.name == 'postgresql' else sqlite.insert
+        stmt = insert(cls).values([
+            {'like_id': uuid7(), 'user_id': user_id, 'post_id': post_id} for user_id, post_id in pairs
+        ]).on_conflict_do_nothing(index_elements=['user_id', 'post_id']).returning(cls.post_id)
+        return db.session.execute(stmt).scalars().all()
+
+    @classmethod
+    def remove_many(cls, pairs):
+        """Multi-row Likes.remove for (user_id, post_id) pairs, returns the post_id of every like removed"""
+        if not db.engine.dialect.delete_returning:
+            return [post_id for user_id, post_id in pairs if cls.remove(user_id, post_id)]
+        stmt = db.delete(cls).where(tuple_(cls.user_id, cls.post_id).in_(pairs)) \
+            .returning(cls.post_id).execution_options(synchronize_session=False)
+        return db.session.execute(stmt).scalars().all()
+
+
+class MediaOutbox(db.Model):
+    __tablename__ = 'MediaOutbox'
+
+    outbox_id = db.Column(UUIDType, primary_key=True, default=uuid7, nullable=False)
+    public_id = db.Column(db.String(255), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending', index=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.String(500), nullable=True)
+    created_at = db.Column(db.DateTime(timezone=True), default=func.now(), nullable=False)
+    processed_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    # Earliest time a failed removal is retried, NULL when the row is due now
+    next_attempt_at = db.Column(db.DateTime(timezone=True), nullable=True)
+
+
+class MediaBlobs(db.Model):
+    __tablename__ = 'MediaBlobs'
+
+    # Content-addressed: one stored blob per distinct image, shared by every post that uses it
+    public_id = db.Column(db.String(255), primary_key=True, nullable=False)
+    content_hash = db.Column(db.String(64), unique=True, nullable=False)
+    url = db.Column(db.String(255), nullable=False)
+    variants = db.Column(db.JSON, nullable=True)  # {size: {'url': ..., 'webp': ...}}
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime(timezone=True), default=func.now(), nullable=False)
+
+
+class AuthorStats(db.Model):
+    __tablename__ = 'AuthorStats'
+
+    # Materialized dashboard totals for prolific authors, rebuilt by `flask refresh-author-stats`
+    author_id = db.Column(UUIDType, db.ForeignKey(Users.user_id), primary_key=True, nullable=False)
+    post_count = db.Column(db.Integer, nullable=False, default=0)
+    like_count = db.Column(db.Integer, nullable=False, default=0)
+    comment_count = db.Column(db.Integer, nullable=False, default=0)
+    refreshed_at = db.Column(db.DateTime(timezone=True), nullable=False)
+
+    @classmethod
+    def refresh(cls, min_posts=1):
+        """Rebuild the summary rows for every author with at least `min_posts` posts, returns the row count"""
+        refreshed_at = datetime.now(timezone.utc)
+        totals = (
+            db.select(
+                Posts.author_id,
+                func.count(Posts.post_id),
+                func.coalesce(func.sum(Posts.like_count), 0),
+                func.coalesce(func.sum(Posts.comment_count), 0),
+                db.literal(refreshed_at, db.DateTime(timezone=True))
+            )
+            .group_by(Posts.author_id)
+            .having(func.count(Posts.post_id) >= min_posts)
+        )
+        db.session.execute(db.delete(cls))
+        result = db.session.execute(
+            db.insert(cls).from_select(
+                ['author_id', 'post_count', 'like_count', 'comment_count', 'refreshed_at'], totals
+            )
+        )
+        db.session.commit()
+        return result.rowcount
@@ -0,0 +1,105 @@
+from datetime import timedelta
+from . import db
+from .models import MediaBlobs, MediaOutbox, utc_now
+from .storage import get_storage
+
+MAX_ATTEMPTS = 5
+# Failed removals wait RETRY_BASE_DELAY * 2 ** (attempts - 1) seconds, at most RETRY_MAX_DELAY:
+# with MAX_ATTEMPTS = 5 a removal keeps being retried for about 15 minutes of backend outage
+RETRY_BASE_DELAY = 60
+RETRY_MAX_DELAY = 3600
+
+
+def retry_delay(attempts, base_delay=RETRY_BASE_DELAY):
+    return timedelta(seconds=min(base_delay * 2 ** max(attempts - 1, 0), RETRY_MAX_DELAY))
+
+
+def enqueue_media_removal(public_ids):
+    """
+    Queue media removals in the caller's transaction, so they only happen if the delete commits
+    """
+    rows = [{'public_id': public_id} for public_id in public_ids if public_id]
+    if rows:
+        db.session.add_all(MediaOutbox(**row) for row in rows)
+    return len(rows)
+
+
+def claim_blob(public_id):
+    """
+    Delete the blob row of `public_id` if nothing references it, False when the blob is in use again
+    Untracked legacy images have no row and can always be removed
+    """
+    claimed = db.session.execute(
+        db.delete(MediaBlobs)
+        .where(MediaBlobs.public_id == public_id, MediaBlobs.ref_count <= 0)
+        .execution_options(synchronize_session=False)
+    )
+    if claimed.rowcount:
+        return True
+    return db.session.query(MediaBlobs.public_id).filter_by(public_id=public_id).first() is None
+
+
+def process_media_outbox(delete_image=None, batch_size=50, max_attempts=MAX_ATTEMPTS, base_delay=RETRY_BASE_DELAY):
+    """
+    Work through one batch of due removals, returns the number of rows settled (done or cancelled)
+    Rows that failed are pushed back with exponential backoff and do not count
+    `delete_image(public_id) -> bool` defaults to the configured media storage backend
+    """
+    if delete_image is None:
+        delete_image = get_storage().delete
+
+    # SKIP LOCKED lets several workers drain the outbox without claiming the same rows
+    now = utc_now()
+    batch = (
+        MediaOutbox.query
+        .filter(
+            MediaOutbox.status == 'pending',
+            MediaOutbox.next_attempt_at.is_(None) | (MediaOutbox.next_attempt_at <= now)
+        )
+        .order_by(MediaOutbox.created_at.asc())
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+
+    settled = 0
+    for item in batch:
+        # The blob row is deleted in the same savepoint as the file, and only while nothing references it:
+        # the row lock keeps acquire_media from taking the blob back until the removal has committed or rolled back
+        savepoint = db.session.begin_nested()
+        if not claim_blob(item.public_id):
+            savepoint.commit()
+            item.status = 'cancelled'
+            item.processed_at = utc_now()
+            settled += 1
+            continue
+
+        try:
+            removed = delete_image(item.public_id)
+            error = None if removed else "Media backend did not confirm the removal"
+        except Exception as e:
+            removed, error = False, str(e)[:500]
+        if removed:
+            savepoint.commit()
+        else:
+            # The file is still there, give the row back so the blob stays reusable
+            savepoint.rollback()
+
+        item.attempts += 1
+        if removed:
+            item.status = 'done'
+            item.processed_at = utc_now()
+            item.last_error = None
+            item.next_attempt_at = None
+            settled += 1
+        else:
+            item.last_error = error
+            if item.attempts >= max_attempts:
+                item.status = 'failed'
+                item.processed_at = utc_now()
+                item.next_attempt_at = None
+            else:
+                item.next_attempt_at = now + retry_delay(item.attempts, base_delay)
+
+    db.session.commit()
+    return settled
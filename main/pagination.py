@@ -0,0 +1,70 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+
+# Largest page a listing endpoint serves, per_page beyond it is rejected
+MAX_PER_PAGE = 100
+
+
+def _pack(parts):
+    raw = json.dumps(parts)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _unpack(token):
+    padded = token + '=' * (-len(token) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+
+
+def encode_cursor(created_at, row_id):
+    """
+    Encode the (created_at, id) of the last row on a page into an opaque token
+    """
+    return _pack([created_at.isoformat() if created_at else None, row_id])
+
+
+def decode_cursor(token):
+    """
+    Decode a token produced by encode_cursor back into (created_at, id)
+    Raises ValueError when the token is malformed
+    """
+    try:
+        created_at, row_id = _unpack(token)
+        return datetime.fromisoformat(created_at), str(uuid.UUID(row_id))
+    except (TypeError, ValueError, AttributeError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {token}") from e
+
+
+def encode_replies_token(parent_id, created_at=None, row_id=None):
+    """
+    Continuation token for "load more replies": the parent comment and, when resuming
+    a slice, the (created_at, id) of the last reply already sent
+    """
+    return _pack([parent_id, created_at.isoformat() if created_at else None, row_id])
+
+
+def decode_replies_token(token):
+    """
+    Decode a token produced by encode_replies_token into (parent_id, cursor or None)
+    Raises ValueError when the token is malformed
+    """
+    try:
+        parent_id, created_at, row_id = _unpack(token)
+        if not parent_id:
+            raise ValueError("missing parent")
+        cursor = (datetime.fromisoformat(created_at), str(uuid.UUID(row_id))) if created_at else None
+        return str(uuid.UUID(parent_id)), cursor
+    except (TypeError, ValueError, AttributeError, UnicodeError) as e:
+        raise ValueError(f"Invalid replies token: {token}") from e
+
+
+def keyset_filter(created_col, id_col, cursor, descending=True):
+    """
+    Build the WHERE clause that continues a (created_at, id) ordered listing after `cursor`
+    Ties on created_at are broken by id in ascending order
+    """
+    created_at, row_id = cursor
+    if descending:
+        return (created_col < created_at) | ((created_col == created_at) & (id_col > row_id))
+    return (created_col > created_at) | ((created_col == created_at) & (id_col > row_id))
@@ -1,37 +1,44 @@
-from flask import Blueprint, request, jsonify, render_template
+from flask import Blueprint, request, jsonify, render_template, send_from_directory, abort, make_response, current_app
+import hashlib
+import itertools
+from sqlalchemy import func, true
 from sqlalchemy.exc import IntegrityError
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from werkzeug.utils import secure_filename
-from .models import Posts,Users, Comments, Likes
-from . import db
+from .models import Posts,Users, Comments, Likes, AuthorStats, utc_now
+from . import db, cache
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from .drive import upload_image_to_drive, get_image_url, delete_image
+from .pagination import MAX_PER_PAGE, encode_cursor, decode_cursor, keyset_filter
+from .search import apply_search, index_committed_post, index_post, unindex_post
+from .drive import public_id_from_url
+from .storage import LocalStorage, get_storage, release_media
+from .uploads import get_uploads
+from .like_buffer import get_like_buffer
+from .authz import current_principal
+from .uuids import parse_uuid
+from .schemas import (
+    CursorMeta, DashboardPost, DashboardResponse, DashboardTotals, FeedResponse, PageMeta, PostOut,
+    PostResponse, as_utc, json_response
+)
+from .streaming import STREAM_CHUNK_SIZE, ndjson_response, stream_chunk_size, wants_ndjson
 
 post = Blueprint('post', __name__)
 
-def can_manage_post(user_id, post_id=None, post=None):
+# Keeps IN (...) lists well under driver parameter limits during bulk deletes
+DELETE_CHUNK_SIZE = 500
+# Upper bound on the per-post rows returned by the dashboard stats endpoint
+DASHBOARD_MAX_BREAKDOWN = 500
+
+def can_manage_post(principal, post=None, author_id=None):
     """
-    Check if user can manage a post based on their role
+    Check if the caller (see main.authz.current_principal) can manage a post
     - Admin: can manage any post
     - User: can only manage their own posts
+    Pass the loaded `post`, or `author_id` when only the post's author is known.
     """
-    user = Users.query.filter_by(user_id=user_id).first()
-    if not user:
+    if principal is None:
         return False
-    
-    # Admin can manage any post
-    if user.is_admin():
-        return True
-    
-    # User can only manage their own posts
-    if user.is_user():
-        if post:
-            return post.author_id == user_id
-        elif post_id:
-            post_obj = Posts.query.filter_by(post_id=post_id).first()
-            return post_obj and post_obj.author_id == user_id
-    
-    return False
+    return principal.can_manage(post.author_id if post is not None else author_id)
 
 @post.route('/create_post/', methods=['GET','POST'])
 @jwt_required()
@@ -49,28 +56,36 @@ def create_post():
 
         current_user_id = get_jwt_identity()
 
-        image_url = None
-        if image_file and image_file.filename != '':
-            filename = secure_filename(image_file.filename)
-            file_id = upload_image_to_drive(image_file, filename)
-            image_url = get_image_url(file_id)
-           
+        has_image = bool(image_file and image_file.filename != '')
 
         new_post = Posts(
             title=title,
             content=content,
-            image=image_url,
-            mimetype=image_file.mimetype if image_file else None,
+            mimetype=image_file.mimetype if has_image else None,
+            image_state='pending' if has_image else None,
             author_id=current_user_id
         )
 
         try:
             db.session.add(new_post)
+            db.session.flush()
+            index_post(new_post)
+
+            # The image goes to storage in the background, the post is committed right away
+            spooled = None
+            if has_image:
+                spooled = get_uploads().spool(new_post, image_file, secure_filename(image_file.filename))
+
             db.session.commit()
+            index_committed_post(new_post.post_id, title, content)
+            cache.invalidate_feed()
+            if spooled:
+                get_uploads().submit(new_post.post_id, spooled)
             return jsonify(
                 {"message": "New post is added successfully",
                 "status": "success",
-                "post_id": new_post.post_id}
+                "post_id": new_post.post_id,
+                "image_state": new_post.image_state}
                 ), 201
             
         except IntegrityError:
@@ -86,14 +101,13 @@ def create_post():
 @jwt_required()
 def edit_post(id):
     if request.method == 'POST':
-        current_user_id = get_jwt_identity()
         editpost = Posts.query.filter_by(post_id=str(id)).first()
 
         if not editpost:
             return jsonify({"message": "Post not found", "status": "error"}), 404
 
         # Check if user can edit this post
-        if not can_manage_post(current_user_id, post=editpost):
+        if not can_manage_post(current_principal(), post=editpost):
             return jsonify({"message": "Unauthorized to edit this post", "status": "error"}), 403
 
         title = request.form.get('title')
@@ -105,16 +119,25 @@ def edit_post(id):
         if content:
             editpost.content = content
 
+        spooled = None
         if image_file and image_file.filename != '':
-            filename = secure_filename(image_file.filename)
-            file_id = upload_image_to_drive(image_file, filename)
-            editpost.image = get_image_url(file_id)
+            spooled = get_uploads().spool(editpost, image_file, secure_filename(image_file.filename))
+            editpost.image_state = 'pending'
             editpost.mimetype = image_file.mimetype
 
-        editpost.updated_at = datetime.now()
+        editpost.updated_at = utc_now()
+        index_post(editpost)
 
         db.session.commit()
-        return jsonify({"message": "Post is updated successfully", "status": "success"}), 200
+        index_committed_post(editpost.post_id, editpost.title, editpost.content)
+        cache.invalidate_feed()
+        if spooled:
+            get_uploads().submit(editpost.post_id, spooled)
+        return jsonify({
+            "message": "Post is updated successfully",
+            "status": "success",
+            "image_state": editpost.image_state
+        }), 200
 
     if request.method == 'GET':
             return jsonify({"message":"Edit Post","status":"pending"}), 202
@@ -124,37 +147,274 @@ def edit_post(id):
 @jwt_required()
 def delete_post(pid):
     if request.method == 'POST':
-        current_user_id = get_jwt_identity()
         deletepost = Posts.query.filter_by(post_id=str(pid)).first()
 
         if not deletepost:
             return jsonify({"message": "Post not found", "status": "error"}), 404
 
         # Check if user can delete this post
-        if not can_manage_post(current_user_id, post=deletepost):
+        if not can_manage_post(current_principal(), post=deletepost):
             return jsonify({"message": "Unauthorized to delete this post", "status": "error"}), 403
         
-        # Delete all comments associated with this post first
-        Comments.query.filter_by(post_id=str(pid)).delete()
-        
-        # Delete all likes associated with this post
-        Likes.query.filter_by(post_id=str(pid)).delete()
-        
-        if deletepost.image:
-            try:
-                public_id = deletepost.image.split('/')[-1].split('.')[0]
-                delete_image(public_id)
-            except Exception as e:
-                print(f"Error deleting image from Cloudinary: {str(e)}")
-
-        db.session.delete(deletepost)
+        delete_posts(Posts.post_id == str(pid))
         db.session.commit()
+        after_posts_deleted([str(pid)])
         return jsonify({"message": "Post is deleted successfully", "status": "success"}), 200
     
     if request.method == 'GET':
             return jsonify({"message":"Delete the post","status":"pending"}), 202
 
 
+def delete_posts(*criteria):
+    """
+    Set-based delete of the posts matching `criteria` together with their likes and comments
+    Runs in the caller's transaction; images no other post shares are queued in the media outbox
+    Returns the deleted post ids
+    """
+    targets = db.session.query(Posts.post_id, Posts.image, Posts.image_public_id).filter(*criteria).all()
+    post_ids = [t.post_id for t in targets]
+
+    for start in range(0, len(post_ids), DELETE_CHUNK_SIZE):
+        chunk = post_ids[start:start + DELETE_CHUNK_SIZE]
+        Comments.query.filter(Comments.post_id.in_(chunk)).delete(synchronize_session=False)
+        Likes.query.filter(Likes.post_id.in_(chunk)).delete(synchronize_session=False)
+        Posts.query.filter(Posts.post_id.in_(chunk)).delete(synchronize_session=False)
+
+    release_media(t.image_public_id or public_id_from_url(t.image) for t in targets if t.image)
+    return post_ids
+
+
+def after_posts_deleted(post_ids):
+    """
+    Drop deleted posts from the search index and caches once the delete has committed
+    """
+    for post_id in post_ids:
+        unindex_post(post_id)
+        cache.invalidate_post(post_id)
+    if post_ids:
+        cache.invalidate_feed()
+
+
+@post.route('/bulk_delete/', methods=['POST'])
+@jwt_required()
+def bulk_delete_posts():
+    principal = current_principal()
+    if not principal or not principal.is_admin():
+        return jsonify({"message": "Only admins can bulk delete posts", "status": "error"}), 403
+
+    post_ids = request.form.getlist('post_ids')
+    author_id = request.form.get('author_id')
+    created_after = request.form.get('created_after')
+    created_before = request.form.get('created_before')
+
+    # Ids are bound as UUIDs, anything else is rejected up front instead of failing in the query
+    parsed_ids = [parse_uuid(pid) for pid in post_ids]
+    if None in parsed_ids or (author_id and not parse_uuid(author_id)):
+        return jsonify({"message": "post_ids and author_id must be UUIDs", "status": "error"}), 400
+
+    criteria = []
+    if parsed_ids:
+        criteria.append(Posts.post_id.in_(parsed_ids))
+    if author_id:
+        criteria.append(Posts.author_id == parse_uuid(author_id))
+    try:
+        if created_after:
+            criteria.append(Posts.created_at >= datetime.fromisoformat(created_after))
+        if created_before:
+            criteria.append(Posts.created_at < datetime.fromisoformat(created_before))
+    except ValueError:
+        return jsonify({"message": "Dates must be in ISO 8601 format", "status": "error"}), 400
+
+    if not criteria:
+        return jsonify({"message": "Provide post_ids, author_id or a date range", "status": "error"}), 400
+
+    deleted_ids = delete_posts(*criteria)
+    db.session.commit()
+    after_posts_deleted(deleted_ids)
+
+    return jsonify({
+        "message": f"{len(deleted_ids)} post(s) deleted successfully",
+        "status": "success",
+        "deleted_count": len(deleted_ids),
+        "post_ids": deleted_ids
+    }), 200
+
+
+def serialize_post_base(post, author_username):
+    """
+    Viewer-independent fields of a post, shared by the feed and the single-post endpoint
+    """
+    return {
+        'post_id': post.post_id,
+        'author_id': post.author_id,
+        'author_username': author_username or "Unknown",
+        'title': post.title,
+        'content': post.content,
+        'image_url': post.image,
+        'image_variants': post.image_variants,
+        'mimetype': post.mimetype,
+        'created_at': as_utc(post.created_at),
+        'updated_at': as_utc(post.updated_at)
+    }
+
+
+def overlay_viewer(base, counters, principal, is_liked):
+    """
+    Add the aggregates and the viewer-specific flags to a serialized post
+    """
+    can_manage = can_manage_post(principal, author_id=base['author_id'])
+    return PostOut(
+        **base,
+        is_owner=principal is not None and base['author_id'] == principal.user_id,
+        can_edit=can_manage,
+        can_delete=can_manage,
+        like_count=counters.get('like_count', 0),
+        comment_count=counters.get('comment_count', 0),
+        is_liked=bool(is_liked)
+    )
+
+
+def load_post_aggregates(post_ids):
+    """
+    Read the denormalized like/comment counters for a set of posts
+    """
+    rows = db.session.query(Posts.post_id, Posts.like_count, Posts.comment_count).filter(
+        Posts.post_id.in_(post_ids)
+    )
+    return {
+        post_id: {'like_count': like_count or 0, 'comment_count': comment_count or 0}
+        for post_id, like_count, comment_count in rows
+    }
+
+
+def apply_pending_likes(user_id, post_ids, aggregates, liked_ids):
+    """
+    Fold the likes the write-behind buffer accepted but has not written yet into the counters and the
+    viewer's liked set, so a liker reads back their own like. Returns new (aggregates, liked_ids)
+    """
+    buffer = get_like_buffer()
+    if buffer is None or not post_ids:
+        return aggregates, liked_ids
+    deltas, states = buffer.pending(user_id, post_ids)
+    if deltas:
+        aggregates = dict(aggregates)
+        for post_id, delta in deltas.items():
+            counters = aggregates.get(post_id, {})
+            aggregates[post_id] = {**counters, 'like_count': max(0, counters.get('like_count', 0) + delta)}
+    if states:
+        liked_ids = {post_id for post_id in liked_ids if states.get(post_id, True)} \
+            | {post_id for post_id, liked in states.items() if liked}
+    return aggregates, liked_ids
+
+
+def load_feed_page(search_query, page, per_page, cursor=None):
+    """
+    Build the viewer-independent part of a feed page: (posts, meta)
+    `cursor` switches to keyset mode ('' for the first page), raises ValueError when malformed
+    """
+    # --- Base Query: posts with their author in one statement ---
+    query = (
+        db.session.query(Posts, Users.username.label('author_username'))
+        .outerjoin(Users, Users.user_id == Posts.author_id)
+    )
+
+    # --- Full-Text Search (tsvector on PostgreSQL, inverted index elsewhere) ---
+    rank = None
+    if search_query:
+        query, rank = apply_search(query, search_query)
+    # --- Paginate & Order ---
+    if cursor is not None:
+        # Keyset mode: no COUNT(*) and no OFFSET scan, walks ix_posts_created_at_post_id
+        if cursor:
+            query = query.filter(keyset_filter(Posts.created_at, Posts.post_id, decode_cursor(cursor)))
+
+        rows = query.order_by(Posts.created_at.desc(), Posts.post_id.asc()).limit(per_page + 1).all()
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        last_post = rows[-1][0] if rows else None
+
+        meta = CursorMeta(
+            per_page=per_page,
+            has_next=has_next,
+            next_cursor=encode_cursor(last_post.created_at, last_post.post_id) if has_next else None
+        )
+    else:
+        ordering = [Posts.created_at.desc()] if rank is None else [rank, Posts.created_at.desc()]
+        pagination = query.order_by(*ordering).paginate(page=page, per_page=per_page)
+        rows = pagination.items
+
+        # --- Metadata for Pagination ---
+        meta = PageMeta(
+            page=pagination.page,
+            per_page=pagination.per_page,
+            total_pages=pagination.pages,
+            total_items=pagination.total,
+            has_next=pagination.has_next,
+            has_prev=pagination.has_prev
+        )
+
+    posts_list = [serialize_post_base(post, author_username) for post, author_username in rows]
+
+    # The counters were read with the page anyway, prime the aggregate cache with them
+    cache.set_post_aggregates({
+        post.post_id: {'like_count': post.like_count or 0, 'comment_count': post.comment_count or 0}
+        for post, _ in rows
+    })
+
+    return posts_list, meta
+
+
+def iter_post_chunks(search_query='', cursor=None, limit=None, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Yield the feed as lists of column rows (post fields + author_username), chunk_size at a time
+    Rows come off a server-side cursor and no ORM objects are kept, so memory is bounded by one chunk
+    """
+    stmt = (
+        db.select(
+            Posts.post_id, Posts.author_id, Posts.title, Posts.content, Posts.image, Posts.image_variants,
+            Posts.mimetype, Posts.like_count, Posts.comment_count, Posts.created_at, Posts.updated_at,
+            Users.username.label('author_username')
+        )
+        .outerjoin(Users, Users.user_id == Posts.author_id)
+    )
+
+    rank = None
+    if search_query:
+        stmt, rank = apply_search(stmt, search_query)
+    if cursor:
+        stmt = stmt.where(keyset_filter(Posts.created_at, Posts.post_id, decode_cursor(cursor)))
+    ordering = [Posts.created_at.desc(), Posts.post_id.asc()]
+    stmt = stmt.order_by(*([rank] + ordering if rank is not None else ordering))
+    if limit:
+        stmt = stmt.limit(limit)
+
+    result = db.session.execute(stmt, execution_options={'yield_per': chunk_size})
+    yield from result.partitions()
+
+
+def stream_feed(chunks, principal):
+    """
+    Viewer-specific feed records, one likes lookup per chunk
+    """
+    for rows in chunks:
+        post_ids = [row.post_id for row in rows]
+        liked_ids = {
+            row.post_id for row in
+            Likes.query.with_entities(Likes.post_id).filter(
+                Likes.user_id == principal.user_id,
+                Likes.post_id.in_(post_ids)
+            )
+        } if principal else set()
+        aggregates = {
+            row.post_id: {'like_count': row.like_count or 0, 'comment_count': row.comment_count or 0} for row in rows
+        }
+        aggregates, liked_ids = apply_pending_likes(principal.user_id if principal else None, post_ids,
+                                                    aggregates, liked_ids)
+        for row in rows:
+            yield overlay_viewer(serialize_post_base(row, row.author_username), aggregates[row.post_id],
+                                 principal, row.post_id in liked_ids)
+
+
 @post.route('/view_post/', methods=['GET'])
 @jwt_required()
 def all_post():
@@ -164,92 +424,327 @@ def all_post():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 3, type=int)
     search_query = request.args.get('search', '', type=str).strip()
+    cursor = request.args.get('cursor', '', type=str).strip() if 'cursor' in request.args else None
 
-    # --- Base Query ---
-    query = Posts.query
+    # --- Streaming export: every matching post as NDJSON, no page buffered in memory ---
+    if wants_ndjson():
+        chunks = iter_post_chunks(search_query, cursor, request.args.get('limit', type=int), stream_chunk_size())
+        try:
+            # Start the query now so a bad cursor is still reported as a 400
+            first = next(chunks, [])
+        except ValueError:
+            return jsonify({"message": "Invalid cursor", "status": "error"}), 400
+        return ndjson_response(stream_feed(itertools.chain([first], chunks), current_principal()))
+
+    if not 1 <= per_page <= MAX_PER_PAGE:
+        return jsonify({"message": f"per_page must be between 1 and {MAX_PER_PAGE}", "status": "error"}), 400
+
+    # --- Shared base page, cached until the next post create/edit/delete ---
+    try:
+        base_posts, meta = cache.get_feed_page(
+            ('feed', search_query, page, per_page, cursor),
+            lambda: load_feed_page(search_query, page, per_page, cursor)
+        )
+    except ValueError:
+        return jsonify({"message": "Invalid cursor", "status": "error"}), 400
+
+    post_ids = [p['post_id'] for p in base_posts]
+    aggregates = cache.get_post_aggregates(post_ids, load_post_aggregates) if post_ids else {}
+
+    # --- Per-viewer overlay: role resolved once, likes checked with one query ---
+    principal = current_principal()
+    liked_ids = set()
+    if post_ids:
+        liked_ids = {
+            row.post_id for row in
+            Likes.query.with_entities(Likes.post_id).filter(
+                Likes.user_id == current_user_id,
+                Likes.post_id.in_(post_ids)
+            )
+        }
+    aggregates, liked_ids = apply_pending_likes(current_user_id, post_ids, aggregates, liked_ids)
+
+    posts_list = [
+        overlay_viewer(base, aggregates.get(base['post_id'], {}), principal, base['post_id'] in liked_ids)
+        for base in base_posts
+    ]
+
+    return json_response(FeedResponse(posts=posts_list, meta=meta))
+
+
+def post_etag(post_id, updated_at, like_count, comment_count, image_state, viewer_id, pending_like=None):
+    """
+    Validator for a single post as seen by one viewer; changes whenever an edit or a counter does
+    `pending_like` is the viewer's like still waiting in the write-behind buffer, if any
+    """
+    raw = f"{post_id}|{updated_at.isoformat() if updated_at else ''}|{like_count}|{comment_count}|{image_state}|{viewer_id}"
+    if pending_like is not None:
+        raw += f"|{pending_like}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
 
-    # --- Full-Text Search (PostgreSQL) ---
-    if search_query:
-        query = query.filter(
-            (Posts.title.ilike(f'%{search_query}%')) |
-            (Posts.content.ilike(f'%{search_query}%'))
+
+@post.route('/<uuid:id>/', methods=['GET'])
+@jwt_required()
+def get_post(id):
+    current_user_id = get_jwt_identity()
+
+    # One narrow read of the Posts row decides whether the client's copy is still fresh
+    head = db.session.query(
+        Posts.updated_at, Posts.like_count, Posts.comment_count, Posts.image_state
+    ).filter(Posts.post_id == str(id)).first()
+    if not head:
+        return jsonify({"message": "Post not found", "status": "error"}), 404
+
+    # Likes accepted by the write-behind buffer count as soon as they are accepted
+    buffer = get_like_buffer()
+    deltas, states = buffer.pending(current_user_id, [str(id)]) if buffer else ({}, {})
+    like_delta, pending_like = deltas.get(str(id), 0), states.get(str(id))
+
+    etag = post_etag(str(id), head.updated_at, max(0, head.like_count + like_delta), head.comment_count,
+                     head.image_state, current_user_id, pending_like)
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+    else:
+        row = (
+            db.session.query(Posts, Users.username)
+            .outerjoin(Users, Users.user_id == Posts.author_id)
+            .filter(Posts.post_id == str(id))
+            .first()
         )
-    # --- Paginate & Order ---
-    pagination = query.order_by(Posts.created_at.desc()).paginate(page=page, per_page=per_page)
-    posts_list = []
-
-    for post in pagination.items:
-        user = Users.query.get(post.author_id)
-        posts_list.append({
-            'post_id': post.post_id,
-            'author_id': post.author_id,
-            'author_username': user.username if user else "Unknown",
-            'title': post.title,
-            'content': post.content,
-            'image_url': post.image,
-            'mimetype': post.mimetype,
-            'created_at': post.created_at,
-            'updated_at': post.updated_at,
-            'is_owner': post.author_id == current_user_id,
-            'can_edit': can_manage_post(current_user_id, post=post),
-            'can_delete': can_manage_post(current_user_id, post=post),
-            'like_count': post.get_like_count(),
-            'is_liked': post.is_liked_by(current_user_id)
-        })
-
-    # --- Metadata for Pagination ---
-    meta = {
-        "page": pagination.page,
-        "per_page": pagination.per_page,
-        "total_pages": pagination.pages,
-        "total_items": pagination.total,
-        "has_next": pagination.has_next,
-        "has_prev": pagination.has_prev
-    }
+        post_obj, author_username = row
+        is_liked = pending_like
+        if is_liked is None:
+            is_liked = db.session.query(
+                Likes.query.filter_by(user_id=current_user_id, post_id=str(id)).exists()
+            ).scalar()
+        counters = {
+            'like_count': max(0, (post_obj.like_count or 0) + like_delta),
+            'comment_count': post_obj.comment_count or 0
+        }
+
+        response = json_response(PostResponse(
+            post=overlay_viewer(serialize_post_base(post_obj, author_username), counters,
+                                current_principal(), is_liked)
+        ))
+
+    response.set_etag(etag)
+    # Per-viewer fields: never share between users, always revalidate
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('Authorization')
+    return response
+
+
+def set_like(post_id, user_id, liked):
+    """
+    Bring the user's like of a post to `liked` in one transaction
+    The INSERT ... ON CONFLICT DO NOTHING / DELETE ... RETURNING tells whether this request changed anything,
+    so concurrent requests never fail on unique_user_post_like and the counter only moves for the winner
+    Returns (changed, like_count), like_count is None when the post does not exist
+    """
+    try:
+        changed = Likes.add(user_id, post_id) if liked else Likes.remove(user_id, post_id)
+        if changed:
+            like_count = Posts.increment_counter(post_id, 'like_count', 1 if liked else -1)
+        else:
+            row = db.session.query(Posts.like_count).filter(Posts.post_id == post_id).first()
+            like_count = None if row is None else row.like_count or 0
+    except IntegrityError:
+        # Foreign key violation: the post does not exist (or was deleted meanwhile)
+        like_count = None
+    if like_count is None:
+        db.session.rollback()
+        return False, None
+
+    db.session.commit()
+    if changed:
+        cache.invalidate_post(post_id)
+    return changed, like_count
+
+
+def like_result(liked, like_count, message, code=200):
+    return jsonify({"message": message, "status": "success", "liked": liked, "like_count": like_count}), code
+
+
+def buffered_like(post_id, liked):
+    """
+    Hand the like to the write-behind buffer, None when write-behind is off
+    """
+    buffer = get_like_buffer()
+    if buffer is None:
+        return None
+    changed, liked, like_count = buffer.submit(get_jwt_identity(), str(post_id), liked)
+    if like_count is None:
+        return jsonify({"message": "Post not found", "status": "error"}), 404
+    if not changed:
+        return like_result(liked, like_count, "Post already liked" if liked else "Post was not liked")
+    if liked:
+        return like_result(True, like_count, "Post liked successfully", 201)
+    return like_result(False, like_count, "Post unliked successfully")
 
-    return jsonify({"posts": posts_list, "meta": meta}), 200
+
+@post.route('/<uuid:post_id>/like/', methods=['PUT'])
+@jwt_required()
+def put_like(post_id):
+    buffered = buffered_like(post_id, True)
+    if buffered is not None:
+        return buffered
+    changed, like_count = set_like(str(post_id), get_jwt_identity(), liked=True)
+    if like_count is None:
+        return jsonify({"message": "Post not found", "status": "error"}), 404
+    if changed:
+        return like_result(True, like_count, "Post liked successfully", 201)
+    return like_result(True, like_count, "Post already liked")
+
+
+@post.route('/<uuid:post_id>/like/', methods=['DELETE'])
+@jwt_required()
+def delete_like(post_id):
+    buffered = buffered_like(post_id, False)
+    if buffered is not None:
+        return buffered
+    changed, like_count = set_like(str(post_id), get_jwt_identity(), liked=False)
+    if like_count is None:
+        return jsonify({"message": "Post not found", "status": "error"}), 404
+    return like_result(False, like_count, "Post unliked successfully" if changed else "Post was not liked")
 
 
 @post.route('/like_post/<uuid:post_id>/', methods=['POST'])
 @jwt_required()
 def like_post(post_id):
+    """
+    Toggle kept for older clients, prefer PUT/DELETE /post/<id>/like/ which are idempotent
+    """
+    buffered = buffered_like(post_id, None)
+    if buffered is not None:
+        return buffered
     current_user_id = get_jwt_identity()
-    
-    # Check if post exists
-    post = Posts.query.filter_by(post_id=str(post_id)).first()
-    if not post:
+    changed, like_count = set_like(str(post_id), current_user_id, liked=False)
+    if like_count is None:
         return jsonify({"message": "Post not found", "status": "error"}), 404
-    
-    # Check if user already liked this post
-    existing_like = Likes.query.filter_by(
-        user_id=current_user_id, 
-        post_id=str(post_id)
-    ).first()
-    
-    if existing_like:
-        # Unlike the post
-        db.session.delete(existing_like)
-        db.session.commit()
-        return jsonify({
-            "message": "Post unliked successfully", 
-            "status": "success",
-            "liked": False,
-            "like_count": post.get_like_count()
-        }), 200
-    else:
-        # Like the post
-        new_like = Likes(
-            user_id=current_user_id,
-            post_id=str(post_id)
+    if changed:
+        return like_result(False, like_count, "Post unliked successfully")
+
+    changed, like_count = set_like(str(post_id), current_user_id, liked=True)
+    if like_count is None:
+        return jsonify({"message": "Post not found", "status": "error"}), 404
+    return like_result(True, like_count, "Post liked successfully", 201)
+
+
+def load_author_dashboard(author_id, limit, max_age):
+    """
+    Totals and a per-post breakdown for one author's posts, in a single statement
+    Totals come from AuthorStats when its row is younger than `max_age` seconds; the live
+    aggregate is guarded by NOT EXISTS (summary) so the database skips it in that case
+    Returns (totals, posts)
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=max_age)
+    summary = (
+        db.select(AuthorStats.post_count, AuthorStats.like_count, AuthorStats.comment_count, AuthorStats.refreshed_at)
+        .where(AuthorStats.author_id == author_id, AuthorStats.refreshed_at >= cutoff)
+        .subquery('summary')
+    )
+    live = (
+        db.select(
+            func.count(Posts.post_id).label('post_count'),
+            func.coalesce(func.sum(Posts.like_count), 0).label('like_count'),
+            func.coalesce(func.sum(Posts.comment_count), 0).label('comment_count')
         )
-        db.session.add(new_like)
-        db.session.commit()
-        return jsonify({
-            "message": "Post liked successfully", 
-            "status": "success",
-            "liked": True,
-            "like_count": post.get_like_count()
-        }), 201
+        .where(Posts.author_id == author_id, ~db.select(summary.c.post_count).exists())
+        .subquery('live')
+    )
+    breakdown = (
+        db.select(Posts.post_id, Posts.title, Posts.created_at, Posts.like_count, Posts.comment_count)
+        .where(Posts.author_id == author_id)
+        .order_by(Posts.created_at.desc(), Posts.post_id)
+        .limit(limit)
+        .subquery('breakdown')
+    )
+
+    # live always yields exactly one row, so the totals survive an author with no posts
+    rows = db.session.execute(
+        db.select(
+            func.coalesce(summary.c.post_count, live.c.post_count).label('total_posts'),
+            func.coalesce(summary.c.like_count, live.c.like_count).label('total_likes'),
+            func.coalesce(summary.c.comment_count, live.c.comment_count).label('total_comments'),
+            summary.c.refreshed_at,
+            breakdown.c.post_id, breakdown.c.title, breakdown.c.created_at,
+            breakdown.c.like_count, breakdown.c.comment_count
+        )
+        .select_from(live)
+        .outerjoin(summary, true())
+        .outerjoin(breakdown, true())
+        .order_by(breakdown.c.created_at.desc(), breakdown.c.post_id)
+    ).all()
+
+    first = rows[0]
+    totals = DashboardTotals(
+        posts=first.total_posts or 0,
+        likes=first.total_likes or 0,
+        comments=first.total_comments or 0,
+        source='summary' if first.refreshed_at is not None else 'live',
+        refreshed_at=as_utc(first.refreshed_at)
+    )
+    posts_list = [
+        DashboardPost(
+            post_id=row.post_id,
+            title=row.title,
+            created_at=as_utc(row.created_at),
+            like_count=row.like_count or 0,
+            comment_count=row.comment_count or 0
+        )
+        for row in rows if row.post_id is not None
+    ]
+    return totals, posts_list
+
+
+@post.route('/dashboard/stats/', methods=['GET'])
+@jwt_required()
+def dashboard_stats():
+    current_user_id = get_jwt_identity()
+    author_id = parse_uuid(request.args.get('author_id', current_user_id, type=str))
+    limit = request.args.get('limit', 20, type=int)
+
+    if author_id is None:
+        return jsonify({"message": "author_id must be a UUID", "status": "error"}), 400
+
+    if author_id != current_user_id:
+        principal = current_principal()
+        if not principal or not principal.is_admin():
+            return jsonify({"message": "Only admins can view other authors' stats", "status": "error"}), 403
+    if limit < 0 or limit > DASHBOARD_MAX_BREAKDOWN:
+        return jsonify({"message": f"limit must be between 0 and {DASHBOARD_MAX_BREAKDOWN}", "status": "error"}), 400
+
+    totals, posts_list = load_author_dashboard(
+        author_id, limit, current_app.config.get('DASHBOARD_STATS_MAX_AGE', 900)
+    )
+    return json_response(DashboardResponse(author_id=author_id, totals=totals, posts=posts_list))
+
+
+@post.route('/<uuid:id>/image_status/', methods=['GET'])
+@jwt_required()
+def image_status(id):
+    post_row = db.session.query(Posts.post_id, Posts.image, Posts.image_variants, Posts.image_state).filter(
+        Posts.post_id == str(id)
+    ).first()
+    if not post_row:
+        return jsonify({"message": "Post not found", "status": "error"}), 404
+
+    return jsonify({
+        "post_id": post_row.post_id,
+        "image_state": post_row.image_state,
+        "image_url": post_row.image,
+        "image_variants": post_row.image_variants,
+        "status": "success"
+    }), 200
+
+
+@post.route('/media/<path:public_id>', methods=['GET'])
+def media(public_id):
+    # Only served when images live on the local filesystem backend
+    storage = get_storage()
+    if not isinstance(storage, LocalStorage):
+        abort(404)
+    return send_from_directory(storage.root, public_id)
 
 
 # Add these routes to render templates
@@ -0,0 +1,99 @@
+import json
+import queue
+import threading
+import socketio as socketio_server
+
+# SOCKETIO_MESSAGE_QUEUE values with this scheme use the in-process broker below
+IN_PROCESS_SCHEME = 'memory://'
+
+
+class InProcessBroker:
+    """
+    Fan-out pub/sub inside one process: every subscriber of a channel gets every message
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}  # channel -> [queue.Queue]
+
+    def subscribe(self, channel):
+        inbox = queue.Queue()
+        with self._lock:
+            self._subscribers.setdefault(channel, []).append(inbox)
+        return inbox
+
+    def publish(self, channel, message):
+        with self._lock:
+            inboxes = list(self._subscribers.get(channel, ()))
+        for inbox in inboxes:
+            inbox.put(message)
+
+
+_brokers = {}
+_brokers_lock = threading.Lock()
+
+
+def get_broker(url):
+    """
+    The broker named by a memory:// URL, so several servers built in one process can share it
+    """
+    with _brokers_lock:
+        return _brokers.setdefault(url, InProcessBroker())
+
+
+class InProcessManager(socketio_server.PubSubManager):
+    """
+    Stand-in for the Redis/AMQP client managers in tests and load tests
+    Messages are JSON encoded like on a real queue, so unserializable payloads fail the same way
+    """
+
+    name = 'inprocess'
+
+    def __init__(self, url=IN_PROCESS_SCHEME, channel='flask-socketio', write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.broker = get_broker(url)
+        # Subscribe now, messages published before the listener thread starts are kept
+        self.inbox = None if write_only else self.broker.subscribe(channel)
+
+    def _publish(self, data):
+        self.broker.publish(self.channel, json.dumps(data))
+
+    def _listen(self):
+        while True:
+            yield self.inbox.get()
+
+
+def init_socketio(app):
+    """
+    Attach the shared SocketIO instance to the app and register the event handlers
+    - SOCKETIO_ASYNC_MODE: eventlet (default), threading, ...
+    - SOCKETIO_MESSAGE_QUEUE: redis:// / amqp:// / kafka:// URL shared by every worker process,
+      memory:// for the in-process stand-in, unset for a single process
+    """
+    from . import socketio
+
+    options = {
+        'async_mode': app.config.get('SOCKETIO_ASYNC_MODE') or None,
+        'cors_allowed_origins': app.config.get('SOCKETIO_CORS_ORIGINS'),
+    }
+    url = app.config.get('SOCKETIO_MESSAGE_QUEUE')
+    channel = app.config.get('SOCKETIO_CHANNEL', 'flask-socketio')
+    if url and url.startswith(IN_PROCESS_SCHEME):
+        options['client_manager'] = InProcessManager(url, channel=channel)
+    elif url:
+        options['message_queue'] = url
+        options['channel'] = channel
+
+    previous = socketio.server
+    socketio.init_app(app, **options)
+    if previous is not None:
+        # socket_event registers its handlers on import, once per process: move them to this app's server
+        for namespace, handlers in previous.handlers.items():
+            for event, handler in handlers.items():
+                socketio.server.on(event, handler, namespace=namespace)
+
+    from .broadcast import init_broadcasts
+    init_broadcasts(app)
+
+    # Handlers attach themselves to the shared instance on import
+    from . import socket_event  # noqa: F401
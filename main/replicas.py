@@ -0,0 +1,249 @@
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from flask import current_app, has_request_context, request, session as flask_session
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.selectable import GenerativeSelect
+
+REPLICA_BIND_PREFIX = 'replica_'
+# Seconds a replica's health is trusted before the next SELECT 1
+REPLICA_HEALTH_INTERVAL = 10
+# Seconds a user's reads stay on the primary after their own write, longer than the usual replication lag
+READ_YOUR_WRITES_WINDOW = 5
+
+READ_METHODS = ('GET', 'HEAD')
+
+
+def replica_binds(urls):
+    """
+    SQLALCHEMY_BINDS entries for a comma separated list of replica URLs
+    """
+    urls = [url.strip() for url in (urls or '').split(',') if url.strip()]
+    return {f'{REPLICA_BIND_PREFIX}{i}': url for i, url in enumerate(urls)}
+
+
+class ReplicaRouter:
+    """
+    Picks the replica engine for read-only requests: round-robin over the replicas that passed
+    their last health check, None when there is none so the caller stays on the primary
+    """
+
+    def __init__(self, engines, health_interval=REPLICA_HEALTH_INTERVAL, sticky=None):
+        self.engines = dict(engines)
+        self.health_interval = health_interval
+        # Read-your-writes markers, their own store so they work whatever the feed cache is
+        self.sticky = sticky
+        self._lock = threading.Lock()
+        self._order = itertools.cycle(sorted(self.engines))
+        # Unknown replicas are checked on first use
+        self._state = {key: {'healthy': None, 'checked_at': 0.0, 'reads': 0, 'errors': 0} for key in self.engines}
+        self.primary_reads = 0
+
+        for key, engine in self.engines.items():
+            event.listen(engine, 'handle_error', self._error_listener(key))
+
+    def _error_listener(self, key):
+        def on_error(context):
+            # A replica that drops connections or refuses them is skipped until its next health check
+            # (no connection means the connect itself failed), a bad statement does not count
+            if context.is_disconnect or context.connection is None:
+                self.mark_down(key)
+        return on_error
+
+    def mark_down(self, key):
+        with self._lock:
+            state = self._state[key]
+            state['healthy'] = False
+            state['errors'] += 1
+            state['checked_at'] = time.monotonic()
+
+    def _check(self, key):
+        try:
+            with self.engines[key].connect() as conn:
+                conn.exec_driver_sql('SELECT 1')
+            healthy = True
+        except DBAPIError:
+            # Counted by the handle_error listener
+            healthy = False
+        with self._lock:
+            state = self._state[key]
+            state['healthy'] = healthy
+            state['checked_at'] = time.monotonic()
+        return healthy
+
+    def is_healthy(self, key):
+        with self._lock:
+            state = self._state[key]
+            due = time.monotonic() - state['checked_at'] >= self.health_interval
+            if due:
+                # Claim the check so concurrent requests keep using the last result meanwhile
+                state['checked_at'] = time.monotonic()
+            healthy = state['healthy']
+        if due:
+            return self._check(key)
+        return bool(healthy)
+
+    def pick(self):
+        for _ in range(len(self.engines)):
+            with self._lock:
+                key = next(self._order)
+            if self.is_healthy(key):
+                with self._lock:
+                    self._state[key]['reads'] += 1
+                return key, self.engines[key]
+        with self._lock:
+            self.primary_reads += 1
+        return None, None
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                'replicas': {
+                    key: {
+                        'healthy': state['healthy'],
+                        'checked_ago_s': round(now - state['checked_at'], 1) if state['checked_at'] else None,
+                        'sessions': state['reads'],
+                        'errors': state['errors'],
+                    }
+                    for key, state in self._state.items()
+                },
+                'primary_fallbacks': self.primary_reads,
+            }
+
+
+def _sticky_key(user_id):
+    return f'rw:{user_id}'
+
+
+def current_user_id():
+    """
+    Id of the caller when the request carries a verified token or the socket authenticated on connect
+    """
+    try:
+        identity = get_jwt_identity()
+    except RuntimeError:
+        # No token was verified in this request
+        identity = None
+    if identity is None and getattr(request, 'sid', None):
+        from .socket_event import SESSION_IDENTITY
+        identity = (flask_session.get(SESSION_IDENTITY) or {}).get('user_id')
+    return identity
+
+
+def _sticky_store():
+    router = current_app.extensions.get('replicas')
+    return router.sticky if router else None
+
+
+def remember_write(user_id):
+    backend = _sticky_store()
+    if user_id is not None and backend is not None:
+        backend.set(_sticky_key(user_id), 1, timeout=current_app.config['READ_YOUR_WRITES_WINDOW'])
+
+
+def wrote_recently(user_id):
+    backend = _sticky_store()
+    return user_id is not None and backend is not None and backend.get(_sticky_key(user_id)) is not None
+
+
+def reads_own_writes():
+    """
+    Whether the caller of the current request wrote within READ_YOUR_WRITES_WINDOW seconds
+    """
+    return has_request_context() and _sticky_store() is not None and wrote_recently(current_user_id())
+
+
+@contextmanager
+def primary_reads(session):
+    """
+    Send the SELECTs of the block to the primary, for results that are shared beyond this request
+    """
+    previous = session.info.get('primary_only')
+    session.info['primary_only'] = True
+    try:
+        yield
+    finally:
+        if previous is None:
+            session.info.pop('primary_only', None)
+        else:
+            session.info['primary_only'] = previous
+
+
+def reads_from_replica(session):
+    """
+    Whether the session's SELECTs are currently answered by a replica
+    """
+    return session.info.get('replica') is not None \
+        and not session.info.get('primary_only') and not session.info.get('wrote')
+
+
+def is_replica_safe(clause):
+    # Plain SELECTs only: textual SQL and bare connection() calls may write, they stay on the primary
+    return isinstance(clause, GenerativeSelect) and clause._for_update_arg is None
+
+
+class RoutingSession(Session):
+    """
+    Session that sends the SELECTs of read-only requests (GET/HEAD) to a replica bind
+    Flushes, DML and SELECT ... FOR UPDATE use the primary, and once the session has written every
+    later statement does too. A user who wrote within READ_YOUR_WRITES_WINDOW seconds reads from the
+    primary so their own change is visible. Socket events, CLI commands, workers and primary_reads blocks
+    always use the primary.
+    One replica is picked per transaction so all its reads see the same snapshot.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        router = current_app.extensions.get('replicas')
+        if bind is not None or router is None or engine is not self._db.engines.get(None):
+            return engine
+
+        if self._flushing or isinstance(clause, UpdateBase):
+            if not self.info.get('wrote'):
+                self.info['wrote'] = True
+                if has_request_context():
+                    remember_write(current_user_id())
+            return engine
+        if self.info.get('wrote') or self.info.get('primary_only') or not is_replica_safe(clause):
+            return engine
+
+        if 'replica' not in self.info:
+            self.info['replica'] = self._choose_replica(router)
+        return self.info['replica'] or engine
+
+    def _choose_replica(self, router):
+        if not has_request_context() or request.method not in READ_METHODS or getattr(request, 'sid', None):
+            return None
+        if wrote_recently(current_user_id()):
+            return None
+        _, engine = router.pick()
+        return engine
+
+
+@event.listens_for(RoutingSession, 'after_transaction_end')
+def reset_routing(session, transaction):
+    # The next transaction decides again, the app context and its session can outlive one request
+    if transaction.parent is None:
+        session.info.pop('wrote', None)
+        session.info.pop('replica', None)
+
+
+def init_replicas(app, db):
+    from .cache import make_backend
+    with app.app_context():
+        engines = {key: engine for key, engine in db.engines.items()
+                   if key and key.startswith(REPLICA_BIND_PREFIX)}
+    if engines:
+        sticky = make_backend(app, app.config['READ_YOUR_WRITES_BACKEND'])
+        app.extensions['replicas'] = ReplicaRouter(engines, app.config['REPLICA_HEALTH_INTERVAL'], sticky)
+
+
+def replica_snapshot():
+    router = current_app.extensions.get('replicas')
+    return router.snapshot() if router else None
@@ -0,0 +1,156 @@
+from datetime import datetime, timezone
+from typing import Optional, Union
+import msgspec
+from flask import Response
+
+# Typed response bodies, encoded with msgspec instead of building dicts for flask.jsonify
+# Datetimes are written as RFC 3339 strings in UTC, pass them through as_utc (SQLite hands back naive values)
+
+
+class UserOut(msgspec.Struct):
+    user_id: str
+    username: str
+    email: str
+    first_name: str
+    last_name: Optional[str]
+    role: str
+
+
+class UserInfoOut(UserOut):
+    is_admin: bool
+    is_user: bool
+
+
+class Tokens(msgspec.Struct):
+    access_token: str
+    refresh_token: str
+    url_for_posts: str
+
+
+class LoginResponse(msgspec.Struct):
+    message: str
+    user: UserOut
+    tokens: Tokens
+    status: str = 'success'
+
+
+class UserInfoResponse(msgspec.Struct):
+    user: UserInfoOut
+    status: str = 'success'
+
+
+class PostOut(msgspec.Struct):
+    post_id: str
+    author_id: str
+    author_username: str
+    title: str
+    content: str
+    image_url: Optional[str]
+    image_variants: Optional[dict]
+    mimetype: Optional[str]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+    is_owner: bool
+    can_edit: bool
+    can_delete: bool
+    like_count: int
+    comment_count: int
+    is_liked: bool
+
+
+class PageMeta(msgspec.Struct):
+    page: int
+    per_page: int
+    total_pages: int
+    total_items: int
+    has_next: bool
+    has_prev: bool
+
+
+class CursorMeta(msgspec.Struct):
+    per_page: int
+    has_next: bool
+    next_cursor: Optional[str]
+
+
+class FeedResponse(msgspec.Struct):
+    posts: list[PostOut]
+    meta: Union[PageMeta, CursorMeta]
+
+
+class PostResponse(msgspec.Struct):
+    post: PostOut
+    status: str = 'success'
+
+
+class CommentOut(msgspec.Struct):
+    cid: str
+    content: str
+    username: Optional[str]
+    user_id: str
+    is_owner: bool
+    can_edit: bool
+    can_delete: bool
+    created_at: Optional[datetime]
+    replies: list['CommentOut'] = []
+    # Only present on comments whose replies were cut off by max_depth
+    replies_token: Union[str, msgspec.UnsetType] = msgspec.UNSET
+    # Only present on the flat records of an NDJSON stream
+    parent_cid: Union[Optional[str], msgspec.UnsetType] = msgspec.UNSET
+
+
+class CommentPage(msgspec.Struct):
+    comments: list[CommentOut]
+    meta: CursorMeta
+
+
+class DashboardTotals(msgspec.Struct):
+    posts: int
+    likes: int
+    comments: int
+    source: str
+    refreshed_at: Optional[datetime]
+
+
+class DashboardPost(msgspec.Struct):
+    post_id: str
+    title: str
+    created_at: Optional[datetime]
+    like_count: int
+    comment_count: int
+
+
+class DashboardResponse(msgspec.Struct):
+    author_id: str
+    totals: DashboardTotals
+    posts: list[DashboardPost]
+    status: str = 'success'
+
+
+def as_utc(value):
+    """
+    Datetime in UTC with its offset attached, stored values without one are UTC already
+    """
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def utc_isoformat(value):
+    """
+    RFC 3339 string of a datetime for hand-built payloads, same form as the encoder writes
+    """
+    value = as_utc(value)
+    return value.isoformat().replace('+00:00', 'Z') if value else None
+
+
+encoder = msgspec.json.Encoder()
+
+
+def json_response(body, status=200):
+    """
+    Encode a response struct (or plain data) with msgspec
+    """
+    return Response(encoder.encode(body), status=status, mimetype='application/json')
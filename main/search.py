@@ -0,0 +1,196 @@
+import bisect
+import math
+import re
+import threading
+from collections import Counter
+from sqlalchemy import case, false, func
+from . import db
+from .models import Posts
+
+# Title matches outrank content matches, mirroring setweight 'A' / 'B' on PostgreSQL
+TITLE_WEIGHT = 1.0
+CONTENT_WEIGHT = 0.4
+# The fallback orders by a CASE over matching ids, keep it bounded
+MAX_FALLBACK_RESULTS = 1000
+
+_token_re = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    return [t.lower() for t in _token_re.findall(text or '')]
+
+
+def is_postgres():
+    return db.engine.dialect.name == 'postgresql'
+
+
+def post_search_vector(title, content):
+    """
+    SQL expression for the weighted tsvector stored in Posts.search_vector
+    """
+    return func.setweight(func.to_tsvector('english', func.coalesce(title, '')), 'A').op('||')(
+        func.setweight(func.to_tsvector('english', func.coalesce(content, '')), 'B')
+    )
+
+
+def prefix_tsquery(search_query):
+    """
+    Turn free text into 'term:* & term:*' so partially typed words still match
+    """
+    return ' & '.join(f'{token}:*' for token in tokenize(search_query))
+
+
+class InvertedIndex:
+    """
+    In-process inverted index used when the database has no full-text support (SQLite dev/test)
+    Built lazily from the Posts table on first search and kept current by index_post/unindex_post
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = {}   # term -> {post_id: weighted term frequency}
+        self._docs = {}       # post_id -> set of terms
+        self._vocabulary = []  # sorted terms, for prefix lookups
+        self._built = False
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._docs.clear()
+            self._vocabulary = []
+            self._built = False
+
+    def _add(self, post_id, title, content):
+        self._remove(post_id)
+        weights = Counter()
+        for token in tokenize(title):
+            weights[token] += TITLE_WEIGHT
+        for token in tokenize(content):
+            weights[token] += CONTENT_WEIGHT
+        for term, weight in weights.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                if self._built:
+                    bisect.insort(self._vocabulary, term)
+            postings[post_id] = weight
+        self._docs[post_id] = set(weights)
+
+    def _remove(self, post_id):
+        for term in self._docs.pop(post_id, ()):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(post_id, None)
+            if not postings:
+                del self._postings[term]
+                i = bisect.bisect_left(self._vocabulary, term)
+                if i < len(self._vocabulary) and self._vocabulary[i] == term:
+                    del self._vocabulary[i]
+
+    def build(self, rows):
+        with self._lock:
+            self._postings.clear()
+            self._docs.clear()
+            self._vocabulary = []
+            for post_id, title, content in rows:
+                self._add(post_id, title, content)
+            self._vocabulary = sorted(self._postings)
+            self._built = True
+
+    def ensure_built(self):
+        if not self._built:
+            self.build(db.session.query(Posts.post_id, Posts.title, Posts.content).yield_per(1000))
+
+    def add(self, post_id, title, content):
+        # Nothing to do before the first search, build() will read the row from the table
+        if self._built:
+            with self._lock:
+                self._add(post_id, title, content)
+
+    def remove(self, post_id):
+        if self._built:
+            with self._lock:
+                self._remove(post_id)
+
+    def _expand(self, token):
+        i = bisect.bisect_left(self._vocabulary, token)
+        while i < len(self._vocabulary) and self._vocabulary[i].startswith(token):
+            yield self._vocabulary[i]
+            i += 1
+
+    def search(self, search_query, limit=MAX_FALLBACK_RESULTS):
+        """
+        Return [(post_id, score), ...] best first, every query token must prefix-match a term
+        """
+        tokens = tokenize(search_query)
+        if not tokens:
+            return []
+        self.ensure_built()
+        total_docs = max(len(self._docs), 1)
+
+        with self._lock:
+            scores = None
+            for token in tokens:
+                token_scores = {}
+                for term in self._expand(token):
+                    postings = self._postings[term]
+                    idf = math.log(1 + total_docs / len(postings))
+                    for post_id, weight in postings.items():
+                        token_scores[post_id] = token_scores.get(post_id, 0.0) + weight * idf
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {pid: s + token_scores[pid] for pid, s in scores.items() if pid in token_scores}
+                if not scores:
+                    return []
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit]
+
+
+fallback_index = InvertedIndex()
+
+
+def index_post(post):
+    """
+    Store the tsvector of a created or edited post on PostgreSQL (call before commit, after flush)
+    """
+    if is_postgres():
+        post.search_vector = post_search_vector(post.title, post.content)
+
+
+def index_committed_post(post_id, title, content):
+    """
+    Add a created or edited post to the in-process fallback index, only once its commit succeeded
+    so a failed write never becomes searchable
+    """
+    if not is_postgres():
+        fallback_index.add(post_id, title, content)
+
+
+def unindex_post(post_id):
+    # Called after the delete committed, like index_committed_post
+    if not is_postgres():
+        fallback_index.remove(post_id)
+
+
+def apply_search(query, search_query):
+    """
+    Filter a Posts query by search_query
+    Returns (query, rank) where rank is an expression to order by, best match first
+    """
+    if is_postgres():
+        if not tokenize(search_query):
+            return query.filter(false()), None
+        tsquery = func.to_tsquery('english', prefix_tsquery(search_query))
+        rank = func.ts_rank_cd(Posts.search_vector, tsquery)
+        return query.filter(Posts.search_vector.op('@@')(tsquery)), rank.desc()
+
+    ranked = fallback_index.search(search_query)
+    if not ranked:
+        return query.filter(false()), None
+    positions = {post_id: position for position, (post_id, _) in enumerate(ranked)}
+    # Compared through the column so the ids are bound as UUIDType, plain strings never match the stored keys
+    rank = case(*((Posts.post_id == post_id, position) for post_id, position in positions.items()))
+    return query.filter(Posts.post_id.in_(positions)), rank.asc()
@@ -0,0 +1,122 @@
+import time
+from flask import request, session
+from flask_socketio import emit, join_room
+from flask_jwt_extended import decode_token
+from .models import Comments, Posts, Likes, db
+from . import socketio, cache
+from .broadcast import get_broadcasts
+from .like_buffer import get_like_buffer
+from .schemas import utc_isoformat
+from .uuids import parse_uuid
+
+# Per-socket session key holding the identity verified at connect
+SESSION_IDENTITY = 'socket_identity'
+
+
+def authenticate_socket(token):
+    """
+    Verify an access token once and keep its identity in the socket session
+    Also joins the user's notification room; returns the user id or None if the token is invalid
+    """
+    try:
+        claims = decode_token(token)
+    except Exception:
+        return None
+
+    user_id = claims['sub']
+    session[SESSION_IDENTITY] = {'user_id': user_id, 'exp': claims.get('exp')}
+    join_room(f'user_{user_id}')
+    return user_id
+
+
+def socket_user(data=None):
+    """
+    The user id of the current socket, without any signature check once the socket is authenticated
+    Clients that did not send a token on connect can still pass one with the event, it is verified once and cached
+    """
+    identity = session.get(SESSION_IDENTITY)
+    if identity and (identity['exp'] is None or identity['exp'] > time.time()):
+        return identity['user_id']
+
+    token = data.get('token') if isinstance(data, dict) else None
+    return authenticate_socket(token) if token else None
+
+
+@socketio.on('connect')
+def handle_connect(auth=None):
+    # Anonymous sockets are allowed, they can watch post rooms but not comment or like
+    token = (auth or {}).get('token') or request.args.get('token')
+    if token and not authenticate_socket(token):
+        emit('status', {'msg': 'Invalid or expired token, connected anonymously'})
+
+# Join post room
+@socketio.on('join_post')
+def handle_join_post(data):
+    post_id = parse_uuid(data.get('post_id')) if isinstance(data, dict) else None
+    if not post_id:
+        emit('status', {'msg': 'Invalid post id'})
+        return
+
+    if not db.session.query(Posts.post_id).filter(Posts.post_id == post_id).first():
+        emit('status', {'msg': 'Post not found'})
+        return
+
+    join_room(f'post_{post_id}')
+    emit('status', {'msg': f'Joined post {post_id}'})
+
+# Handle new comment
+@socketio.on('new_comment')
+def handle_new_comment(data):
+    try:
+        user_id = socket_user(data)
+        post_id = parse_uuid(data.get('post_id'))
+        content = (data.get('content') or '').strip()
+        if not user_id or not post_id or not content:
+            return
+
+        comment = Comments(post_id=post_id, user_id=user_id, content=content)
+        db.session.add(comment)
+        comment_count = Posts.increment_counter(post_id, 'comment_count', 1)
+        db.session.commit()
+        cache.invalidate_post(post_id)
+        get_broadcasts().update_counters(post_id, comment_count=comment_count)
+
+        emit('comment_broadcast', {
+            'post_id': post_id,
+            'comment_id': comment.comment_id,
+            'author_id': user_id,
+            'content': content,
+            'created_at': utc_isoformat(comment.created_at)
+        }, room=f'post_{post_id}')
+    except Exception:
+        db.session.rollback()
+        # Avoid crashing the socket event on errors
+        return
+
+# Handle post likes
+@socketio.on('like_post')
+def handle_like_post(data):
+    user_id = socket_user(data)
+    post_id = parse_uuid(data.get('post_id')) if isinstance(data, dict) else None
+    if not user_id or not post_id:
+        return
+
+    liked = Likes.query.filter_by(user_id=user_id, post_id=post_id).exists()
+    post = db.session.query(Posts.author_id, Posts.title, Posts.like_count, liked.label('liked')) \
+        .filter(Posts.post_id == post_id).first()
+    if not post:
+        return
+
+    # Counters and owner notifications are coalesced per window instead of sent per like
+    broadcasts = get_broadcasts()
+    is_liked = post.liked
+    like_buffer = get_like_buffer()
+    pending = like_buffer.state(user_id, post_id) if like_buffer else None
+    if pending is not None:
+        # Not written yet, the buffer broadcasts the counter after its flush
+        is_liked = pending
+    else:
+        broadcasts.update_counters(post_id, like_count=post.like_count or 0)
+
+    if is_liked and post.author_id != user_id:
+        broadcasts.notify_like(post.author_id, post_id, post.title, user_id)
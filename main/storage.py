@@ -0,0 +1,222 @@
+import hashlib
+import os
+import shutil
+from collections import Counter
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from . import db
+from .models import MediaBlobs
+
+# Longest edge in pixels for each derivative; every size also gets a webp rendition
+VARIANT_SIZES = {'thumb': 160, 'feed': 640, 'full': 1600}
+MODERN_FORMAT = 'webp'
+
+
+class CloudinaryStorage:
+    """
+    Media storage backed by Cloudinary (the helpers in main.drive)
+    """
+
+    def upload(self, path, filename):
+        from .drive import upload_image_to_drive, variant_transformation
+        eager = []
+        for width in VARIANT_SIZES.values():
+            eager.append(variant_transformation(width))
+            eager.append(variant_transformation(width, MODERN_FORMAT))
+        return upload_image_to_drive(path, filename, eager=eager)
+
+    def url(self, public_id):
+        from .drive import get_image_url
+        return get_image_url(public_id)
+
+    def variants(self, path, public_id):
+        # Cloudinary renders the derivatives (eagerly, at upload), only the URLs are needed here
+        from .drive import get_image_variant_url
+        return {
+            name: {
+                'url': get_image_variant_url(public_id, width),
+                MODERN_FORMAT: get_image_variant_url(public_id, width, MODERN_FORMAT)
+            }
+            for name, width in VARIANT_SIZES.items()
+        }
+
+    def delete(self, public_id):
+        from .drive import delete_image
+        return delete_image(public_id)
+
+
+class LocalStorage:
+    """
+    Media storage on the local filesystem, served by the post.media route
+    Stands in for Cloudinary in development and tests
+    """
+
+    def __init__(self, root, base_url='/post/media/'):
+        self.root = root
+        self.base_url = base_url.rstrip('/') + '/'
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, public_id):
+        path = os.path.abspath(os.path.join(self.root, public_id))
+        if not path.startswith(os.path.abspath(self.root) + os.sep):
+            raise ValueError(f"Invalid media key: {public_id}")
+        return path
+
+    def upload(self, path, filename):
+        public_id = f"blog_images/{filename}"
+        target = self.path(public_id)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(path, target)
+        return public_id
+
+    def url(self, public_id):
+        if not public_id:
+            return None
+        # Built from config rather than url_for, workers run without a request context
+        return self.base_url + public_id
+
+    def variants_dir(self, public_id):
+        stem = os.path.splitext(os.path.basename(public_id))[0]
+        return f"blog_images/variants/{stem}"
+
+    def variants(self, path, public_id):
+        """
+        Render the resized derivatives with Pillow
+        Files Pillow cannot read (or a missing Pillow) fall back to the original for every size
+        """
+        original = self.url(public_id)
+        try:
+            from PIL import Image
+            source = Image.open(path)
+            source.load()
+        except Exception:
+            return {name: {'url': original, MODERN_FORMAT: original} for name in VARIANT_SIZES}
+
+        image_format = source.format or 'PNG'
+        extension = os.path.splitext(public_id)[1] or '.png'
+        folder = self.variants_dir(public_id)
+        os.makedirs(self.path(folder), exist_ok=True)
+
+        variants = {}
+        for name, size in VARIANT_SIZES.items():
+            image = source.copy()
+            image.thumbnail((size, size))
+            if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+
+            resized_id = f"{folder}/{name}{extension}"
+            modern_id = f"{folder}/{name}.{MODERN_FORMAT}"
+            image.save(self.path(resized_id), format=image_format)
+            image.save(self.path(modern_id), format=MODERN_FORMAT.upper(), quality=80)
+            variants[name] = {'url': self.url(resized_id), MODERN_FORMAT: self.url(modern_id)}
+        return variants
+
+    def delete(self, public_id):
+        try:
+            shutil.rmtree(self.path(self.variants_dir(public_id)), ignore_errors=True)
+            os.remove(self.path(public_id))
+            return True
+        except FileNotFoundError:
+            return True
+        except (OSError, ValueError) as e:
+            print(f"Error deleting image: {str(e)}")
+            return False
+
+
+def make_storage(app):
+    backend = app.config.get('MEDIA_BACKEND', 'cloudinary')
+    if backend == 'cloudinary':
+        return CloudinaryStorage()
+    if backend == 'local':
+        return LocalStorage(
+            app.config.get('MEDIA_ROOT') or os.path.join(app.instance_path, 'media'),
+            app.config.get('MEDIA_URL', '/post/media/')
+        )
+    raise ValueError(f"Unknown MEDIA_BACKEND: {backend}")
+
+
+def init_storage(app):
+    app.extensions['media_storage'] = make_storage(app)
+
+
+def get_storage():
+    return current_app.extensions['media_storage']
+
+
+def file_digest(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def acquire_media(path, filename):
+    """
+    Store the file at `path` under a content-addressed key and take a reference on it
+    Identical bytes already stored are not uploaded again. Returns (public_id, url, variants)
+    """
+    digest = file_digest(path)
+
+    # Fast path: an existing blob, bump its reference count atomically
+    bumped = db.session.execute(
+        db.update(MediaBlobs)
+        .where(MediaBlobs.content_hash == digest)
+        .values(ref_count=MediaBlobs.ref_count + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if bumped.rowcount:
+        blob = db.session.execute(
+            db.select(MediaBlobs.public_id, MediaBlobs.url, MediaBlobs.variants).where(MediaBlobs.content_hash == digest)
+        ).first()
+        return blob.public_id, blob.url, blob.variants
+
+    storage = get_storage()
+    extension = os.path.splitext(filename)[1].lower()
+    public_id = storage.upload(path, f"{digest}{extension}")
+    url = storage.url(public_id)
+    variants = storage.variants(path, public_id)
+
+    try:
+        with db.session.begin_nested():
+            db.session.add(MediaBlobs(public_id=public_id, content_hash=digest, url=url, variants=variants, ref_count=1))
+    except IntegrityError:
+        # A concurrent upload of the same bytes registered the blob first
+        db.session.execute(
+            db.update(MediaBlobs)
+            .where(MediaBlobs.content_hash == digest)
+            .values(ref_count=MediaBlobs.ref_count + 1)
+            .execution_options(synchronize_session=False)
+        )
+    return public_id, url, variants
+
+
+def release_media(public_ids):
+    """
+    Drop one reference per occurrence in `public_ids` (call inside the deleting transaction)
+    Blobs nobody references any more are queued in the media outbox; untracked legacy images are queued directly
+    An unreferenced blob keeps its row at ref_count 0 until the outbox claims it, so acquire_media can still
+    take it back instead of uploading the same bytes again while the removal is pending
+    """
+    from .outbox import enqueue_media_removal
+
+    counts = Counter(public_id for public_id in public_ids if public_id)
+    if not counts:
+        return []
+
+    blobs = {
+        blob.public_id: blob
+        for blob in MediaBlobs.query.filter(MediaBlobs.public_id.in_(counts)).with_for_update()
+    }
+    unreferenced = []
+    for public_id, count in counts.items():
+        blob = blobs.get(public_id)
+        if blob is None:
+            unreferenced.append(public_id)
+            continue
+        blob.ref_count = max(blob.ref_count - count, 0)
+        if blob.ref_count == 0:
+            unreferenced.append(public_id)
+
+    enqueue_media_removal(unreferenced)
+    return unreferenced
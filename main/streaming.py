@@ -0,0 +1,34 @@
+from flask import Response, current_app, request, stream_with_context
+from .schemas import encoder
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+# Rows fetched per round trip from the server-side cursor while streaming
+STREAM_CHUNK_SIZE = 500
+
+
+def wants_ndjson():
+    """
+    True when the client prefers newline-delimited JSON over a single JSON document
+    """
+    # Ties (e.g. */*) go to the first match, so plain JSON stays the default
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+
+def stream_chunk_size():
+    return current_app.config.get('STREAM_CHUNK_SIZE', STREAM_CHUNK_SIZE)
+
+
+def ndjson_lines(records):
+    """
+    Encode each record as one line of JSON, lazily
+    """
+    for record in records:
+        yield encoder.encode(record) + b'\n'
+
+
+def ndjson_response(records):
+    """
+    Stream `records` (any iterable, typically a generator over a yield_per query) as NDJSON
+    The request context, and with it the database session, stays open until the last line is sent
+    """
+    return Response(stream_with_context(ndjson_lines(records)), mimetype=NDJSON_MIMETYPE)
@@ -0,0 +1,162 @@
+import glob
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from . import db, cache
+from .models import Posts
+from .storage import acquire_media, release_media
+from .uuids import parse_uuid, uuid7
+
+SPOOL_SEPARATOR = '__'
+
+
+class UploadPipeline:
+    """
+    Moves image uploads off the request: the file is spooled to local disk, the post is committed
+    with image_state='pending', and a bounded pool of workers pushes it to the media storage backend
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.executor = None
+        self.slots = None
+        self.spool_dir = app.config.get('UPLOAD_SPOOL_DIR') or os.path.join(app.instance_path, 'upload_spool')
+        self.max_attempts = app.config.get('UPLOAD_MAX_ATTEMPTS', 3)
+        self.retry_delay = app.config.get('UPLOAD_RETRY_DELAY', 1.0)
+        os.makedirs(self.spool_dir, exist_ok=True)
+
+        workers = app.config.get('UPLOAD_WORKERS', 4)
+        if workers > 0:
+            self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-upload')
+            # Queued + running uploads, beyond this the request does the upload itself
+            self.slots = threading.BoundedSemaphore(workers + app.config.get('UPLOAD_QUEUE_SIZE', 32))
+        app.extensions['upload_pipeline'] = self
+
+    def spool_path(self, post_id, job, filename):
+        return os.path.join(self.spool_dir, f"{post_id}{SPOOL_SEPARATOR}{job}{SPOOL_SEPARATOR}{filename}")
+
+    def spool(self, post, image_file, filename):
+        """
+        Save the uploaded file for post to the spool directory under a new job token
+        The token is recorded on the post (committed by the caller), so an upload still running for an
+        earlier edit finds itself superseded. Its file is left alone and removed by that upload.
+        """
+        job = uuid7()
+        path = self.spool_path(post.post_id, job, filename)
+        image_file.save(path)
+        post.image_job = job
+        return path
+
+    def submit(self, post_id, path):
+        """
+        Queue a spooled file for upload (call after the post is committed)
+        Falls back to uploading inline when the pool is saturated or disabled
+        """
+        if self.executor is None or not self.slots.acquire(blocking=False):
+            self.process(post_id, path)
+            return
+
+        def run():
+            try:
+                with self.app.app_context():
+                    self.process(post_id, path)
+            finally:
+                self.slots.release()
+
+        self.executor.submit(run)
+
+    def process(self, post_id, path):
+        """
+        Upload one spooled file with retries and record the result on the post
+        """
+        _, job, filename = parse_spool_name(path)
+        public_id = url = variants = None
+
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                public_id, url, variants = acquire_media(path, filename)
+                break
+            except Exception as e:
+                db.session.rollback()
+                print(f"Image upload for post {post_id} failed (attempt {attempt}): {str(e)}")
+                if attempt < self.max_attempts:
+                    time.sleep(self.retry_delay * attempt)
+
+        post = db.session.get(Posts, post_id)
+        # A newer edit may have spooled a replacement, only the latest job gets to update the post
+        superseded = post is None or post.image_job != job
+
+        if public_id is None:
+            if not superseded:
+                # Kept for resume-uploads
+                post.image_state = 'failed'
+                db.session.commit()
+            else:
+                remove_spooled(path)
+            return False
+
+        if superseded:
+            # The post was deleted (or re-edited) while uploading
+            release_media([public_id])
+            db.session.commit()
+            remove_spooled(path)
+            return False
+
+        previous_public_id = post.image_public_id
+        post.image = url
+        post.image_variants = variants
+        post.image_public_id = public_id
+        post.image_state = 'ready'
+        if previous_public_id:
+            release_media([previous_public_id])
+        db.session.commit()
+        remove_spooled(path)
+
+        cache.invalidate_feed()
+        return True
+
+    def resubmit_pending(self):
+        """
+        Re-queue spooled files whose post is still pending or failed, e.g. after a restart
+        Files of deleted posts and of superseded jobs are removed
+        """
+        count = 0
+        for path in glob.glob(os.path.join(self.spool_dir, f'*{SPOOL_SEPARATOR}*')):
+            post_id, job, _ = parse_spool_name(path)
+            post = db.session.get(Posts, post_id)
+            if post is None or post.image_job != job:
+                remove_spooled(path)
+            elif post.image_state in ('pending', 'failed'):
+                post.image_state = 'pending'
+                db.session.commit()
+                self.submit(post_id, path)
+                count += 1
+        return count
+
+
+def parse_spool_name(path):
+    """
+    (post_id, job, filename) of a spooled file, job is None for files spooled before job tokens
+    """
+    post_id, rest = os.path.basename(path).split(SPOOL_SEPARATOR, 1)
+    job, _, filename = rest.partition(SPOOL_SEPARATOR)
+    if filename and parse_uuid(job) == job:
+        return post_id, job, filename
+    return post_id, None, rest
+
+
+def remove_spooled(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def init_uploads(app):
+    UploadPipeline(app)
+
+
+def get_uploads():
+    return current_app.extensions['upload_pipeline']
@@ -0,0 +1,90 @@
+import os
+import time
+import uuid
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.types import BINARY, LargeBinary, TypeDecorator
+
+
+def uuid7():
+    """
+    New time-ordered id (RFC 9562 version 7) in the usual 36 character form
+    48 bits of unix milliseconds then 74 random bits, so keys made later sort later and
+    inserts land at the right edge of the primary key index instead of all over it
+    """
+    millis = time.time_ns() // 1_000_000
+    rand = int.from_bytes(os.urandom(10), 'big')
+    value = (
+        (millis & 0xFFFF_FFFF_FFFF) << 80
+        | 0x7 << 76
+        | ((rand >> 62) & 0xFFF) << 64
+        | 0b10 << 62
+        | rand & 0x3FFF_FFFF_FFFF_FFFF
+    )
+    return str(uuid.UUID(int=value))
+
+
+def parse_uuid(value):
+    """
+    Canonical string form of a client supplied id, None when it is not a UUID
+    """
+    try:
+        return str(uuid.UUID(str(value)))
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+class UUIDType(TypeDecorator):
+    """
+    UUID key column that reads and writes the usual 36 character strings
+    Stored as the native uuid type on PostgreSQL and as 16 raw bytes elsewhere (BLOB on SQLite),
+    half the size of the old String(36) keys in every primary key, foreign key and index
+    """
+
+    impl = BINARY(16)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'postgresql':
+            return dialect.type_descriptor(PG_UUID(as_uuid=False))
+        if dialect.name == 'sqlite':
+            return dialect.type_descriptor(LargeBinary(16))
+        return dialect.type_descriptor(BINARY(16))
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if dialect.name == 'postgresql':
+            # The server parses and validates the text form itself
+            return str(value)
+        if isinstance(value, uuid.UUID):
+            return value.bytes
+        # Fast path for the canonical form, ids are bound on every key lookup and join
+        try:
+            raw = bytes.fromhex(value.replace('-', ''))
+            if len(raw) == 16:
+                return raw
+        except (AttributeError, ValueError):
+            pass
+        # Raises ValueError for anything that is not a UUID, validate client input with parse_uuid first
+        return uuid.UUID(str(value)).bytes
+
+    def process_result_value(self, value, dialect):
+        if value is None or isinstance(value, str):
+            return value
+        return format_uuid_bytes(value)
+
+    def result_processor(self, dialect, coltype):
+        if dialect.name == 'postgresql':
+            return super().result_processor(dialect, coltype)
+        # Every id of every row goes through here, skip the TypeDecorator wrapper around process_result_value
+        return format_uuid_bytes
+
+
+def format_uuid_bytes(value):
+    """
+    Same string as str(uuid.UUID(bytes=value)) at a quarter of the cost
+    """
+    if value is None:
+        return None
+    h = value.hex()
+    return f'{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}'
@@ -0,0 +1,32 @@
+"""add image variant URLs to Posts and MediaBlobs
+
+Revision ID: 0a7b3e5d9f16
+Revises: f4a8c2d61e93
+Create Date: 2026-10-18 14:45:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0a7b3e5d9f16'
+down_revision = 'f4a8c2d61e93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for table, column in (('Posts', 'image_variants'), ('MediaBlobs', 'variants')):
+        if column in {col['name'] for col in inspector.get_columns(table)}:
+            continue
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column(column, sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('MediaBlobs', schema=None) as batch_op:
+        batch_op.drop_column('variants')
+    with op.batch_alter_table('Posts', schema=None) as batch_op:
+        batch_op.drop_column('image_variants')
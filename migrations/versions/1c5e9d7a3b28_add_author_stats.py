@@ -0,0 +1,37 @@
+"""add AuthorStats summary table for the dashboard
+
+Revision ID: 1c5e9d7a3b28
+Revises: 0a7b3e5d9f16
+Create Date: 2026-10-18 15:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1c5e9d7a3b28'
+down_revision = '0a7b3e5d9f16'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('AuthorStats'):
+        return
+
+    # Starts empty, `flask refresh-author-stats` fills it; until then the dashboard aggregates live
+    op.create_table(
+        'AuthorStats',
+        sa.Column('author_id', sa.String(length=36), nullable=False),
+        sa.Column('post_count', sa.Integer(), nullable=False),
+        sa.Column('like_count', sa.Integer(), nullable=False),
+        sa.Column('comment_count', sa.Integer(), nullable=False),
+        sa.Column('refreshed_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['author_id'], ['Users.user_id']),
+        sa.PrimaryKeyConstraint('author_id')
+    )
+
+
+def downgrade():
+    op.drop_table('AuthorStats')
@@ -0,0 +1,67 @@
+"""add indexes on the foreign keys and sort columns of the feed, threads and likes
+
+Revision ID: 2d8f4b6e1a93
+Revises: 1c5e9d7a3b28
+Create Date: 2026-10-18 17:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2d8f4b6e1a93'
+down_revision = '1c5e9d7a3b28'
+branch_labels = None
+depends_on = None
+
+# Posts.created_at alone is already covered by ix_posts_created_at_post_id (8c41e7a9b2d3)
+INDEXES = [
+    ('ix_comments_post_id_created_at', 'Comments', ['post_id', 'created_at', 'comment_id']),
+    ('ix_comments_parent_id_created_at', 'Comments', ['parent_comment_id', 'created_at', 'comment_id']),
+    ('ix_comments_user_id', 'Comments', ['user_id']),
+    ('ix_likes_post_id', 'Likes', ['post_id']),
+    ('ix_posts_author_id_created_at', 'Posts', ['author_id', sa.text('created_at DESC'), 'post_id']),
+]
+
+
+def drop_invalid_index(name):
+    # A CREATE INDEX CONCURRENTLY that failed half way leaves an INVALID index behind, build it again
+    invalid = op.get_bind().execute(
+        sa.text('SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid '
+                'WHERE c.relname = :name AND NOT i.indisvalid'),
+        {'name': name}
+    ).first()
+    if invalid:
+        op.drop_index(name, postgresql_concurrently=True, if_exists=True)
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if bind.dialect.name == 'postgresql':
+        # CONCURRENTLY keeps the tables writable during the build but cannot run inside a transaction
+        with op.get_context().autocommit_block():
+            for name, table, columns in INDEXES:
+                drop_invalid_index(name)
+                op.create_index(name, table, columns, unique=False,
+                                postgresql_concurrently=True, if_not_exists=True)
+        return
+
+    for name, table, columns in INDEXES:
+        existing = {idx['name'] for idx in inspector.get_indexes(table)}
+        if name not in existing:
+            op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for name, table, _ in reversed(INDEXES):
+                op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+        return
+
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
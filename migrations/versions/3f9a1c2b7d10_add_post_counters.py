@@ -0,0 +1,40 @@
+"""add denormalized like/comment counters to Posts
+
+Revision ID: 3f9a1c2b7d10
+Revises: 
+Create Date: 2026-10-18 10:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9a1c2b7d10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Tables are created by db.create_all(), so a fresh database may already have the columns
+    existing = {col['name'] for col in sa.inspect(op.get_bind()).get_columns('Posts')}
+
+    with op.batch_alter_table('Posts', schema=None) as batch_op:
+        if 'like_count' not in existing:
+            batch_op.add_column(sa.Column('like_count', sa.Integer(), nullable=False, server_default='0'))
+        if 'comment_count' not in existing:
+            batch_op.add_column(sa.Column('comment_count', sa.Integer(), nullable=False, server_default='0'))
+
+    # Backfill from the source tables
+    op.execute(
+        'UPDATE "Posts" SET '
+        'like_count = (SELECT COUNT(*) FROM "Likes" WHERE "Likes".post_id = "Posts".post_id), '
+        'comment_count = (SELECT COUNT(*) FROM "Comments" WHERE "Comments".post_id = "Posts".post_id)'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('Posts', schema=None) as batch_op:
+        batch_op.drop_column('comment_count')
+        batch_op.drop_column('like_count')
@@ -0,0 +1,140 @@
+"""store UUID keys as native uuid on PostgreSQL and 16 byte blobs on SQLite
+
+Revision ID: 4b9e2c7f5a18
+Revises: 2d8f4b6e1a93
+Create Date: 2026-10-18 18:40:00.000000
+
+"""
+import uuid
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '4b9e2c7f5a18'
+down_revision = '2d8f4b6e1a93'
+branch_labels = None
+depends_on = None
+
+# Every String(36) id column, primary keys first (see main.uuids.UUIDType)
+UUID_COLUMNS = {
+    'Users': ['user_id'],
+    'Posts': ['post_id', 'author_id'],
+    'Comments': ['comment_id', 'post_id', 'user_id', 'parent_comment_id'],
+    'Likes': ['like_id', 'user_id', 'post_id'],
+    'MediaOutbox': ['outbox_id'],
+    'AuthorStats': ['author_id'],
+}
+
+
+def uuid_bytes(value):
+    # Text ids become their 16 bytes, values that are already 16 bytes are left alone
+    if value is None or (isinstance(value, bytes) and len(value) == 16):
+        return value
+    if isinstance(value, bytes):
+        value = value.decode('ascii')
+    return uuid.UUID(value).bytes
+
+
+def uuid_text(value):
+    if isinstance(value, bytes) and len(value) == 16:
+        return str(uuid.UUID(bytes=value))
+    return value
+
+
+def columns_to_convert(inspector, to_uuid):
+    """
+    (table, column, nullable) still in the old format, so the migration can be re-run after create_all
+    """
+    pending = []
+    for table, names in UUID_COLUMNS.items():
+        if not inspector.has_table(table):
+            continue
+        columns = {col['name']: col for col in inspector.get_columns(table)}
+        for name in names:
+            col = columns.get(name)
+            if col is None:
+                continue
+            is_uuid = isinstance(col['type'], (sa.Uuid, postgresql.UUID, sa.LargeBinary))
+            if is_uuid != to_uuid:
+                pending.append((table, name, col['nullable']))
+    return pending
+
+
+def foreign_keys(inspector, tables):
+    return [
+        (table, fk)
+        for table in tables if inspector.has_table(table)
+        for fk in inspector.get_foreign_keys(table)
+        if fk['referred_table'] in UUID_COLUMNS
+    ]
+
+
+def convert_postgresql(inspector, pending, to_uuid):
+    # Key and referencing columns must change type together, drop the foreign keys around the change
+    fks = foreign_keys(inspector, UUID_COLUMNS)
+    for table, fk in fks:
+        op.drop_constraint(fk['name'], table, type_='foreignkey')
+
+    for table, column, _ in pending:
+        if to_uuid:
+            op.execute(f'ALTER TABLE "{table}" ALTER COLUMN "{column}" TYPE uuid USING "{column}"::uuid')
+        else:
+            op.execute(f'ALTER TABLE "{table}" ALTER COLUMN "{column}" TYPE varchar(36) USING "{column}"::text')
+
+    for table, fk in fks:
+        op.create_foreign_key(
+            fk['name'], table, fk['referred_table'], fk['constrained_columns'], fk['referred_columns'],
+            **fk.get('options', {})
+        )
+
+
+def convert_sqlite(pending, to_uuid):
+    # SQLite cannot change a column type in place: rewrite the values with a Python function,
+    # then let batch mode rebuild each table with the new declared type
+    bind = op.get_bind()
+    convert = uuid_bytes if to_uuid else uuid_text
+    bind.connection.driver_connection.create_function('convert_uuid', 1, convert, deterministic=True)
+
+    by_table = {}
+    for table, column, nullable in pending:
+        op.execute(f'UPDATE "{table}" SET "{column}" = convert_uuid("{column}")')
+        by_table.setdefault(table, []).append((column, nullable))
+
+    new_type = sa.LargeBinary(16) if to_uuid else sa.String(36)
+    for table, columns in by_table.items():
+        # Reflection drops DESC from index columns, keep the original DDL to rebuild them exactly
+        indexes = bind.execute(
+            sa.text("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = :table AND sql IS NOT NULL"),
+            {'table': table}
+        ).all()
+        with op.batch_alter_table(table, recreate='always') as batch:
+            for column, nullable in columns:
+                batch.alter_column(column, type_=new_type, existing_nullable=nullable)
+        for name, ddl in indexes:
+            op.execute(f'DROP INDEX IF EXISTS "{name}"')
+            op.execute(ddl)
+
+
+def convert(to_uuid):
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    pending = columns_to_convert(inspector, to_uuid)
+    if not pending:
+        return
+
+    if bind.dialect.name == 'postgresql':
+        convert_postgresql(inspector, pending, to_uuid)
+    elif bind.dialect.name == 'sqlite':
+        convert_sqlite(pending, to_uuid)
+    else:
+        raise NotImplementedError(f'UUID key conversion is not written for {bind.dialect.name}')
+
+
+def upgrade():
+    convert(to_uuid=True)
+
+
+def downgrade():
+    convert(to_uuid=False)
@@ -0,0 +1,32 @@
+"""give SQLite created_at values written by CURRENT_TIMESTAMP the fractional seconds of Python datetimes
+
+Revision ID: 5e1a7c3d9b42
+Revises: 4b9e2c7f5a18
+Create Date: 2026-10-19 09:10:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5e1a7c3d9b42'
+down_revision = '4b9e2c7f5a18'
+branch_labels = None
+depends_on = None
+
+# Keyset paginated tables, their created_at now comes from main.models.utc_now
+TABLES = ['Posts', 'Comments']
+
+
+def upgrade():
+    # SQLite keeps datetimes as text: 'YYYY-MM-DD HH:MM:SS' sorts before 'YYYY-MM-DD HH:MM:SS.000000',
+    # so a cursor on such a row matched the row itself again. PostgreSQL timestamps need nothing.
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for table in TABLES:
+        op.execute(f"UPDATE \"{table}\" SET created_at = created_at || '.000000' WHERE length(created_at) = 19")
+
+
+def downgrade():
+    # The padded values are still valid datetimes
+    pass
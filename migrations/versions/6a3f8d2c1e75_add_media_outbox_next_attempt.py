@@ -0,0 +1,27 @@
+"""add MediaOutbox.next_attempt_at for retry backoff
+
+Revision ID: 6a3f8d2c1e75
+Revises: 5e1a7c3d9b42
+Create Date: 2026-10-19 09:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6a3f8d2c1e75'
+down_revision = '5e1a7c3d9b42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {col['name'] for col in sa.inspect(op.get_bind()).get_columns('MediaOutbox')}
+    if 'next_attempt_at' not in columns:
+        op.add_column('MediaOutbox', sa.Column('next_attempt_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('MediaOutbox', schema=None) as batch_op:
+        batch_op.drop_column('next_attempt_at')
@@ -0,0 +1,30 @@
+"""add image_job to Posts so superseded uploads are told apart
+
+Revision ID: 7b2d4e9f1a36
+Revises: 6a3f8d2c1e75
+Create Date: 2026-10-19 11:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b2d4e9f1a36'
+down_revision = '6a3f8d2c1e75'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = {col['name'] for col in sa.inspect(op.get_bind()).get_columns('Posts')}
+    if 'image_job' in existing:
+        return
+
+    with op.batch_alter_table('Posts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('image_job', sa.String(length=36), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('Posts', schema=None) as batch_op:
+        batch_op.drop_column('image_job')
@@ -0,0 +1,31 @@
+"""add (created_at DESC, post_id) index on Posts for keyset pagination
+
+Revision ID: 8c41e7a9b2d3
+Revises: 3f9a1c2b7d10
+Create Date: 2026-10-18 11:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c41e7a9b2d3'
+down_revision = '3f9a1c2b7d10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = {idx['name'] for idx in sa.inspect(op.get_bind()).get_indexes('Posts')}
+    if 'ix_posts_created_at_post_id' not in existing:
+        op.create_index(
+            'ix_posts_created_at_post_id',
+            'Posts',
+            [sa.text('created_at DESC'), 'post_id'],
+            unique=False
+        )
+
+
+def downgrade():
+    op.drop_index('ix_posts_created_at_post_id', table_name='Posts')
@@ -0,0 +1,51 @@
+"""add full-text search vector and GIN index on Posts
+
+Revision ID: b5d2f08e6a47
+Revises: 8c41e7a9b2d3
+Create Date: 2026-10-18 11:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5d2f08e6a47'
+down_revision = '8c41e7a9b2d3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    is_postgres = bind.dialect.name == 'postgresql'
+    inspector = sa.inspect(bind)
+    existing_columns = {col['name'] for col in inspector.get_columns('Posts')}
+    existing_indexes = {idx['name'] for idx in inspector.get_indexes('Posts')}
+
+    if 'search_vector' not in existing_columns:
+        with op.batch_alter_table('Posts', schema=None) as batch_op:
+            batch_op.add_column(
+                sa.Column('search_vector', postgresql.TSVECTOR() if is_postgres else sa.Text(), nullable=True)
+            )
+
+    # Other dialects search through the in-process fallback index in main/search.py
+    if not is_postgres:
+        return
+
+    op.execute(
+        'UPDATE "Posts" SET search_vector = '
+        "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(content, '')), 'B')"
+    )
+    if 'ix_posts_search_vector' not in existing_indexes:
+        op.create_index('ix_posts_search_vector', 'Posts', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    existing_indexes = {idx['name'] for idx in sa.inspect(op.get_bind()).get_indexes('Posts')}
+    if 'ix_posts_search_vector' in existing_indexes:
+        op.drop_index('ix_posts_search_vector', table_name='Posts')
+    with op.batch_alter_table('Posts', schema=None) as batch_op:
+        batch_op.drop_column('search_vector')
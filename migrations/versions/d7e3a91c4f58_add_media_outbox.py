@@ -0,0 +1,39 @@
+"""add MediaOutbox table for deferred image removal
+
+Revision ID: d7e3a91c4f58
+Revises: b5d2f08e6a47
+Create Date: 2026-10-18 12:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7e3a91c4f58'
+down_revision = 'b5d2f08e6a47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('MediaOutbox'):
+        return
+
+    op.create_table(
+        'MediaOutbox',
+        sa.Column('outbox_id', sa.String(length=36), nullable=False),
+        sa.Column('public_id', sa.String(length=255), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.String(length=500), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('processed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('outbox_id')
+    )
+    op.create_index('ix_MediaOutbox_status', 'MediaOutbox', ['status'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_MediaOutbox_status', table_name='MediaOutbox')
+    op.drop_table('MediaOutbox')
@@ -0,0 +1,32 @@
+"""add image_state to Posts for off-request uploads
+
+Revision ID: e1f64b0a9c25
+Revises: d7e3a91c4f58
+Create Date: 2026-10-18 13:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1f64b0a9c25'
+down_revision = 'd7e3a91c4f58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = {col['name'] for col in sa.inspect(op.get_bind()).get_columns('Posts')}
+    if 'image_state' in existing:
+        return
+
+    with op.batch_alter_table('Posts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('image_state', sa.String(length=20), nullable=True))
+
+    op.execute('UPDATE "Posts" SET image_state = \'ready\' WHERE image IS NOT NULL')
+
+
+def downgrade():
+    with op.batch_alter_table('Posts', schema=None) as batch_op:
+        batch_op.drop_column('image_state')
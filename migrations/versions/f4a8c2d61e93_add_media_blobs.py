@@ -0,0 +1,37 @@
+"""add MediaBlobs table for content-addressed, reference counted images
+
+Revision ID: f4a8c2d61e93
+Revises: e1f64b0a9c25
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4a8c2d61e93'
+down_revision = 'e1f64b0a9c25'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('MediaBlobs'):
+        return
+
+    # Existing images stay untracked and are removed outright when their post goes
+    op.create_table(
+        'MediaBlobs',
+        sa.Column('public_id', sa.String(length=255), nullable=False),
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('url', sa.String(length=255), nullable=False),
+        sa.Column('ref_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('public_id'),
+        sa.UniqueConstraint('content_hash')
+    )
+
+
+def downgrade():
+    op.drop_table('MediaBlobs')
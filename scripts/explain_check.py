@@ -0,0 +1,211 @@
+"""
+Query plan check for the hot paths
+
+EXPLAINs the feed, comment thread, like and dashboard queries against the database configured by the
+environment (DATABASE_URL) and exits non-zero when one of them reads Posts, Comments or Likes in full
+(a sequential scan). Plans only mean something at realistic sizes, --seed fills the database up first.
+
+    DATABASE_URL=postgresql://... python -m scripts.explain_check --seed --posts 20000
+
+Supports PostgreSQL (EXPLAIN FORMAT JSON) and SQLite (EXPLAIN QUERY PLAN).
+"""
+import argparse
+import random
+import re
+import sys
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event, func, insert
+from main import create_app, db
+from main.comment import comment_rows_query
+from main.models import Comments, Likes, Posts, Users
+from main.pagination import keyset_filter
+from main.uuids import uuid7
+
+WATCHED_TABLES = {'Posts', 'Comments', 'Likes'}
+SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?"?(\w+)"?(.*)$')
+
+
+def seed(posts, comments_per_post, likes_per_post, users=500, batch=5000):
+    """
+    Top the database up to `posts` posts with synthetic users, comments (half of them replies) and likes
+    """
+    existing = db.session.query(func.count(Posts.post_id)).scalar()
+    missing = posts - existing
+    if missing <= 0:
+        return 0
+
+    rng = random.Random(42)
+    now = datetime.now(timezone.utc)
+    run = uuid7()[-8:]
+    user_ids = [uuid7() for _ in range(users)]
+    db.session.execute(insert(Users), [{
+        'user_id': uid, 'username': f'seed_{run}_{i}', 'email': f'seed_{run}_{i}@example.com',
+        'password': 'x', 'first_name': 'Seed', 'role': 'user'
+    } for i, uid in enumerate(user_ids)])
+
+    post_rows, comment_rows, like_rows = [], [], []
+
+    def flush():
+        for model, rows in ((Posts, post_rows), (Comments, comment_rows), (Likes, like_rows)):
+            if rows:
+                db.session.execute(insert(model), rows)
+                rows.clear()
+
+    for i in range(missing):
+        post_id = uuid7()
+        created = now - timedelta(minutes=i)
+        post_rows.append({
+            'post_id': post_id, 'author_id': rng.choice(user_ids), 'title': f'Seed post {i}',
+            'content': f'seed {run} {i}', 'created_at': created,
+            'like_count': likes_per_post, 'comment_count': comments_per_post
+        })
+        roots = []
+        for j in range(comments_per_post):
+            comment_id = uuid7()
+            parent = rng.choice(roots) if roots and j % 2 else None
+            roots.append(comment_id)
+            comment_rows.append({
+                'comment_id': comment_id, 'post_id': post_id, 'user_id': rng.choice(user_ids),
+                'content': f'comment {j}', 'parent_comment_id': parent,
+                'created_at': created + timedelta(seconds=j)
+            })
+        for uid in rng.sample(user_ids, min(likes_per_post, users)):
+            like_rows.append({'like_id': uuid7(), 'user_id': uid, 'post_id': post_id, 'created_at': created})
+        if len(comment_rows) + len(like_rows) >= batch:
+            flush()
+    flush()
+    db.session.commit()
+    return missing
+
+
+def hot_path_queries():
+    """
+    (name, statement, ordered walk) triples shaped like the queries the views run
+    An ordered walk reads an index in ORDER BY order until its LIMIT is reached, that may scan the index
+    """
+    post = db.session.query(Posts.post_id, Posts.author_id, Posts.created_at) \
+        .order_by(Posts.comment_count.desc()).first()
+    if post is None:
+        sys.exit('No posts in the database, run with --seed')
+    parent = db.session.query(Comments.comment_id).filter(Comments.post_id == post.post_id).first()
+    liker = db.session.query(Likes.user_id).filter(Likes.post_id == post.post_id).first()
+    user_id = liker.user_id if liker else post.author_id
+    page_ids = [row.post_id for row in db.session.query(Posts.post_id).limit(10)]
+    feed = db.select(Posts.post_id, Posts.title, Users.username).outerjoin(Users, Users.user_id == Posts.author_id)
+    feed_order = (Posts.created_at.desc(), Posts.post_id.asc())
+    thread_order = (Comments.created_at.asc(), Comments.comment_id.asc())
+    thread = comment_rows_query().where(Comments.post_id == post.post_id)
+
+    return [
+        ('feed first page', feed.order_by(*feed_order).limit(11), True),
+        ('feed next page', feed.where(
+            keyset_filter(Posts.created_at, Posts.post_id, (post.created_at, post.post_id))
+        ).order_by(*feed_order).limit(11), True),
+        ('viewer likes on a page', db.select(Likes.post_id).where(
+            Likes.user_id == user_id, Likes.post_id.in_(page_ids)
+        ), False),
+        ('comment thread', thread.order_by(*thread_order), False),
+        ('comment roots page',
+         thread.where(Comments.parent_comment_id.is_(None)).order_by(*thread_order).limit(21), False),
+        ('replies page', comment_rows_query().where(
+            Comments.parent_comment_id == (parent.comment_id if parent else post.post_id)
+        ).order_by(*thread_order).limit(21), False),
+        ('comment subtree', db.select(Comments.subtree_cte(
+            (Comments.post_id == post.post_id) & Comments.parent_comment_id.is_(None), max_depth=8
+        ).c.comment_id), False),
+        ('comments by user', db.select(Comments.comment_id).where(Comments.user_id == user_id), False),
+        ('like lookup',
+         db.select(Likes.like_id).where(Likes.user_id == user_id, Likes.post_id == post.post_id), False),
+        ('likes of a post', db.select(func.count(Likes.like_id)).where(Likes.post_id == post.post_id), False),
+        ('delete post comments',
+         db.select(Comments.comment_id).where(Comments.post_id.in_([post.post_id])), False),
+        ('delete post likes', db.select(Likes.like_id).where(Likes.post_id.in_([post.post_id])), False),
+        ('author dashboard', db.select(Posts.post_id, Posts.like_count).where(
+            Posts.author_id == post.author_id
+        ).order_by(*feed_order).limit(20), False),
+    ]
+
+
+def sequential_scans(dialect, plan_rows, ordered_walk=False):
+    """
+    Names of the watched tables a plan reads in full, plus the plan as text
+    """
+    if dialect == 'postgresql':
+        plan = plan_rows[0][0]
+        found, lines = [], []
+
+        def walk(node, depth):
+            relation = node.get('Relation Name')
+            lines.append('  ' * depth + node['Node Type'] + (f' on {relation}' if relation else ''))
+            if relation in WATCHED_TABLES:
+                full_index = node['Node Type'] in ('Index Scan', 'Index Only Scan') and 'Index Cond' not in node
+                if node['Node Type'] == 'Seq Scan' or (full_index and not ordered_walk):
+                    found.append(relation)
+            for child in node.get('Plans', ()):
+                walk(child, depth + 1)
+
+        walk(plan[0]['Plan'], 0)
+        return found, lines
+
+    found, lines = [], []
+    for row in plan_rows:
+        detail = row[-1]
+        lines.append(detail)
+        match = SQLITE_SCAN.match(detail)
+        # SEARCH seeks into an index; SCAN reads the table, or a whole index with USING ... INDEX,
+        # which is only fine when it is an ordered walk stopped by a LIMIT
+        if match and match.group(1) in WATCHED_TABLES and not (ordered_walk and 'USING' in match.group(2)):
+            found.append(match.group(1))
+    return found, lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--seed', action='store_true', help='add synthetic rows up to --posts first')
+    parser.add_argument('--posts', type=int, default=20000)
+    parser.add_argument('--comments-per-post', type=int, default=10)
+    parser.add_argument('--likes-per-post', type=int, default=10)
+    parser.add_argument('--verbose', '-v', action='store_true', help='print every plan')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        engine = db.engine
+        dialect = engine.dialect.name
+        if dialect not in ('postgresql', 'sqlite'):
+            sys.exit(f'EXPLAIN output of {dialect} is not supported')
+
+        if args.seed:
+            added = seed(args.posts, args.comments_per_post, args.likes_per_post)
+            print(f'seeded {added} posts')
+        # Planner statistics, without them small or fresh tables are planned as empty
+        with engine.begin() as conn:
+            conn.exec_driver_sql('ANALYZE')
+
+        prefix = 'EXPLAIN (FORMAT JSON) ' if dialect == 'postgresql' else 'EXPLAIN QUERY PLAN '
+
+        @event.listens_for(engine, 'before_cursor_execute', retval=True)
+        def explain(conn, cursor, statement, parameters, context, executemany):
+            # The statement runs with its real parameters and bind processing, only prefixed
+            if context.execution_options.get('explain'):
+                statement = prefix + statement
+            return statement, parameters
+
+        failures = 0
+        with engine.connect() as conn:
+            for name, stmt, ordered_walk in hot_path_queries():
+                rows = conn.execute(stmt, execution_options={'explain': True}).fetchall()
+                scans, lines = sequential_scans(dialect, rows, ordered_walk)
+                status = f'SEQ SCAN on {", ".join(sorted(set(scans)))}' if scans else 'ok'
+                print(f'{name:26s} {status}')
+                if scans or args.verbose:
+                    for line in lines:
+                        print(f'    {line}')
+                failures += bool(scans)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
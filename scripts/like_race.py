@@ -0,0 +1,121 @@
+"""
+Load run for the like endpoints
+
+Many clients like and unlike the same post at once, several of them as the same user (double clicks),
+against the app configured by the environment (DATABASE_URL). Afterwards the post's like_count must
+equal its rows in Likes, no (user, post) pair may be liked twice and no request may fail with a 5xx.
+tests/test_likes.py checks the same on SQLite, this script is for real databases and throughput.
+
+    DATABASE_URL=postgresql://... python -m scripts.like_race --clients 64 --users 16 --requests 50
+
+--mode put-delete sends PUT/DELETE /post/<id>/like/, --mode toggle the older POST /post/like_post/<id>/.
+With LIKE_WRITE_BEHIND=true the likes go through the write-behind buffer, which is flushed before the check,
+so the same run compares sustained likes/sec with and without it.
+The database needs a post and at least --users users.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import func
+from main import create_app, db
+from main.like_buffer import get_like_buffer
+from main.models import Likes, Posts, Users
+from main.uuids import parse_uuid
+
+
+def check(post_id):
+    rows = db.session.query(func.count(Likes.like_id)).filter(Likes.post_id == post_id).scalar()
+    counter = db.session.query(Posts.like_count).filter(Posts.post_id == post_id).scalar() or 0
+    duplicates = db.session.query(Likes.user_id).filter(Likes.post_id == post_id) \
+        .group_by(Likes.user_id).having(func.count() > 1).count()
+    return {'like_rows': rows, 'like_count': counter, 'duplicates': duplicates}
+
+
+def run(app, clients, requests, users, mode, post_id=None):
+    with app.app_context():
+        post = db.session.get(Posts, parse_uuid(post_id)) if post_id else Posts.query.first()
+        user_ids = [row.user_id for row in db.session.query(Users.user_id).limit(users)]
+        if post is None or len(user_ids) < users:
+            raise SystemExit(f'Needs a post and {users} users in the database')
+        post_id = post.post_id
+        # Start from a counter that matches the rows, drift found afterwards comes from this run
+        Posts.reconcile_counters()
+        headers = [{'Authorization': f'Bearer {create_access_token(identity=uid)}'} for uid in user_ids]
+
+    like_path = f'/post/{post_id}/like/'
+    toggle_path = f'/post/like_post/{post_id}/'
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    start_line = threading.Barrier(clients)
+
+    def client(n):
+        http = app.test_client()
+        # Clients share users, so the same user likes and unlikes from several threads at once
+        auth = headers[n % len(headers)]
+        rng = random.Random(n)
+        start_line.wait()
+        for _ in range(requests):
+            started = time.perf_counter()
+            if mode == 'toggle':
+                status = http.post(toggle_path, headers=auth).status_code
+            elif rng.random() < 0.5:
+                status = http.put(like_path, headers=auth).status_code
+            else:
+                status = http.delete(like_path, headers=auth).status_code
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - started
+
+    latencies.sort()
+    with app.app_context():
+        buffer = get_like_buffer()
+        if buffer is not None:
+            # Accepted likes only reach the database with a flush
+            buffer.flush()
+        state = check(post_id)
+        write_behind = buffer.snapshot() if buffer else None
+    return {
+        'mode': mode,
+        'clients': clients,
+        'users': users,
+        'requests': len(latencies),
+        'requests_per_sec': round(len(latencies) / duration, 1),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95)] * 1000, 1),
+        'statuses': statuses,
+        'write_behind': write_behind,
+        **state
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, default=32, help='concurrent clients')
+    parser.add_argument('--requests', type=int, default=50, help='requests per client')
+    parser.add_argument('--users', type=int, default=8, help='distinct users shared by the clients')
+    parser.add_argument('--mode', choices=('put-delete', 'toggle'), default='put-delete')
+    parser.add_argument('--post', help='post id, defaults to the first post')
+    args = parser.parse_args()
+
+    result = run(create_app(), args.clients, args.requests, args.users, args.mode, args.post)
+    print(json.dumps(result, indent=2))
+    server_errors = sum(count for status, count in result['statuses'].items() if status >= 500)
+    consistent = result['like_rows'] == result['like_count'] and not result['duplicates']
+    raise SystemExit(0 if consistent and not server_errors else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Load test for the database connection pool
+
+Runs CLIENTS concurrent clients against the feed endpoint of the app configured by the environment
+(DATABASE_URL, DB_POOL_*) and prints the pool metrics afterwards: a run without timeouts means
+the pool was not exhausted at that concurrency.
+
+    DATABASE_URL=postgresql://... python -m scripts.pool_load --clients 200 --requests 40 --think 0.05
+
+The database needs at least one user and some posts, requests are made as the first user.
+"""
+import argparse
+import json
+import threading
+import time
+
+from flask_jwt_extended import create_access_token
+from main import create_app
+from main.dbpool import pool_snapshot
+from main.models import Users
+
+
+def run(app, clients, requests, think, path):
+    with app.app_context():
+        user = Users.query.first()
+        if user is None:
+            raise SystemExit('No users in the database, create one first')
+        headers = {'Authorization': f'Bearer {create_access_token(identity=user.user_id)}'}
+
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    start_line = threading.Barrier(clients)
+
+    def client():
+        http = app.test_client()
+        start_line.wait()
+        for _ in range(requests):
+            started = time.perf_counter()
+            status = http.get(path, headers=headers).status_code
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+            if think:
+                time.sleep(think)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - started
+
+    latencies.sort()
+    with app.app_context():
+        pools = pool_snapshot()
+    return {
+        'clients': clients,
+        'requests': len(latencies),
+        'requests_per_sec': round(len(latencies) / duration, 1),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95)] * 1000, 1),
+        'statuses': statuses,
+        'pools': pools
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, default=50, help='concurrent clients')
+    parser.add_argument('--requests', type=int, default=40, help='requests per client')
+    parser.add_argument('--think', type=float, default=0.05, help='seconds a client waits between requests')
+    parser.add_argument('--path', default='/post/view_post/?per_page=10')
+    args = parser.parse_args()
+
+    result = run(create_app(), args.clients, args.requests, args.think, args.path)
+    print(json.dumps(result, indent=2))
+    exhausted = sum(pool.get('wait', {}).get('timeouts', 0) for pool in result['pools'].values())
+    raise SystemExit(1 if exhausted else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+import contextlib
+import itertools
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+
+@pytest.fixture
+def app_env(tmp_path):
+    """
+    Environment the app is created from, override it in a test module for a different setup
+    """
+    return {
+        'DATABASE_URL': 'sqlite://',
+        'SECRET_KEY': 'test-secret',
+        'FEED_CACHE_BACKEND': 'null',
+        'MEDIA_BACKEND': 'local',
+        'MEDIA_ROOT': str(tmp_path / 'media'),
+        'UPLOAD_SPOOL_DIR': str(tmp_path / 'spool'),
+        'UPLOAD_WORKERS': '0',
+        'SOCKETIO_ASYNC_MODE': 'threading',
+    }
+
+
+@pytest.fixture
+def app(monkeypatch, app_env):
+    """
+    App on a private in-memory SQLite database, with the feed cache off so every request hits the database
+    No app context is left pushed: requests get their own, as in production (flask.g is per request)
+    """
+    for key, value in app_env.items():
+        monkeypatch.setenv(key, value)
+
+    from main import create_app, db
+    from main.search import fallback_index
+    app = create_app()
+    app.config.update(TESTING=True, JWT_SECRET_KEY='test-jwt-secret-key-of-32-bytes!')
+    yield app
+    # The fallback search index lives in the process, not in the app
+    fallback_index.clear()
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+    from main import db
+    from main.models import Users
+
+    def make(username, role='user'):
+        with app.app_context():
+            user = Users(username=username, email=f'{username}@example.com', password='x',
+                         first_name=username, role=role)
+            db.session.add(user)
+            db.session.commit()
+            return user.user_id, {'Authorization': f'Bearer {create_access_token(identity=user.user_id)}'}
+
+    return make
+
+
+@pytest.fixture
+def make_post(app):
+    from main import db
+    from main.models import Posts
+    numbers = itertools.count(1)
+
+    def make(author_id, title='post', content=None):
+        with app.app_context():
+            # Posts.content is unique
+            post = Posts(author_id=author_id, title=title, content=content or f'{title} {next(numbers)}')
+            db.session.add(post)
+            db.session.commit()
+            return post.post_id
+
+    return make
+
+
+@pytest.fixture
+def count_queries(app):
+    """
+    Context manager collecting the SQL statements run inside it
+    """
+    from main import db
+
+    @contextlib.contextmanager
+    def counting():
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+
+    return counting
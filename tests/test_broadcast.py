@@ -0,0 +1,87 @@
+import time
+import pytest
+from main import socketio
+from main.broadcast import BroadcastCoalescer
+
+
+class RecordingSocket:
+    """
+    Stands in for SocketIO: keeps the emits, runs nothing in the background
+    """
+
+    def __init__(self):
+        self.emitted = []
+        self.tasks = []
+
+    def emit(self, event, data, room=None):
+        self.emitted.append((event, data, room))
+
+    def start_background_task(self, target):
+        self.tasks.append(target)
+
+
+def test_updates_within_a_window_collapse_to_latest_values():
+    sock = RecordingSocket()
+    broadcasts = BroadcastCoalescer(sock, interval_ms=200)
+    for like_count in (1, 2, 3):
+        broadcasts.update_counters('p1', like_count=like_count)
+    broadcasts.update_counters('p1', comment_count=5)
+    broadcasts.update_counters('p2', like_count=9)
+    for user in ('u1', 'u2', 'u2'):
+        broadcasts.notify_like('owner', 'p1', 'Hello', user)
+
+    # One flusher for the whole window, nothing sent before it runs
+    assert len(sock.tasks) == 1 and sock.emitted == []
+    assert broadcasts.flush() == 3
+    assert sock.emitted == [
+        ('like_update', {'post_id': 'p1', 'like_count': 3, 'comment_count': 5}, 'post_p1'),
+        ('like_update', {'post_id': 'p2', 'like_count': 9}, 'post_p2'),
+        ('notification', {'msg': '2 people liked your post "Hello"', 'post_id': 'p1', 'count': 2}, 'user_owner'),
+    ]
+    snapshot = broadcasts.snapshot()
+    assert (snapshot['events_flushed'], snapshot['messages_sent'], snapshot['messages_saved']) == (8, 3, 5)
+    assert broadcasts.flush() == 0
+
+
+def test_zero_interval_emits_every_update():
+    sock = RecordingSocket()
+    broadcasts = BroadcastCoalescer(sock, interval_ms=0)
+    broadcasts.update_counters('p1', like_count=1)
+    broadcasts.update_counters('p1', like_count=2)
+    assert [data['like_count'] for _, data, _ in sock.emitted] == [1, 2]
+    assert sock.tasks == []
+
+
+@pytest.fixture
+def app_env(app_env):
+    return {**app_env, 'BROADCAST_INTERVAL_MS': '500'}
+
+
+def socket_for(app, headers):
+    return socketio.test_client(app, auth={'token': headers['Authorization'].split()[1]})
+
+
+def test_room_receives_one_update_per_window(app, client, make_user, make_post):
+    author_id, author = make_user('author')
+    post_id = make_post(author_id, 'Hello')
+    owner = socket_for(app, author)
+    watcher = socketio.test_client(app)
+    watcher.emit('join_post', {'post_id': post_id})
+    watcher.get_received()
+
+    likers = [make_user(f'liker{n}')[1] for n in range(3)]
+    # All three land within one window
+    for headers in likers:
+        assert client.put(f'/post/{post_id}/like/', headers=headers).status_code == 201
+        # The page announces its like over the socket, which broadcasts the counter
+        liker = socket_for(app, headers)
+        liker.emit('like_post', {'post_id': post_id})
+        liker.disconnect()
+    time.sleep(app.config['BROADCAST_INTERVAL_MS'] / 1000 * 3)
+
+    updates = [m['args'][0] for m in watcher.get_received() if m['name'] == 'like_update']
+    assert updates == [{'post_id': post_id, 'like_count': 3}]
+    notifications = [m['args'][0] for m in owner.get_received() if m['name'] == 'notification']
+    assert [(n['count'], n['msg']) for n in notifications] == [(3, '3 people liked your post "Hello"')]
+    watcher.disconnect()
+    owner.disconnect()
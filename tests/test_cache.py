@@ -0,0 +1,90 @@
+import time
+import pytest
+from main import cache, db
+from main.cache import MemoryCache
+from main.models import Posts
+
+
+@pytest.fixture
+def app_env(app_env):
+    return {**app_env, 'FEED_CACHE_BACKEND': 'memory'}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    return now
+
+
+def feed(client, headers):
+    response = client.get('/post/view_post/?per_page=10', headers=headers)
+    assert response.status_code == 200
+    return {post['title']: post['like_count'] for post in response.json['posts']}
+
+
+def test_memory_cache_expires_and_evicts(clock):
+    store = MemoryCache(maxsize=2, default_timeout=5)
+    store.set('short', 1)
+    store.set('pinned', 2, timeout=0)
+    clock[0] += 6
+    assert store.get('short') is None
+    assert store.get('pinned') == 2
+
+    # Least recently used goes first once full
+    store.set('a', 3)
+    store.get('pinned')
+    store.set('b', 4)
+    assert store.get('a') is None
+    assert (store.get('pinned'), store.get('b')) == (2, 4)
+
+
+def test_write_bumps_generation_and_new_page_is_served(app, client, make_user, count_queries):
+    _, headers = make_user('author')
+    client.post('/post/create_post/', data={'title': 'first', 'content': 'one'}, headers=headers)
+    assert feed(client, headers) == {'first': 0}
+    with count_queries() as statements:
+        assert feed(client, headers) == {'first': 0}
+    # Page and aggregates both came from the cache, only the viewer's role and likes were read
+    assert not any('FROM "Posts"' in statement for statement in statements)
+
+    with app.app_context():
+        generation = cache._generation()
+    client.post('/post/create_post/', data={'title': 'second', 'content': 'two'}, headers=headers)
+    with app.app_context():
+        assert cache._generation() != generation
+    assert feed(client, headers) == {'first': 0, 'second': 0}
+
+
+def test_page_primes_aggregates(app, client, make_user, make_post):
+    author_id, headers = make_user('author')
+    post_ids = [make_post(author_id) for _ in range(3)]
+    feed(client, headers)
+
+    loaded = []
+    with app.app_context():
+        aggregates = cache.get_post_aggregates(post_ids, lambda missing: loaded.extend(missing) or {})
+    assert loaded == []
+    assert set(aggregates) == set(post_ids)
+
+
+def test_invalidate_post_drops_stale_counters(app, client, make_user, make_post):
+    author_id, _ = make_user('author')
+    _, viewer = make_user('viewer')
+    _, liker = make_user('liker')
+    post_id = make_post(author_id, 'cached')
+    assert feed(client, viewer) == {'cached': 0}
+
+    # Changed behind the cache's back: the cached counters are still served
+    with app.app_context():
+        db.session.execute(db.update(Posts).where(Posts.post_id == post_id).values(like_count=5))
+        db.session.commit()
+    assert feed(client, viewer) == {'cached': 0}
+
+    with app.app_context():
+        cache.invalidate_post(post_id)
+    assert feed(client, viewer) == {'cached': 5}
+
+    # A like invalidates on its own, the cached page itself stays valid
+    assert client.put(f'/post/{post_id}/like/', headers=liker).status_code == 201
+    assert feed(client, viewer) == {'cached': 6}
@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import func, insert
+from main import db
+from main.models import Comments, Posts
+from main.pagination import encode_replies_token
+from main.uuids import uuid7
+
+
+def add_tree(post_id, user_id, depth=0, width=0, fanout=0, parent_id=None):
+    """
+    Insert a comment with a reply chain `depth` deep beneath it and `width` direct replies having `fanout`
+    replies each, returns the root id and the number of comments inserted
+    """
+    start = datetime.now(timezone.utc)
+    rows = []
+
+    def add(parent):
+        comment_id = uuid7()
+        rows.append({
+            'comment_id': comment_id, 'post_id': post_id, 'user_id': user_id, 'content': 'c',
+            'parent_comment_id': parent, 'created_at': start + timedelta(microseconds=len(rows))
+        })
+        return comment_id
+
+    root = add(parent_id)
+    parent = root
+    for _ in range(depth):
+        parent = add(parent)
+    for _ in range(width):
+        child = add(root)
+        for _ in range(fanout):
+            add(child)
+
+    db.session.execute(insert(Comments), rows)
+    db.session.execute(db.update(Posts).where(Posts.post_id == post_id).values(
+        comment_count=Posts.comment_count + len(rows), updated_at=Posts.updated_at
+    ))
+    db.session.commit()
+    return root, len(rows)
+
+
+def test_delete_removes_deep_and_wide_subtree(app, client, make_user, make_post):
+    user_id, headers = make_user('author')
+    post_id = make_post(user_id, 'thread')
+    with app.app_context():
+        root, size = add_tree(post_id, user_id, depth=500, width=200, fanout=5)
+        # Another thread on the same post, and a reply to it, must survive
+        kept_root, kept = add_tree(post_id, user_id, depth=3, width=2, fanout=1)
+
+    response = client.post(f'/comment/post/{post_id}/delete/{root}/', headers=headers)
+    assert response.status_code == 200
+
+    with app.app_context():
+        remaining = db.session.scalars(db.select(Comments.comment_id).where(Comments.post_id == post_id)).all()
+        assert len(remaining) == kept
+        assert kept_root in remaining
+        orphans = db.session.scalar(
+            db.select(func.count()).select_from(Comments)
+            .where(Comments.parent_comment_id.is_not(None), Comments.parent_comment_id.not_in(remaining))
+        )
+        assert orphans == 0
+        assert db.session.get(Posts, post_id).comment_count == kept
+    assert size == 1 + 500 + 200 * 6
+
+
+def test_get_comments_query_count_does_not_grow_with_thread(app, client, make_user, make_post, count_queries):
+    user_id, headers = make_user('reader')
+    counts = {}
+    for depth, width, fanout in ((2, 1, 1), (10, 10, 3), (50, 30, 4)):
+        post_id = make_post(user_id, 'thread')
+        with app.app_context():
+            add_tree(post_id, user_id, depth=depth, width=width, fanout=fanout)
+            add_tree(post_id, user_id, depth=1, width=1)
+        for mode in ('', '?cursor=', '?max_depth=3'):
+            with count_queries() as statements:
+                response = client.get(f'/comment/post/{post_id}/comments/{mode}', headers=headers)
+            assert response.status_code == 200
+            counts.setdefault(mode, set()).add(len(statements))
+    # Nested replies come from the rows of one query, never a query per comment
+    assert all(len(seen) == 1 for seen in counts.values()), counts
+
+
+@pytest.mark.parametrize('per_page', [0, -1, 101])
+@pytest.mark.parametrize('mode', ['cursor=', 'replies='])
+def test_get_comments_rejects_out_of_range_page_size(app, client, make_user, make_post, per_page, mode):
+    user_id, headers = make_user('reader')
+    post_id = make_post(user_id, 'thread')
+    with app.app_context():
+        root, _ = add_tree(post_id, user_id, width=3)
+        created_at = db.session.get(Comments, root).created_at
+    if mode == 'replies=':
+        mode += encode_replies_token(root, created_at, root)
+    response = client.get(f'/comment/post/{post_id}/comments/?per_page={per_page}&{mode}', headers=headers)
+    assert response.status_code == 400
@@ -0,0 +1,64 @@
+import time
+from main import db
+from main.models import AuthorStats, Posts
+
+
+def seed_author(app, make_post, author_id, counters):
+    """
+    One post per (like_count, comment_count), oldest first
+    """
+    post_ids = []
+    for like_count, comment_count in counters:
+        post_id = make_post(author_id)
+        with app.app_context():
+            db.session.execute(db.update(Posts).where(Posts.post_id == post_id)
+                               .values(like_count=like_count, comment_count=comment_count))
+            db.session.commit()
+        post_ids.append(post_id)
+        time.sleep(0.001)
+    return post_ids
+
+
+def test_dashboard_totals_and_breakdown(app, client, make_user, make_post):
+    author_id, headers = make_user('author')
+    other_id, _ = make_user('other')
+    post_ids = seed_author(app, make_post, author_id, [(3, 1), (0, 4), (7, 2)])
+    seed_author(app, make_post, other_id, [(100, 100)])
+
+    response = client.get('/post/dashboard/stats/?limit=2', headers=headers)
+    assert response.status_code == 200
+    body = response.json
+    assert body['author_id'] == author_id
+    assert {key: body['totals'][key] for key in ('posts', 'likes', 'comments', 'source')} == \
+        {'posts': 3, 'likes': 10, 'comments': 7, 'source': 'live'}
+    # Newest first, the limit only cuts the breakdown
+    assert [(p['post_id'], p['like_count'], p['comment_count']) for p in body['posts']] == \
+        [(post_ids[2], 7, 2), (post_ids[1], 0, 4)]
+
+    with app.app_context():
+        AuthorStats.refresh(min_posts=1)
+    totals = client.get('/post/dashboard/stats/?limit=0', headers=headers).json['totals']
+    assert (totals['posts'], totals['likes'], totals['comments'], totals['source']) == (3, 10, 7, 'summary')
+    assert totals['refreshed_at'].endswith('Z')
+
+
+def test_dashboard_of_author_without_posts(client, make_user):
+    _, headers = make_user('newcomer')
+    body = client.get('/post/dashboard/stats/', headers=headers).json
+    assert (body['totals']['posts'], body['totals']['likes'], body['posts']) == (0, 0, [])
+
+
+def test_only_admins_see_other_authors(client, make_user):
+    author_id, _ = make_user('author')
+    _, user = make_user('user')
+    _, admin = make_user('admin', role='admin')
+
+    assert client.get(f'/post/dashboard/stats/?author_id={author_id}', headers=user).status_code == 403
+    assert client.get(f'/post/dashboard/stats/?author_id={author_id}', headers=admin).status_code == 200
+
+
+def test_dashboard_rejects_bad_arguments(client, make_user):
+    _, headers = make_user('author')
+    assert client.get('/post/dashboard/stats/?author_id=nope', headers=headers).status_code == 400
+    assert client.get('/post/dashboard/stats/?limit=-1', headers=headers).status_code == 400
+    assert client.get('/post/dashboard/stats/?limit=100000', headers=headers).status_code == 400
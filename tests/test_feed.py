@@ -0,0 +1,116 @@
+import json
+import time
+from datetime import datetime, timedelta, timezone
+import pytest
+from main import db
+from main.models import Likes, Posts
+from main.schemas import as_utc, json_response, utc_isoformat
+
+
+def seed_posts(app, author_id, count, created_at=None):
+    with app.app_context():
+        posts = [Posts(author_id=author_id, title=f'post {i}', content=f'content {i}', created_at=created_at)
+                 for i in range(count)]
+        db.session.add_all(posts)
+        db.session.commit()
+        return [post.post_id for post in posts]
+
+
+@pytest.mark.parametrize('mode', ['page', 'cursor'])
+def test_feed_statement_count_does_not_grow_with_page_size(app, client, make_user, count_queries, mode):
+    author_id, _ = make_user('author')
+    viewer_id, headers = make_user('viewer')
+    post_ids = seed_posts(app, author_id, 40)
+    with app.app_context():
+        db.session.add_all([Likes(user_id=viewer_id, post_id=post_id) for post_id in post_ids[::3]])
+        db.session.commit()
+
+    counts = {}
+    for per_page in (1, 5, 20, 40):
+        query = f'per_page={per_page}' + ('&cursor=' if mode == 'cursor' else '')
+        with count_queries() as statements:
+            response = client.get(f'/post/view_post/?{query}', headers=headers)
+        assert response.status_code == 200
+        assert len(response.json['posts']) == per_page
+        counts[per_page] = len(statements)
+
+    assert len(set(counts.values())) == 1, counts
+    # page: posts, total count, aggregates, viewer role, viewer likes; cursor mode skips the count
+    assert counts[1] == (5 if mode == 'page' else 4), counts
+
+
+def walk_cursor(client, headers, per_page):
+    seen, cursor = [], ''
+    for _ in range(100):
+        response = client.get(f'/post/view_post/?per_page={per_page}&cursor={cursor}', headers=headers)
+        assert response.status_code == 200
+        seen += [post['post_id'] for post in response.json['posts']]
+        cursor = response.json['meta']['next_cursor']
+        if not cursor:
+            return seen
+    raise AssertionError(f'cursor did not terminate, {len(seen)} posts seen')
+
+
+@pytest.mark.parametrize('same_instant', [False, True])
+@pytest.mark.parametrize('per_page', [1, 2, 3, 7])
+def test_cursor_walk_returns_every_post_once(app, client, make_user, per_page, same_instant):
+    # All created within the same second; with same_instant the order rests on the post_id tie break alone
+    author_id, headers = make_user('author')
+    post_ids = seed_posts(app, author_id, 7, datetime.now(timezone.utc) if same_instant else None)
+
+    seen = walk_cursor(client, headers, per_page)
+    assert sorted(seen) == sorted(post_ids)
+    assert len(seen) == len(set(seen))
+
+
+def test_ndjson_stream_resumes_after_cursor(app, client, make_user):
+    author_id, headers = make_user('author')
+    post_ids = seed_posts(app, author_id, 7)
+
+    first = client.get('/post/view_post/?per_page=2&cursor=', headers=headers).json
+    response = client.get(f'/post/view_post/?cursor={first["meta"]["next_cursor"]}',
+                          headers={**headers, 'Accept': 'application/x-ndjson'})
+    assert response.status_code == 200
+    streamed = [json.loads(line)['post_id'] for line in response.data.splitlines()]
+
+    seen = [post['post_id'] for post in first['posts']] + streamed
+    assert sorted(seen) == sorted(post_ids)
+    assert len(seen) == len(set(seen))
+
+
+@pytest.mark.parametrize('per_page', [0, -1, 101])
+@pytest.mark.parametrize('cursor', ['', '&cursor='])
+def test_feed_rejects_out_of_range_page_size(client, make_user, per_page, cursor):
+    _, headers = make_user('viewer')
+    response = client.get(f'/post/view_post/?per_page={per_page}{cursor}', headers=headers)
+    assert response.status_code == 400
+
+
+def test_datetimes_are_sent_as_utc(app, client, make_user):
+    author_id, headers = make_user('author')
+    # Naive, as SQLite hands it back
+    [post_id] = seed_posts(app, author_id, 1, created_at=datetime(2026, 1, 2, 3, 4, 5, 123456))
+
+    response = client.get('/post/view_post/?per_page=1', headers=headers)
+    assert response.json['posts'][0]['created_at'] == '2026-01-02T03:04:05.123456Z'
+    response = client.get(f'/post/{post_id}/', headers=headers)
+    assert response.json['post']['created_at'] == '2026-01-02T03:04:05.123456Z'
+
+    assert utc_isoformat(datetime(2026, 1, 2, 3, 4, 5)) == '2026-01-02T03:04:05Z'
+    offset = datetime(2026, 1, 2, 5, 4, 5, tzinfo=timezone(timedelta(hours=2)))
+    assert json_response(as_utc(offset)).get_data() == b'"2026-01-02T03:04:05Z"'
+
+
+def test_edited_at_is_utc_in_any_server_timezone(app, client, make_user, monkeypatch):
+    author_id, headers = make_user('author')
+    [post_id] = seed_posts(app, author_id, 1)
+    # A server clock far from UTC makes a local timestamp stand out
+    with monkeypatch.context() as local_clock:
+        local_clock.setenv('TZ', 'Pacific/Kiritimati')
+        time.tzset()
+        response = client.post(f'/post/edit_post/{post_id}/', data={'title': 'edited'}, headers=headers)
+    time.tzset()
+    assert response.status_code == 200
+
+    updated_at = datetime.fromisoformat(client.get(f'/post/{post_id}/', headers=headers).json['post']['updated_at'])
+    assert abs(updated_at - datetime.now(timezone.utc)) < timedelta(minutes=5)
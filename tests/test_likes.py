@@ -0,0 +1,174 @@
+import os
+import random
+import threading
+import pytest
+from sqlalchemy import func
+from main import db, socketio
+from main.like_buffer import LikeBuffer, get_like_buffer
+from main.models import Likes, Posts
+from main.uuids import uuid7
+
+
+@pytest.fixture
+def write_behind():
+    # Parametrize a test with write_behind=True to send its likes through the buffer
+    return False
+
+
+@pytest.fixture
+def app_env(app_env, write_behind, tmp_path):
+    # A file database: the connections of concurrent clients must all see the same tables
+    env = {**app_env, 'DATABASE_URL': f"sqlite:///{tmp_path / 'likes.db'}"}
+    if write_behind:
+        # A long flush window keeps the likes in the buffer until the test flushes it
+        env.update(LIKE_WRITE_BEHIND='true', LIKE_BUFFER_DURABILITY='memory', LIKE_FLUSH_INTERVAL_MS='60000')
+    return env
+
+
+def flush_likes(app):
+    with app.app_context():
+        buffer = get_like_buffer()
+        if buffer is not None:
+            buffer.flush()
+
+
+def like_state(app, post_id):
+    """
+    (Likes rows of the post, its like_count, (user, post) pairs liked more than once)
+    """
+    with app.app_context():
+        rows = Likes.query.filter_by(post_id=post_id).count()
+        like_count = db.session.scalar(db.select(Posts.like_count).where(Posts.post_id == post_id))
+        duplicates = db.session.query(Likes.user_id).filter(Likes.post_id == post_id) \
+            .group_by(Likes.user_id).having(func.count() > 1).count()
+        return rows, like_count, duplicates
+
+
+@pytest.mark.parametrize('write_behind', [False, True])
+def test_repeated_like_and_unlike_are_idempotent(app, client, make_user, make_post, write_behind):
+    author_id, _ = make_user('author')
+    _, liker = make_user('liker')
+    post_id = make_post(author_id)
+    path = f'/post/{post_id}/like/'
+
+    assert client.put(path, headers=liker).status_code == 201
+    again = client.put(path, headers=liker)
+    assert (again.status_code, again.json['like_count'], again.json['liked']) == (200, 1, True)
+    flush_likes(app)
+    assert like_state(app, post_id) == (1, 1, 0)
+
+    assert client.delete(path, headers=liker).status_code == 200
+    again = client.delete(path, headers=liker)
+    assert (again.status_code, again.json['like_count'], again.json['liked']) == (200, 0, False)
+    flush_likes(app)
+    assert like_state(app, post_id) == (0, 0, 0)
+
+    assert client.put(f'/post/{uuid7()}/like/', headers=liker).status_code == 404
+
+
+@pytest.mark.parametrize('write_behind', [False, True])
+def test_concurrent_likes_keep_counter_and_rows_in_step(app, make_user, make_post, write_behind):
+    author_id, _ = make_user('author')
+    users = [make_user(f'user{n}') for n in range(4)]
+    post_id = make_post(author_id)
+    path = f'/post/{post_id}/like/'
+    # Two clients per user: the same user likes and unlikes from two threads at once (double clicks)
+    clients = 8
+    statuses = []
+    start_line = threading.Barrier(clients)
+
+    def run(n):
+        http = app.test_client()
+        _, headers = users[n % len(users)]
+        rng = random.Random(n)
+        start_line.wait()
+        for _ in range(15):
+            send = http.put if rng.random() < 0.5 else http.delete
+            statuses.append(send(path, headers=headers).status_code)
+        # Everyone ends liked, so the final count is known
+        statuses.append(http.put(path, headers=headers).status_code)
+
+    threads = [threading.Thread(target=run, args=(n,)) for n in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    flush_likes(app)
+
+    assert len(statuses) == clients * 16
+    assert set(statuses) <= {200, 201}
+    assert like_state(app, post_id) == (len(users), len(users), 0)
+
+
+def feed_post(client, headers):
+    [post] = client.get('/post/view_post/?per_page=5', headers=headers).json['posts']
+    return post['like_count'], post['is_liked']
+
+
+@pytest.mark.parametrize('write_behind', [True])
+def test_liker_reads_back_buffered_like(app, client, make_user, make_post, write_behind):
+    author_id, _ = make_user('author')
+    _, liker = make_user('liker')
+    _, viewer = make_user('viewer')
+    post_id = make_post(author_id, 'liked')
+    etag_before = client.get(f'/post/{post_id}/', headers=liker).headers['ETag']
+
+    assert client.put(f'/post/{post_id}/like/', headers=liker).status_code == 201
+    with app.app_context():
+        assert Likes.query.count() == 0
+
+    # The copy from before the like is stale
+    response = client.get(f'/post/{post_id}/', headers={**liker, 'If-None-Match': etag_before})
+    assert response.status_code == 200
+    assert (response.json['post']['like_count'], response.json['post']['is_liked']) == (1, True)
+    assert feed_post(client, liker) == (1, True)
+    assert feed_post(client, viewer) == (1, False)
+    [line] = client.get('/post/view_post/', headers={**liker, 'Accept': 'application/x-ndjson'}).get_data().splitlines()
+    assert b'"like_count":1' in line and b'"is_liked":true' in line
+
+    # An unlike that is still pending hides the written like too
+    with app.app_context():
+        get_like_buffer().flush()
+        assert Likes.query.count() == 1
+    assert client.delete(f'/post/{post_id}/like/', headers=liker).status_code == 200
+    response = client.get(f'/post/{post_id}/', headers=liker)
+    assert (response.json['post']['like_count'], response.json['post']['is_liked']) == (0, False)
+    assert feed_post(client, liker) == (0, False)
+
+    with app.app_context():
+        get_like_buffer().flush()
+        assert Likes.query.count() == 0
+    assert feed_post(client, liker) == (0, False)
+
+
+@pytest.mark.parametrize('write_behind', [True])
+def test_replayed_journal_rebuilds_pending_counts(app, client, make_user, make_post, write_behind, tmp_path):
+    author_id, author = make_user('author')
+    written, _ = make_user('written')
+    waiting, _ = make_user('waiting')
+    gone, _ = make_user('gone')
+    post_id = make_post(author_id, 'replayed')
+    with app.app_context():
+        # The crashed process wrote one like before it stopped
+        db.session.add(Likes(user_id=written, post_id=post_id))
+        db.session.execute(db.update(Posts).where(Posts.post_id == post_id).values(like_count=1))
+        db.session.commit()
+
+    journal_dir = tmp_path / 'journal'
+    journal_dir.mkdir()
+    (journal_dir / 'likes-gone-1.journal').write_text(
+        # The last line was torn by the crash
+        f'{written} {post_id} 1\n{waiting} {post_id} 1\n{gone} {post_id} 0\n{waiting} {post_id}'
+    )
+    app.config.update(LIKE_BUFFER_DURABILITY='journal', LIKE_JOURNAL_DIR=str(journal_dir))
+    buffer = LikeBuffer(app, socketio)
+
+    # Only the like that never reached the database is pending, and counted once
+    assert buffer.snapshot()['pending'] == 1
+    assert buffer.pending(waiting, [post_id]) == ({post_id: 1}, {post_id: True})
+    assert client.get(f'/post/{post_id}/', headers=author).json['post']['like_count'] == 2
+
+    flush_likes(app)
+    assert like_state(app, post_id) == (2, 2, 0)
+    assert not any(name.endswith('.replay') for name in os.listdir(journal_dir))
+    buffer.close()
@@ -0,0 +1,127 @@
+from datetime import timedelta
+from main import db
+from main.models import MediaBlobs, MediaOutbox, utc_now
+from main.outbox import MAX_ATTEMPTS, enqueue_media_removal, process_media_outbox
+from main.storage import acquire_media, file_digest, release_media
+
+
+def failing_delete(calls):
+    def delete(public_id):
+        calls.append(public_id)
+        raise ConnectionError('media backend unavailable')
+    return delete
+
+
+def make_due(outbox_id):
+    db.session.execute(db.update(MediaOutbox).where(MediaOutbox.outbox_id == outbox_id)
+                       .values(next_attempt_at=utc_now() - timedelta(seconds=1)))
+    db.session.commit()
+
+
+def test_failed_removal_backs_off_before_retrying(app):
+    calls = []
+    with app.app_context():
+        enqueue_media_removal(['posts/a.png'])
+        db.session.commit()
+        outbox_id = MediaOutbox.query.one().outbox_id
+
+        assert process_media_outbox(failing_delete(calls)) == 0
+        item = db.session.get(MediaOutbox, outbox_id)
+        assert (item.status, item.attempts) == ('pending', 1)
+        first_wait = item.next_attempt_at.replace(tzinfo=None) - utc_now().replace(tzinfo=None)
+        assert first_wait > timedelta(seconds=30)
+
+        # Not due yet: an immediate second pass does not touch it
+        assert process_media_outbox(failing_delete(calls)) == 0
+        assert len(calls) == 1
+
+        make_due(outbox_id)
+        process_media_outbox(failing_delete(calls))
+        item = db.session.get(MediaOutbox, outbox_id)
+        second_wait = item.next_attempt_at.replace(tzinfo=None) - utc_now().replace(tzinfo=None)
+        assert item.attempts == 2 and second_wait > first_wait
+
+        for _ in range(MAX_ATTEMPTS - 2):
+            make_due(outbox_id)
+            process_media_outbox(failing_delete(calls))
+        item = db.session.get(MediaOutbox, outbox_id)
+        assert (item.status, item.attempts) == ('failed', MAX_ATTEMPTS)
+        assert len(calls) == MAX_ATTEMPTS
+
+
+def test_removal_succeeds_once_backend_recovers(app):
+    calls = []
+    with app.app_context():
+        enqueue_media_removal(['posts/b.png'])
+        db.session.commit()
+        outbox_id = MediaOutbox.query.one().outbox_id
+        process_media_outbox(failing_delete(calls))
+
+        make_due(outbox_id)
+        assert process_media_outbox(lambda public_id: True) == 1
+        item = db.session.get(MediaOutbox, outbox_id)
+        assert (item.status, item.attempts, item.next_attempt_at) == ('done', 2, None)
+
+
+def test_media_worker_does_not_spin_on_failures(app, monkeypatch):
+    calls = []
+    with app.app_context():
+        enqueue_media_removal(['posts/c.png'])
+        db.session.commit()
+    monkeypatch.setattr('main.outbox.get_storage', lambda: type('Down', (), {'delete': staticmethod(failing_delete(calls))})())
+
+    result = app.test_cli_runner().invoke(args=['media-worker', '--once'])
+    assert result.exit_code == 0, result.output
+    assert len(calls) == 1
+    with app.app_context():
+        assert MediaOutbox.query.one().status == 'pending'
+
+
+def released_blob(tmp_path):
+    """
+    A stored blob whose last reference was just dropped, returns the path holding its bytes
+    """
+    path = tmp_path / 'photo.png'
+    path.write_bytes(b'same bytes')
+    db.session.add(MediaBlobs(public_id='posts/blob.png', content_hash=file_digest(path),
+                              url='https://media.example.com/posts/blob.png', ref_count=1))
+    db.session.commit()
+    assert release_media(['posts/blob.png']) == ['posts/blob.png']
+    db.session.commit()
+    return path
+
+
+def test_blob_taken_back_before_removal_is_kept(app, tmp_path):
+    calls = []
+    with app.app_context():
+        path = released_blob(tmp_path)
+        # Same bytes uploaded again while the removal is queued: the stored file is reused
+        assert acquire_media(path, 'photo.png')[0] == 'posts/blob.png'
+        db.session.commit()
+
+        assert process_media_outbox(calls.append) == 1
+        assert calls == []
+        assert MediaOutbox.query.one().status == 'cancelled'
+        assert db.session.get(MediaBlobs, 'posts/blob.png').ref_count == 1
+
+
+def test_failed_removal_leaves_blob_reusable(app, tmp_path):
+    calls = []
+    with app.app_context():
+        path = released_blob(tmp_path)
+        process_media_outbox(failing_delete(calls))
+        assert db.session.get(MediaBlobs, 'posts/blob.png').ref_count == 0
+
+        assert acquire_media(path, 'photo.png')[0] == 'posts/blob.png'
+        db.session.commit()
+        make_due(MediaOutbox.query.one().outbox_id)
+        assert process_media_outbox(failing_delete(calls)) == 1
+        assert len(calls) == 1
+        assert MediaOutbox.query.one().status == 'cancelled'
+
+
+def test_removal_claims_the_blob_row(app, tmp_path):
+    with app.app_context():
+        released_blob(tmp_path)
+        assert process_media_outbox(lambda public_id: True) == 1
+        assert db.session.get(MediaBlobs, 'posts/blob.png') is None
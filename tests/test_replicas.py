@@ -0,0 +1,116 @@
+import shutil
+import sqlite3
+import pytest
+from main import db
+from main.models import Likes, Posts
+from main.replicas import replica_snapshot
+
+
+@pytest.fixture
+def feed_cache_backend():
+    return 'memory'
+
+
+@pytest.fixture
+def app_env(app_env, tmp_path, feed_cache_backend):
+    # Two SQLite files stand in for a primary and its replica
+    return {
+        **app_env,
+        'DATABASE_URL': f"sqlite:///{tmp_path / 'primary.db'}",
+        'DATABASE_REPLICA_URLS': f"sqlite:///{tmp_path / 'replica.db'}",
+        'FEED_CACHE_BACKEND': feed_cache_backend,
+    }
+
+
+@pytest.fixture
+def replicated_post(app, make_user, tmp_path):
+    """
+    A post on the primary, copied to the replica with another title so each read shows where it went
+    """
+    author_id, _ = make_user('author')
+    with app.app_context():
+        post = Posts(author_id=author_id, title='primary', content='replicated')
+        db.session.add(post)
+        db.session.commit()
+        post_id = post.post_id
+        for engine in db.engines.values():
+            engine.dispose()
+    shutil.copy(tmp_path / 'primary.db', tmp_path / 'replica.db')
+    with sqlite3.connect(tmp_path / 'replica.db') as replica:
+        replica.execute("UPDATE Posts SET title = 'replica'")
+    return post_id
+
+
+def read_title(client, post_id, headers):
+    response = client.get(f'/post/{post_id}/', headers=headers)
+    assert response.status_code == 200
+    return response.json['post']['title']
+
+
+# Read-your-writes does not depend on the feed cache being on
+@pytest.mark.parametrize('feed_cache_backend', ['memory', 'null'])
+def test_reads_use_replica_and_writes_use_primary(app, client, make_user, replicated_post, tmp_path):
+    post_id = replicated_post
+    _, reader = make_user('reader')
+    writer_id, writer = make_user('writer')
+
+    assert read_title(client, post_id, reader) == 'replica'
+
+    assert client.put(f'/post/{post_id}/like/', headers=writer).status_code == 201
+    with sqlite3.connect(tmp_path / 'replica.db') as replica:
+        assert replica.execute('SELECT count(*) FROM Likes').fetchone()[0] == 0
+    with app.app_context():
+        assert Likes.query.filter_by(user_id=writer_id, post_id=post_id).count() == 1
+
+    # The writer reads their own write from the primary, everyone else stays on the replica
+    assert read_title(client, post_id, writer) == 'primary'
+    assert read_title(client, post_id, reader) == 'replica'
+
+    with app.app_context():
+        sessions = replica_snapshot()['replicas']['replica_0']['sessions']
+    assert sessions >= 2
+
+
+def test_reads_after_a_write_stay_on_primary(app, replicated_post):
+    post_id = replicated_post
+    title = db.select(Posts.title).where(Posts.post_id == post_id)
+    with app.test_request_context(method='GET'):
+        assert db.session.scalar(title) == 'replica'
+
+        db.session.execute(db.update(Posts).where(Posts.post_id == post_id).values(like_count=1))
+        # Same transaction: the replica has neither the row's title nor the uncommitted update
+        assert db.session.scalar(title) == 'primary'
+        assert db.session.scalar(db.select(Posts.like_count).where(Posts.post_id == post_id)) == 1
+        db.session.rollback()
+
+
+def test_non_read_requests_and_cli_use_primary(app, replicated_post):
+    post_id = replicated_post
+    title = db.select(Posts.title).where(Posts.post_id == post_id)
+    with app.test_request_context(method='POST'):
+        assert db.session.scalar(title) == 'primary'
+    with app.app_context():
+        assert db.session.scalar(title) == 'primary'
+
+
+def feed(client, headers):
+    response = client.get('/post/view_post/?per_page=10', headers=headers)
+    assert response.status_code == 200
+    return [(post['title'], post['like_count'], post['is_liked']) for post in response.json['posts']]
+
+
+def test_feed_cache_is_filled_from_primary_and_skipped_by_writers(client, make_user, replicated_post):
+    post_id = replicated_post
+    _, reader = make_user('reader')
+    _, writer = make_user('writer')
+    # A miss reads the primary, the lagging replica never ends up in the shared cache
+    assert feed(client, reader) == [('primary', 0, False)]
+
+    assert client.put(f'/post/{post_id}/like/', headers=writer).status_code == 201
+    assert feed(client, reader) == [('primary', 1, False)]
+    assert feed(client, writer) == [('primary', 1, True)]
+
+    assert client.post('/post/create_post/', data={'title': 'new', 'content': 'fresh'},
+                       headers=writer).status_code == 201
+    assert feed(client, writer) == [('new', 0, False), ('primary', 1, True)]
+    assert feed(client, reader) == [('new', 0, False), ('primary', 1, False)]
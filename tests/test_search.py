@@ -0,0 +1,49 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+
+def search(client, headers, text):
+    response = client.get(f'/post/view_post/?per_page=10&search={text}', headers=headers)
+    assert response.status_code == 200
+    return [post['title'] for post in response.json['posts']]
+
+
+def create_post(client, headers, title, content):
+    response = client.post('/post/create_post/', data={'title': title, 'content': content}, headers=headers)
+    assert response.status_code == 201
+    return response.json['post_id']
+
+
+def test_fallback_index_follows_create_edit_and_delete(client, make_user):
+    _, headers = make_user('author')
+    create_post(client, headers, 'Sourdough basics', 'flour water salt')
+    # The index is built from the table on the first search, later writes update it in place
+    assert search(client, headers, 'sourdough') == ['Sourdough basics']
+
+    post_id = create_post(client, headers, 'Rye starter', 'a sour rye loaf')
+    assert search(client, headers, 'rye') == ['Rye starter']
+    # Prefix match, title hits rank above content hits
+    assert search(client, headers, 'sour') == ['Sourdough basics', 'Rye starter']
+
+    client.post(f'/post/edit_post/{post_id}/', data={'title': 'Spelt starter', 'content': 'spelt only'},
+                headers=headers)
+    assert search(client, headers, 'rye') == []
+    assert search(client, headers, 'spelt') == ['Spelt starter']
+
+    client.post(f'/post/delete_post/{post_id}/', headers=headers)
+    assert search(client, headers, 'spelt') == []
+    assert search(client, headers, 'starter') == []
+
+
+def test_failed_edit_is_not_indexed(client, make_user):
+    _, headers = make_user('author')
+    create_post(client, headers, 'Taken', 'content that already exists')
+    post_id = create_post(client, headers, 'Original', 'original content')
+    assert search(client, headers, 'original') == ['Original']
+
+    # Posts.content is unique, the commit fails after the edit was applied to the session
+    with pytest.raises(IntegrityError):
+        client.post(f'/post/edit_post/{post_id}/',
+                    data={'title': 'Zeppelin', 'content': 'content that already exists'}, headers=headers)
+    assert search(client, headers, 'zeppelin') == []
+    assert search(client, headers, 'original') == ['Original']
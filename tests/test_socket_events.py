@@ -0,0 +1,16 @@
+import pytest
+from main import socketio
+
+
+@pytest.mark.parametrize('payload', ['x', None, 42, ['post_id']])
+def test_like_post_ignores_malformed_payload(app, make_user, payload):
+    _, headers = make_user('liker')
+    token = headers['Authorization'].split()[1]
+    client = socketio.test_client(app, auth={'token': token})
+    client.get_received()
+
+    client.emit('like_post', payload)
+    # The handler returned quietly, the socket still answers
+    client.emit('join_post', {'post_id': 'not-a-uuid'})
+    assert client.get_received()[-1]['args'][0] == {'msg': 'Invalid post id'}
+    client.disconnect()
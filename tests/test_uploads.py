@@ -0,0 +1,68 @@
+import io
+import os
+from werkzeug.datastructures import FileStorage
+from main import db
+from main.models import Posts
+from main.uploads import get_uploads
+
+
+def image(data):
+    return FileStorage(stream=io.BytesIO(data), filename='photo.png', content_type='image/png')
+
+
+def fake_storage(monkeypatch):
+    """
+    Stand-in for the media backend: stores nothing, names each upload after its bytes
+    """
+    released = []
+
+    def acquire(path, filename):
+        with open(path, 'rb') as f:
+            public_id = f'posts/{f.read().decode()}'
+        return public_id, f'https://media.example.com/{public_id}', None
+
+    monkeypatch.setattr('main.uploads.acquire_media', acquire)
+    monkeypatch.setattr('main.uploads.release_media', released.extend)
+    return released
+
+
+def spool_edit(post_id, data):
+    post = db.session.get(Posts, post_id)
+    path = get_uploads().spool(post, image(data), 'photo.png')
+    post.image_state = 'pending'
+    db.session.commit()
+    return path
+
+
+def test_older_upload_finishing_last_does_not_replace_newer(app, make_user, make_post, monkeypatch):
+    released = fake_storage(monkeypatch)
+    user_id, _ = make_user('author')
+    post_id = make_post(user_id, 'pic')
+    with app.app_context():
+        # Two edits with the same file name, the second before the first upload ran
+        first = spool_edit(post_id, b'first')
+        second = spool_edit(post_id, b'second')
+        assert first != second
+        assert os.path.exists(first) and os.path.exists(second)
+
+        assert get_uploads().process(post_id, second) is True
+        assert get_uploads().process(post_id, first) is False
+
+        post = db.session.get(Posts, post_id)
+        assert (post.image_public_id, post.image_state) == ('posts/second', 'ready')
+        assert released == ['posts/first']
+        assert not os.path.exists(first) and not os.path.exists(second)
+
+
+def test_resume_skips_superseded_spool_files(app, make_user, make_post, monkeypatch):
+    fake_storage(monkeypatch)
+    user_id, _ = make_user('author')
+    post_id = make_post(user_id, 'pic')
+    with app.app_context():
+        first = spool_edit(post_id, b'first')
+        spool_edit(post_id, b'second')
+
+        assert get_uploads().resubmit_pending() == 1
+        assert db.session.get(Posts, post_id).image_public_id == 'posts/second'
+        assert os.listdir(get_uploads().spool_dir) == []
+        assert not os.path.exists(first)
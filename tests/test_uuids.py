@@ -0,0 +1,69 @@
+import os
+import time
+import uuid
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import StatementError
+from main import db
+from main.models import Posts
+from main.uuids import format_uuid_bytes, parse_uuid, uuid7
+
+
+def test_uuid7_is_version_7_and_sorts_by_creation():
+    ids = []
+    for _ in range(5):
+        ids.append(uuid7())
+        # Ordering is only guaranteed across milliseconds
+        time.sleep(0.002)
+    assert ids == sorted(ids)
+    assert all((uuid.UUID(i).version, uuid.UUID(i).variant) == (7, uuid.RFC_4122) for i in ids)
+    assert len(set(uuid7() for _ in range(1000))) == 1000
+
+
+@pytest.mark.parametrize('value', [
+    '0192f1a4-7b3c-7d2e-8f10-123456789abc',
+    '0192F1A4-7B3C-7D2E-8F10-123456789ABC',
+    '0192f1a47b3c7d2e8f10123456789abc',
+    '{0192f1a4-7b3c-7d2e-8f10-123456789abc}',
+    uuid.UUID('0192f1a4-7b3c-7d2e-8f10-123456789abc'),
+])
+def test_parse_uuid_returns_canonical_form(value):
+    assert parse_uuid(value) == '0192f1a4-7b3c-7d2e-8f10-123456789abc'
+
+
+@pytest.mark.parametrize('value', [None, '', 'x', '1234', 42, b'\x00' * 16, "' OR 1=1 --",
+                                   '0192f1a4-7b3c-7d2e-8f10-123456789abcd'])
+def test_parse_uuid_rejects_garbage(value):
+    assert parse_uuid(value) is None
+
+
+def test_format_uuid_bytes_matches_uuid_module():
+    for _ in range(100):
+        raw = os.urandom(16)
+        assert format_uuid_bytes(raw) == str(uuid.UUID(bytes=raw))
+
+
+def test_sqlite_keys_round_trip_as_16_byte_blobs(app, make_user, make_post):
+    author_id, _ = make_user('author')
+    post_ids = []
+    for _ in range(3):
+        post_ids.append(make_post(author_id))
+        time.sleep(0.002)
+
+    with app.app_context():
+        stored = db.session.execute(
+            text('SELECT typeof(post_id), length(post_id), typeof(author_id) FROM "Posts"')
+        ).all()
+        assert set(stored) == {('blob', 16, 'blob')}
+
+        post = db.session.get(Posts, post_ids[0])
+        assert (post.post_id, post.author_id) == (post_ids[0], author_id)
+        # Any accepted spelling binds to the same key
+        assert db.session.scalar(db.select(Posts.post_id).where(Posts.post_id == post_ids[0].upper())) == post_ids[0]
+        assert db.session.scalar(db.select(Posts.post_id).where(Posts.post_id == uuid.UUID(post_ids[1]))) \
+            == post_ids[1]
+        # Byte order is time order, new keys land at the end of the index
+        assert db.session.scalars(db.select(Posts.post_id).order_by(Posts.post_id)).all() == post_ids
+
+        with pytest.raises(StatementError):
+            db.session.execute(db.select(Posts).where(Posts.post_id == 'not-a-uuid'))